@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     """Configuración de la aplicación"""
@@ -31,9 +31,42 @@ class Settings(BaseSettings):
     MACRO_WEIGHT: float = 0.1
     SENTIMENT_WEIGHT: float = 0.1
     
+    # Pool HTTP compartido (FMP, GNews, BCRA)
+    HTTP_POOL_LIMIT: int = 100            # Conexiones abiertas en total
+    HTTP_POOL_LIMIT_PER_HOST: int = 10    # Conexiones simultáneas por host
+    HTTP_KEEPALIVE_SECONDS: float = 30    # Tiempo que se conserva una conexión ociosa
+    HTTP_DNS_CACHE_SECONDS: int = 300
+    HTTP_CONNECT_TIMEOUT: float = 5       # Conexión + handshake TLS
+    HTTP_READ_TIMEOUT: float = 15         # Espera entre lecturas del socket
+    HTTP_TOTAL_TIMEOUT: float = 30
+    HTTP_MAX_RETRIES: int = 2             # Reintentos ante 5xx, 429 y errores de red
+    HTTP_BACKOFF_BASE_SECONDS: float = 0.5   # Backoff exponencial con jitter completo
+    HTTP_BACKOFF_MAX_SECONDS: float = 8
+    HTTP_MAX_RETRY_AFTER_SECONDS: float = 30  # Un Retry-After mayor no se espera (cuota agotada)
+    HTTP_HEDGE_PERCENTILES: dict = {  # Proveedores con requests cubiertas: percentil de latencia que dispara la segunda
+        "fmp": 95,
+        "bcra": 95,
+    }
+    HTTP_HEDGE_MIN_SAMPLES: int = 20      # Latencias observadas antes de empezar a cubrir
+    
     # Rate limits
     FMP_DAILY_LIMIT: int = 250
     GNEWS_DAILY_LIMIT: int = 100
+    RATE_LIMITS: dict = {             # Token bucket por proveedor: límite por ventana (segundos) y ráfaga
+        "fmp": {"limit": 300, "period": 60, "burst": 10},
+        "gnews": {"limit": 1, "period": 2, "burst": 1},   # Una request cada 2 segundos
+    }
+    RATE_LIMIT_JITTER_SECONDS: float = 0.05  # Margen por variación en la llegada de las requests
+    QUOTA_LEDGER_PATH: str = "data/quota_ledger.json"  # Consumo diario persistido por proveedor
+    QUOTA_SAVE_DELAY_SECONDS: float = 2   # Las reservas se agrupan y se escriben en background
+    QUOTA_RESET_TIMEZONES: dict = {   # Zona horaria en la que cada proveedor renueva la cuota
+        "fmp": "America/New_York",
+        "gnews": "UTC",
+    }
+    QUOTA_CYCLE_MINUTES: dict = {     # Ciclos de refresco entre los que se reparte la cuota del día
+        "fmp": 6 * 60,
+        "gnews": 6 * 60,
+    }
     
     # Tickers principales argentinos
     ARGENTINE_TICKERS: List[str] = [
@@ -54,17 +87,42 @@ class Settings(BaseSettings):
         "DESP",     # Despegar.com
     ]
     
+    # Universo de la corrida diaria (ticker,name,market); sin archivo se usa ARGENTINE_TICKERS
+    UNIVERSE_PATH: str = "config/universe.csv"
+    RECOMMENDATION_SHARD_SIZE: int = 50   # Tickers por bloque (precios e indicadores en lote)
+    RECOMMENDATION_CONCURRENCY: int = 3   # Análisis simultáneos, para respetar rate limits
+    RECOMMENDATION_TOP_K: Optional[int] = None  # Recomendaciones de la corrida diaria (None: todas)
+    
     # ADRs para análisis fundamental con FMP
     FMP_SUPPORTED_TICKERS: List[str] = [
         "YPF", "GGAL", "PAM", "TEO", "TGS", "CEPU", 
         "BMA", "SUPV", "CRESY", "LOMA", "IRCP", "VIST",
         "MELI", "GLOB", "DESP"
     ]
+    FMP_BATCH_SIZE: int = 50  # Símbolos por request en los endpoints que aceptan listas (profile)
+    FUNDAMENTALS_STORE_DIR: str = "data/fundamentals"  # Histórico de ratios por ticker y período
+    FUNDAMENTALS_FILING_LAG_DAYS: int = 30   # Días tras el cierre del período antes de esperar el balance
+    FUNDAMENTALS_RECHECK_HOURS: int = 24     # Intervalo entre consultas mientras se espera un balance
+    FUNDAMENTALS_MAX_AGE_DAYS: int = 30      # Reconsulta periódica aunque no se espere un balance
     
     # Configuración de sentimiento
     SENTIMENT_MODEL: str = "finiteautomata/beto-sentiment-analysis"
+    SENTIMENT_MODEL_REVISION: str = "main"   # Revisión del modelo en el Hub (parte de la clave del cache)
+    SENTIMENT_BACKEND: str = "transformers"  # "transformers" (PyTorch) u "onnx" (int8, ver `make sentiment-onnx`)
+    SENTIMENT_ONNX_DIR: str = "data/models/beto-sentiment-onnx"  # Modelo exportado + tokenizer
+    SENTIMENT_ONNX_THREADS: int = 0          # Threads de ONNX Runtime por inferencia (0 = automático)
+    SENTIMENT_WARMUP_ON_STARTUP: bool = True  # Cargar el modelo en background al iniciar la app
+    SENTIMENT_MAX_LENGTH: int = 128          # Tokens por texto (título + descripción)
+    SENTIMENT_CACHE_PATH: str = "data/sentiment_cache.sqlite3"  # Resultados por artículo
+    SENTIMENT_CACHE_MAX_AGE_DAYS: int = 30   # Se purgan al abrir; las noticias se buscan a 7 días
     MAX_NEWS_PER_TICKER: int = 10
     NEWS_DAYS_LOOKBACK: int = 7
+    SENTIMENT_WORKERS: int = 1            # Threads de inferencia (cada uno ejecuta un lote a la vez)
+    SENTIMENT_QUEUE_SIZE: int = 32        # Lotes en espera antes de aplicar backpressure
+    SENTIMENT_SUBMIT_TIMEOUT: float = 5   # Espera máxima por lugar en la cola; después se usa el respaldo
+    SENTIMENT_MIN_BATCH: int = 4          # Rango del tamaño de lote que ajusta el tuner según throughput
+    SENTIMENT_MAX_BATCH: int = 64
+    SENTIMENT_BATCH_WAIT_MS: int = 20     # Espera máxima para juntar textos de otros pedidos en el lote
     
     # Configuración de scoring
     SCORE_THRESHOLDS: dict = {
@@ -77,7 +135,43 @@ class Settings(BaseSettings):
     BCRA_API_URL: str = "https://api.estadisticasbcra.com"
     
     # Cache settings
-    CACHE_EXPIRY_MINUTES: int = 30
+    CACHE_EXPIRY_MINUTES: int = 30  # TTL por defecto de los namespaces sin TTL propio
+    CACHE_MAX_MB: int = 128         # Presupuesto de memoria del cache compartido
+    CACHE_TTL_MINUTES: dict = {
+        "prices": 30,
+        "indicators": 30,
+        "fmp_ratios": 24 * 60,      # Los ratios cambian con cada balance
+        "fmp_profile": 7 * 24 * 60,
+        "news": 60,
+        "macro": 6 * 60,            # Cache más largo para datos macro
+    }
+    # Antigüedad máxima (minutos más allá del TTL) con la que se sirve un dato vencido
+    # mientras se refresca en background o si el upstream está caído
+    CACHE_MAX_STALE_MINUTES: dict = {
+        "prices": 3 * 24 * 60,      # Cubre un fin de semana largo sin yfinance
+        "fmp_ratios": 30 * 24 * 60,
+        "fmp_profile": 30 * 24 * 60,
+        "news": 24 * 60,
+        "macro": 7 * 24 * 60,
+    }
+    
+    # Datos de mercado (yfinance)
+    MARKET_DATA_MAX_WORKERS: int = 8  # Threads para descargas bloqueantes
+    SYMBOL_CACHE_PATH: str = "data/symbol_resolution.json"
+    SYMBOL_RESOLUTION_TTL_DAYS: int = 30   # Vigencia de un sufijo resuelto
+    SYMBOL_NEGATIVE_TTL_HOURS: int = 24    # Vigencia de "sin datos" para un ticker
+    INDICATOR_STATE_DIR: str = "data/indicator_state"  # Estado incremental por ticker
+    PRICE_STORE_DIR: str = "data/prices"               # Histórico OHLCV local
+    PRICE_STORE_BOOTSTRAP_PERIOD: str = "2y"           # Descarga inicial de un ticker nuevo
+    
+    # Streaming intradiario de scores (SSE / WebSocket)
+    STREAM_FEED: str = "yfinance"        # "yfinance" (polling en vivo) o "replay" (barras guardadas)
+    STREAM_POLL_SECONDS: int = 60        # Intervalo de polling del feed en vivo
+    STREAM_QUEUE_SIZE: int = 256         # Mensajes pendientes por suscriptor antes de resincronizar
+    STREAM_REPLAY_DAYS: int = 60         # Barras finales que reproduce el feed de replay
+    STREAM_REPLAY_INTERVAL: float = 1.0  # Segundos entre ticks del replay (0 = sin pausa)
+    STREAM_RESTART_BASE_SECONDS: float = 1.0  # Espera inicial antes de reanudar un feed que falló
+    STREAM_RESTART_MAX_SECONDS: float = 60.0  # Tope del backoff exponencial entre reintentos
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
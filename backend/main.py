@@ -1,28 +1,53 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import uvicorn
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
 # Importar módulos propios
 from config.logging_config import setup_logging, get_logger
+from config.settings import settings
 from services.technical_analysis import TechnicalAnalyzer
 from services.fundamental_analysis import FundamentalAnalyzer
 from services.sentiment_analysis import SentimentAnalyzer
 from services.macro_analysis import MacroAnalyzer
 from services.recommendation_engine import RecommendationEngine
+from services.cache import CacheService
+from services.http_client import HttpClient
+from services.quota import QuotaLedger
+from services.singleflight import singleflight_stats
+from services.streaming import StreamingService
+from services.universe import Universe
 from models.schemas import RecommendationResponse, TickerAnalysis, ScoreBreakdown
 
 # Configurar logging
 setup_logging()
 logger = get_logger('argenta_ia.main')
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Abre el pool HTTP compartido y empieza a cargar el modelo de sentimiento en
+    background al iniciar (las requests no lo esperan); al apagar libera todo
+    """
+    await http_client.start()
+    if settings.SENTIMENT_WARMUP_ON_STARTUP:
+        sentiment_analyzer.start_warm_up()
+    yield
+    await streaming_service.stop()
+    await recommendation_engine.close_all_services()
+    await http_client.close()
+    quota_ledger.close()
+
 app = FastAPI(
     title="ArgentaIA Investment API",
     description="API para análisis de inversiones con AI - Técnico, Fundamental, Macro y Sentimiento",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS para el frontend
@@ -34,17 +59,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar servicios
-technical_analyzer = TechnicalAnalyzer()
-fundamental_analyzer = FundamentalAnalyzer()
-sentiment_analyzer = SentimentAnalyzer()
-macro_analyzer = MacroAnalyzer()
+# Inicializar servicios (todos comparten el mismo cache en memoria y el pool HTTP)
+cache_service = CacheService()
+quota_ledger = QuotaLedger()  # Un único registro de cuotas para FMP y GNews
+http_client = HttpClient()
+universe = Universe()  # Tickers de la corrida diaria y su mercado (define el símbolo en yfinance)
+technical_analyzer = TechnicalAnalyzer(cache=cache_service, universe=universe)
+fundamental_analyzer = FundamentalAnalyzer(cache=cache_service, quota=quota_ledger, http=http_client)
+sentiment_analyzer = SentimentAnalyzer(cache=cache_service, quota=quota_ledger, http=http_client)
+macro_analyzer = MacroAnalyzer(cache=cache_service, http=http_client)
 recommendation_engine = RecommendationEngine(
     technical_analyzer,
     fundamental_analyzer,
     sentiment_analyzer,
-    macro_analyzer
+    macro_analyzer,
+    universe=universe
 )
+streaming_service = StreamingService(technical_analyzer, universe=universe)
+
+# Comentario SSE para mantener viva la conexión a través de proxies
+SSE_KEEPALIVE_SECONDS = 15
 
 @app.get("/")
 async def root():
@@ -56,13 +90,17 @@ async def root():
     }
 
 @app.get("/api/recommendations/daily", response_model=List[RecommendationResponse])
-async def get_daily_recommendations():
+async def get_daily_recommendations(
+    limit: Optional[int] = Query(None, ge=1, description="Cantidad de recomendaciones (por defecto todas, o RECOMMENDATION_TOP_K si está configurado)")
+):
     """
     Obtiene las recomendaciones diarias de inversión con scoring completo
     """
     try:
         logger.info("Generando recomendaciones diarias...")
-        recommendations = await recommendation_engine.generate_daily_recommendations()
+        recommendations = await recommendation_engine.generate_daily_recommendations(limit)
+        # El streaming usa los scores no técnicos más recientes
+        streaming_service.update_context(recommendations)
         return recommendations
     except Exception as e:
         logger.error(f"Error generando recomendaciones: {str(e)}")
@@ -96,6 +134,97 @@ async def get_score_breakdown(ticker: str):
         logger.error(f"Error obteniendo breakdown de {ticker}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error obteniendo scores de {ticker}: {str(e)}")
 
+@app.get("/api/stream/scores")
+async def stream_scores():
+    """
+    Stream (SSE) de scores: un snapshot inicial y luego solo los campos del
+    ScoreBreakdown que cambian con cada barra nueva
+    """
+    subscription = streaming_service.subscribe()
+    
+    async def events():
+        try:
+            while True:
+                try:
+                    batch = await asyncio.wait_for(subscription.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                    yield "".join(f"data: {payload}\n\n" for payload in batch)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            streaming_service.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws/scores")
+async def websocket_scores(websocket: WebSocket):
+    """Mismos mensajes que /api/stream/scores sobre WebSocket"""
+    await websocket.accept()
+    subscription = streaming_service.subscribe()
+    
+    async def send() -> None:
+        while True:
+            for payload in await subscription.get():
+                await websocket.send_text(payload)
+    
+    async def receive() -> None:
+        # El cliente no manda nada, pero leer el socket detecta la desconexión
+        # aunque no haya cambios que enviarle
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning(f"WebSocket de scores cerrado: {str(error)}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        streaming_service.unsubscribe(subscription)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Métricas internas: uso de memoria y hits/misses/evictions del cache por
+    namespace, cuota restante por proveedor, cola de inferencia de sentimiento,
+    llamadas coalescidas, última corrida diaria y estado del streaming
+    """
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "cache": cache_service.stats(),
+        "quota": quota_ledger.stats(),
+        "rate_limiters": http_client.rate_limiter_stats(),
+        "http": http_client.stats(),
+        "sentiment_worker": sentiment_analyzer.worker.stats(),
+        "sentiment_cache": sentiment_analyzer.sentiment_cache.stats(),
+        "recommendations": recommendation_engine.run_stats(),
+        "singleflight": singleflight_stats(),
+        "streaming": streaming_service.stats()
+    }
+
+@app.get("/api/ready")
+async def readiness_check():
+    """
+    Readiness: 503 mientras el modelo de sentimiento carga; 200 cuando está
+    listo o cuando falló y queda el análisis por palabras clave (degradado)
+    """
+    model = sentiment_analyzer.readiness()
+    ready = model["state"] in ("ready", "failed")
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if model["state"] == "ready" else ("degraded" if ready else "starting"),
+            "timestamp": datetime.now().isoformat(),
+            "sentiment_model": model
+        }
+    )
+
 @app.get("/api/health")
 async def health_check():
     """
@@ -113,7 +242,10 @@ async def health_check():
     return {
         "status": "healthy" if all_healthy else "degraded",
         "timestamp": datetime.now().isoformat(),
-        "services": services_status
+        "services": services_status,
+        "quota": quota_ledger.stats(),
+        "sentiment_model": sentiment_analyzer.readiness(),
+        "streaming": streaming_service.stats()
     }
 
 if __name__ == "__main__":
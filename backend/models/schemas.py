@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -37,6 +37,11 @@ class ScoreBreakdown(BaseModel):
     news_sentiment: Optional[str] = None
     news_count: Optional[int] = None
     
+    # Momento de obtención de los datos de cada componente (pueden servirse vencidos)
+    data_freshness: Dict[str, Optional[datetime]] = Field(
+        default_factory=dict, description="technical/fundamental/sentiment/macro -> fecha de los datos"
+    )
+    
     timestamp: datetime = Field(default_factory=datetime.now)
 
 class RecommendationResponse(BaseModel):
@@ -61,6 +66,9 @@ class RecommendationResponse(BaseModel):
     # Datos para la UI
     color: str = Field(description="Color para la UI: green, yellow, red")
     summary: str = Field(description="Resumen de la recomendación")
+    data_freshness: Dict[str, Optional[datetime]] = Field(
+        default_factory=dict, description="technical/fundamental/sentiment/macro -> fecha de los datos"
+    )
     
     timestamp: datetime = Field(default_factory=datetime.now)
 
@@ -99,6 +107,9 @@ class TickerAnalysis(BaseModel):
 
 class TechnicalIndicators(BaseModel):
     """Indicadores técnicos específicos"""
+    # Los indicadores registrados en el pipeline técnico se agregan como campos extra
+    model_config = ConfigDict(extra="allow")
+    
     rsi: Optional[float] = None
     macd: Optional[float] = None
     macd_signal: Optional[float] = None
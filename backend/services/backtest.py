@@ -0,0 +1,159 @@
+"""
+Backtest walk-forward del score técnico
+
+Calcula el score técnico de cada barra de cada ticker de forma vectorizada
+(misma lógica que TechnicalAnalyzer._calculate_technical_score), simula las
+señales COMPRAR/MANTENER/VENDER según SCORE_THRESHOLDS y reporta aciertos y
+retornos por ticker.
+
+Uso:
+    python -m services.backtest --period 10y --horizon 20
+"""
+import argparse
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from services.indicator_pipeline import IndicatorPipeline, technical_pipeline
+from services.symbol_resolver import SymbolResolver
+from services.technical_analysis import TechnicalAnalyzer
+
+logger = logging.getLogger(__name__)
+
+BUY, HOLD, SELL = 1, 0, -1
+
+
+def score_series(data: pd.DataFrame, pipeline: IndicatorPipeline = technical_pipeline) -> pd.Series:
+    """Score técnico (0-100) de cada barra calculado en forma vectorizada"""
+    series = pipeline.compute(data, [
+        "rsi", "macd", "macd_signal", "macd_histogram",
+        "sma_20", "sma_50", "sma_200", "bollinger_upper", "bollinger_lower"
+    ])
+    price = data["Close"].to_numpy(dtype=float)
+    values = {name: series[name].to_numpy(dtype=float) for name in series}
+    
+    # Las comparaciones con NaN dan False, igual que en el cálculo escalar
+    with np.errstate(invalid="ignore"):
+        # RSI (30 puntos máximo)
+        rsi = values["rsi"]
+        score = np.select([rsi < 30, rsi < 50, rsi < 70, rsi >= 70], [25, 15, 20, 10], 0).astype(float)
+        
+        # MACD (25 puntos máximo)
+        macd_diff = values["macd"] - values["macd_signal"]
+        histogram = values["macd_histogram"]
+        score += np.select(
+            [(macd_diff > 0) & (histogram > 0), macd_diff > 0, (macd_diff < 0) & (histogram < 0)],
+            [25, 20, 5],
+            10
+        )
+        
+        # Medias móviles (25 puntos máximo)
+        # Se normaliza por las SMA disponibles (las NaN por falta de histórico no cuentan)
+        smas = [values[name] for name in ("sma_20", "sma_50", "sma_200")]
+        ma_signals = sum((price > sma).astype(float) for sma in smas)
+        ma_count = sum((~np.isnan(sma)).astype(float) for sma in smas)
+        score += np.divide(ma_signals * 25, ma_count, out=np.zeros_like(price), where=ma_count > 0)
+        
+        # Bollinger Bands (20 puntos máximo)
+        upper, lower = values["bollinger_upper"], values["bollinger_lower"]
+        middle = (upper + lower) / 2
+        score += np.select([price < lower, price > upper, price > middle], [20, 5, 15], 10)
+    
+    return pd.Series(np.round(np.minimum(score, 100), 2), index=data.index, name="technical_score")
+
+
+def signals_from_scores(scores: pd.Series, thresholds: Optional[Dict[str, float]] = None) -> pd.Series:
+    """Convierte scores en señales BUY (1), HOLD (0) y SELL (-1)"""
+    thresholds = thresholds or settings.SCORE_THRESHOLDS
+    values = scores.to_numpy()
+    signals = np.select([values >= thresholds["buy"], values >= thresholds["hold"]], [BUY, HOLD], SELL)
+    return pd.Series(signals, index=scores.index, name="signal")
+
+
+def backtest_ticker(data: pd.DataFrame, horizon: int = 20, warmup: int = 50,
+                    thresholds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Backtest de un ticker
+    - Aciertos: una señal BUY acierta si el retorno a `horizon` barras es positivo,
+      una señal SELL si es negativo
+    - Estrategia: comprado desde la barra siguiente a un BUY hasta la siguiente a un
+      SELL (HOLD mantiene la posición), comparada contra comprar y mantener
+    """
+    close = data["Close"].astype(float)
+    signals = signals_from_scores(score_series(data), thresholds).iloc[warmup:]
+    close = close.iloc[warmup:]
+    
+    forward = (close.shift(-horizon) / close - 1).to_numpy()
+    has_forward = ~np.isnan(forward)
+    is_buy = (signals.to_numpy() == BUY) & has_forward
+    is_sell = (signals.to_numpy() == SELL) & has_forward
+    
+    # Posición: 1 tras un BUY, 0 tras un SELL, se mantiene con HOLD
+    position = signals.replace({HOLD: np.nan, SELL: 0}).ffill().fillna(0)
+    daily_returns = close.pct_change().fillna(0)
+    strategy_returns = position.shift(1).fillna(0) * daily_returns
+    
+    return {
+        "bars": int(len(close)),
+        "buy_signals": int(is_buy.sum()),
+        "sell_signals": int(is_sell.sum()),
+        "buy_hit_rate": float((forward[is_buy] > 0).mean()) if is_buy.any() else None,
+        "sell_hit_rate": float((forward[is_sell] < 0).mean()) if is_sell.any() else None,
+        "avg_return_after_buy": float(forward[is_buy].mean()) if is_buy.any() else None,
+        "avg_return_after_sell": float(forward[is_sell].mean()) if is_sell.any() else None,
+        "trades": int((position.diff().fillna(0) != 0).sum()),
+        "exposure": float(position.mean()),
+        "strategy_return": float((1 + strategy_returns).prod() - 1),
+        "buy_and_hold_return": float(close.iloc[-1] / close.iloc[0] - 1) if len(close) else None
+    }
+
+
+def run_backtest(frames: Dict[str, pd.DataFrame], horizon: int = 20, warmup: int = 50) -> pd.DataFrame:
+    """Backtest de todos los tickers; una fila por ticker"""
+    rows = {}
+    for ticker, data in frames.items():
+        if data is None or len(data) <= warmup + horizon:
+            logger.warning(f"Histórico insuficiente para backtest de {ticker}")
+            continue
+        rows[ticker] = backtest_ticker(data, horizon=horizon, warmup=warmup)
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def load_history(tickers: List[str], period: str) -> Dict[str, pd.DataFrame]:
+    """Descarga en bloque el histórico de los tickers (usa los símbolos ya resueltos)"""
+    resolver = SymbolResolver()
+    symbols = {}
+    for ticker in tickers:
+        known, symbol = resolver.lookup(ticker)
+        if not known or symbol:
+            symbols[ticker] = symbol or resolver.preferred(ticker)
+    
+    frames = TechnicalAnalyzer.download_frames(list(symbols.values()), period=period)
+    return {ticker: frames[symbol] for ticker, symbol in symbols.items() if symbol in frames}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest del score técnico de ArgentaIA")
+    parser.add_argument("--period", default="10y", help="Histórico a descargar (ej: 5y, 10y, max)")
+    parser.add_argument("--horizon", type=int, default=20, help="Barras para medir el acierto de cada señal")
+    parser.add_argument("--tickers", nargs="*", default=settings.ARGENTINE_TICKERS)
+    args = parser.parse_args()
+    
+    frames = load_history(args.tickers, args.period)
+    
+    start = time.perf_counter()
+    report = run_backtest(frames, horizon=args.horizon)
+    elapsed = time.perf_counter() - start
+    
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.3f}".format):
+        print(report)
+    total_bars = int(report["bars"].sum()) if not report.empty else 0
+    print(f"\n{len(report)} tickers, {total_bars} barras en {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+import pandas as pd
+from pydantic import BaseModel
+
+from config.settings import settings
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """Tamaño aproximado en bytes de un valor cacheado (recorre contenedores y modelos)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes  # Arrays de numpy y PriceSeries
+    if isinstance(value, BaseModel):
+        return sys.getsizeof(value) + estimate_size(value.__dict__)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _Entry(NamedTuple):
+    value: Any
+    fetched_at: datetime
+    expires: datetime      # Fin de la vigencia (TTL)
+    stale_until: datetime  # Hasta cuándo se puede servir vencido
+    size: int
+
+
+class _NamespaceStats:
+    __slots__ = ("hits", "stale_hits", "misses", "refreshes", "evictions", "entries", "bytes")
+    
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.entries = 0
+        self.bytes = 0
+
+
+class CacheService:
+    """
+    Cache en memoria compartido por todos los analizadores
+    - Cada namespace (prices, fmp_ratios, news, macro...) tiene su propio TTL
+    - Un único LRU con presupuesto global de bytes: al superarlo se descartan
+      las entradas usadas hace más tiempo, sin importar el namespace
+    - Stale-while-revalidate: vencido el TTL, get_or_load sirve el último valor
+      bueno y lo refresca en background, hasta la antigüedad máxima del namespace
+    - Contadores de hits/misses/evictions por namespace para dimensionarlo
+    """
+    
+    def __init__(self, max_bytes: Optional[int] = None, ttls: Optional[Dict[str, int]] = None,
+                 max_stale: Optional[Dict[str, int]] = None):
+        self.max_bytes = max_bytes or settings.CACHE_MAX_MB * 1024 * 1024
+        # TTL en minutos por namespace; el resto usa CACHE_EXPIRY_MINUTES
+        self.ttls = {**settings.CACHE_TTL_MINUTES, **(ttls or {})}
+        # Minutos más allá del TTL en que se sirve el dato vencido; sin entrada = 0
+        self.max_stale = {**settings.CACHE_MAX_STALE_MINUTES, **(max_stale or {})}
+        self.nbytes = 0
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._stats: Dict[str, _NamespaceStats] = {}
+        # Cargas concurrentes de la misma clave comparten un solo loader
+        self._loads = SingleFlight("cache")
+        # Refrescos en background en curso (uno por clave; guarda la referencia para el GC)
+        self._background: Dict[Tuple[str, str], asyncio.Task] = {}
+        # Se usa desde el event loop y desde los threads de los executors
+        self._lock = threading.Lock()
+    
+    def _namespace_stats(self, namespace: str) -> _NamespaceStats:
+        if namespace not in self._stats:
+            self._stats[namespace] = _NamespaceStats()
+        return self._stats[namespace]
+    
+    def ttl(self, namespace: str) -> timedelta:
+        return timedelta(minutes=self.ttls.get(namespace, settings.CACHE_EXPIRY_MINUTES))
+    
+    def max_staleness(self, namespace: str) -> timedelta:
+        return timedelta(minutes=self.max_stale.get(namespace, 0))
+    
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        stats = self._namespace_stats(key[0])
+        stats.entries -= 1
+        stats.bytes -= entry.size
+        self.nbytes -= entry.size
+    
+    def _lookup(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        """Entrada vigente o vencida todavía servible; descarta las demasiado viejas"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if datetime.now() >= entry.stale_until:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Devuelve el valor si está cacheado y vigente (None si no)"""
+        with self._lock:
+            stats = self._namespace_stats(namespace)
+            entry = self._lookup((namespace, key))
+            if entry is None or datetime.now() >= entry.expires:
+                stats.misses += 1
+                return None
+            stats.hits += 1
+            return entry.value
+    
+    def get_stale(self, namespace: str, key: str) -> Optional[Any]:
+        """Último valor bueno, vigente o vencido dentro de la antigüedad máxima"""
+        with self._lock:
+            entry = self._lookup((namespace, key))
+            return entry.value if entry is not None else None
+    
+    def fetched_at(self, namespace: str, key: str) -> Optional[datetime]:
+        """Momento en que se obtuvo el valor cacheado, para informar su frescura"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            return entry.fetched_at if entry is not None else None
+    
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[timedelta] = None) -> None:
+        """Guarda un valor (None no se cachea) y aplica el presupuesto de memoria"""
+        if value is None:
+            return
+        full_key = (namespace, key)
+        size = estimate_size(value)
+        with self._lock:
+            if full_key in self._entries:
+                self._remove(full_key)
+            if size > self.max_bytes:
+                logger.warning(f"{namespace}/{key} ({size} bytes) excede el presupuesto del cache")
+                return
+            
+            now = datetime.now()
+            expires = now + (ttl or self.ttl(namespace))
+            self._entries[full_key] = _Entry(value, now, expires, expires + self.max_staleness(namespace), size)
+            stats = self._namespace_stats(namespace)
+            stats.entries += 1
+            stats.bytes += size
+            self.nbytes += size
+            
+            while self.nbytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._namespace_stats(oldest[0]).evictions += 1
+    
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._remove((namespace, key))
+    
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Vacía un namespace (o todo el cache)"""
+        with self._lock:
+            for key in [k for k in self._entries if namespace is None or k[0] == namespace]:
+                self._remove(key)
+    
+    async def get_or_load(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[timedelta] = None) -> Any:
+        """
+        Devuelve el valor cacheado o lo obtiene con `loader`
+        - Vigente: se devuelve directo
+        - Vencido dentro de la antigüedad máxima: se devuelve ya y se refresca en background
+        - Si `loader` devuelve None (upstream caído, sin cuota...) se conserva y
+          se devuelve el último valor bueno en vez de pisarlo
+        Los llamadores concurrentes con la misma clave esperan una única carga
+        """
+        with self._lock:
+            stats = self._namespace_stats(namespace)
+            entry = self._lookup((namespace, key))
+            if entry is not None and datetime.now() < entry.expires:
+                stats.hits += 1
+                return entry.value
+            if entry is not None:
+                stats.stale_hits += 1
+            else:
+                stats.misses += 1
+        
+        async def load() -> Any:
+            loaded = await loader()
+            if loaded is None:
+                return self.get_stale(namespace, key)
+            self.set(namespace, key, loaded, ttl)
+            return loaded
+        
+        if entry is None:
+            return await self._loads.do((namespace, key), load)
+        
+        self._refresh_in_background(namespace, key, load)
+        return entry.value
+    
+    def _refresh_in_background(self, namespace: str, key: str, load: Callable[[], Awaitable[Any]]) -> None:
+        """Lanza el refresco de una entrada vencida sin bloquear al llamador"""
+        async def refresh() -> None:
+            try:
+                await self._loads.do((namespace, key), load)
+            except Exception as e:
+                logger.error(f"Error refrescando {namespace}/{key} en background: {str(e)}")
+        
+        full_key = (namespace, key)
+        if full_key in self._background or self._loads.is_inflight(full_key):
+            return
+        self._namespace_stats(namespace).refreshes += 1
+        self._background[full_key] = asyncio.ensure_future(refresh())
+        self._background[full_key].add_done_callback(lambda _: self._background.pop(full_key, None))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Uso de memoria y contadores por namespace"""
+        with self._lock:
+            return {
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "entries": len(self._entries),
+                "background_refreshes": len(self._background),
+                "namespaces": {
+                    namespace: {
+                        "entries": stats.entries,
+                        "bytes": stats.bytes,
+                        "hits": stats.hits,
+                        "stale_hits": stats.stale_hits,
+                        "misses": stats.misses,
+                        "refreshes": stats.refreshes,
+                        "evictions": stats.evictions,
+                        "hit_rate": round((stats.hits + stats.stale_hits) / (stats.hits + stats.stale_hits + stats.misses), 3)
+                        if stats.hits + stats.stale_hits + stats.misses else None,
+                        "ttl_seconds": int(self.ttl(namespace).total_seconds()),
+                        "max_stale_seconds": int(self.max_staleness(namespace).total_seconds())
+                    }
+                    for namespace, stats in self._stats.items()
+                }
+            }
@@ -1,99 +1,163 @@
 import asyncio
-import aiohttp
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
 from config.settings import settings
 from models.schemas import FundamentalRatios
+from services.cache import CacheService
+from services.fundamentals_store import FundamentalsStore
+from services.http_client import HttpClient
+from services.quota import QuotaLedger
 
 logger = logging.getLogger(__name__)
 
 class FundamentalAnalyzer:
     """Analizador de datos fundamentales usando FMP API"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[CacheService] = None, quota: Optional[QuotaLedger] = None,
+                 http: Optional[HttpClient] = None):
         self.base_url = settings.FMP_BASE_URL
         self.api_key = settings.FMP_API_KEY
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.last_request_time = {}  # Para rate limiting
+        # Pool HTTP compartido de la app (o uno propio si se usa el servicio suelto)
+        self.http = http or HttpClient()
+        self._owns_http = http is None
+        self.cache = cache or CacheService()  # Namespaces "fmp_ratios" y "fmp_profile"
+        # Histórico de ratios por período (los balances cambian pocas veces al año)
+        self.fundamentals_store = FundamentalsStore()
+        # Última consulta a FMP de los ratios que se están usando, por ticker
+        self.ratios_checked_at: Dict[str, datetime] = {}
+        self.quota = quota or QuotaLedger()  # Cuota diaria (FMP_DAILY_LIMIT)
         
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """Obtiene o crea una sesión HTTP"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30)
-            )
-        return self.session
-    
     async def _make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
         """Hace una request a la API de FMP con rate limiting"""
         if not self.api_key:
             logger.warning("FMP API key no configurada")
             return None
             
-        # Rate limiting básico
-        now = datetime.now()
-        if endpoint in self.last_request_time:
-            time_since_last = (now - self.last_request_time[endpoint]).total_seconds()
-            if time_since_last < 1:  # Min 1 segundo entre requests al mismo endpoint
-                await asyncio.sleep(1 - time_since_last)
-        
-        self.last_request_time[endpoint] = now
-        
         url = f"{self.base_url}/{endpoint}"
         params = params or {}
         params['apikey'] = self.api_key
         
         try:
-            session = await self._get_session()
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data
-                elif response.status == 429:
-                    logger.warning(f"Rate limit alcanzado para FMP API: {endpoint}")
-                    return None
-                else:
-                    logger.error(f"Error en FMP API: {response.status} - {await response.text()}")
-                    return None
+            response = await self.http.get_json("fmp", url, params, quota=self.quota)
+            if response.status == 200:
+                return response.data
+            elif response.status == 429:
+                logger.warning(f"Rate limit alcanzado para FMP API: {endpoint}")
+                return None
+            elif response.no_quota:
+                logger.warning(f"Sin cuota de FMP para {endpoint} (restan {self.quota.remaining('fmp')} en el día)")
+                return None
+            elif response.status == 0:
+                logger.error(f"Error conectando a FMP API: {response.error}")
+                return None
+            else:
+                logger.error(f"Error en FMP API: {response.status} - {response.error}")
+                return None
                     
         except Exception as e:
             logger.error(f"Error conectando a FMP API: {str(e)}")
             return None
     
     async def get_financial_ratios(self, ticker: str) -> Optional[FundamentalRatios]:
-        """Obtiene ratios financieros de un ticker"""
+        """Obtiene ratios financieros de un ticker (cacheados)"""
+        return await self.cache.get_or_load("fmp_ratios", ticker, lambda: self._fetch_financial_ratios(ticker))
+    
+    async def _fetch_financial_ratios(self, ticker: str) -> Optional[FundamentalRatios]:
+        """
+        Ratios del último período reportado, desde el histórico local
+        Solo se consulta FMP cuando se espera un balance nuevo; si la consulta
+        falla se sigue usando el último período guardado
+        """
         try:
-            # Obtener ratios clave
-            ratios_data = await self._make_request(f"ratios/{ticker}")
+            record = await asyncio.to_thread(self.fundamentals_store.load, ticker)
             
-            if not ratios_data or not isinstance(ratios_data, list) or len(ratios_data) == 0:
+            if self.fundamentals_store.needs_refresh(record):
+                ratios_data = await self._make_request(f"ratios/{ticker}")
+                if ratios_data and isinstance(ratios_data, list):
+                    record = await asyncio.to_thread(self.fundamentals_store.merge, ticker, ratios_data)
+            
+            latest_ratios = self.fundamentals_store.latest(record)
+            if latest_ratios is None:
                 logger.warning(f"No se encontraron ratios para {ticker}")
                 return None
+            
+            checked_at = self.fundamentals_store.checked_at(record)
+            if checked_at is not None:
+                self.ratios_checked_at[ticker] = checked_at
                 
-            # Tomar los datos más recientes (primer elemento)
-            latest_ratios = ratios_data[0]
-            
-            return FundamentalRatios(
-                pe_ratio=latest_ratios.get('priceEarningsRatio'),
-                pb_ratio=latest_ratios.get('priceToBookRatio'),
-                roe=latest_ratios.get('returnOnEquity'),
-                roa=latest_ratios.get('returnOnAssets'),
-                debt_to_equity=latest_ratios.get('debtEquityRatio'),
-                current_ratio=latest_ratios.get('currentRatio'),
-                quick_ratio=latest_ratios.get('quickRatio'),
-                gross_margin=latest_ratios.get('grossProfitMargin'),
-                operating_margin=latest_ratios.get('operatingProfitMargin'),
-                net_margin=latest_ratios.get('netProfitMargin'),
-            )
+            return self._ratios_from_row(latest_ratios)
             
         except Exception as e:
             logger.error(f"Error obteniendo ratios fundamentales para {ticker}: {str(e)}")
             return None
     
+    async def get_ratio_history(self, ticker: str) -> List[FundamentalRatios]:
+        """Serie histórica de ratios guardada para un ticker (del período más reciente al más antiguo)"""
+        record = await asyncio.to_thread(self.fundamentals_store.load, ticker)
+        return [self._ratios_from_row(row) for row in self.fundamentals_store.history(record)]
+    
+    @staticmethod
+    def _ratios_from_row(row: Dict[str, Any]) -> FundamentalRatios:
+        """Convierte un registro de ratios de FMP al modelo interno"""
+        return FundamentalRatios(
+            pe_ratio=row.get('priceEarningsRatio'),
+            pb_ratio=row.get('priceToBookRatio'),
+            roe=row.get('returnOnEquity'),
+            roa=row.get('returnOnAssets'),
+            debt_to_equity=row.get('debtEquityRatio'),
+            current_ratio=row.get('currentRatio'),
+            quick_ratio=row.get('quickRatio'),
+            gross_margin=row.get('grossProfitMargin'),
+            operating_margin=row.get('operatingProfitMargin'),
+            net_margin=row.get('netProfitMargin'),
+        )
+    
     async def get_company_profile(self, ticker: str) -> Optional[Dict[str, Any]]:
-        """Obtiene el perfil de la empresa"""
+        """Obtiene el perfil de la empresa (cacheado)"""
+        return await self.cache.get_or_load("fmp_profile", ticker, lambda: self._fetch_company_profile(ticker))
+    
+    async def prefetch_profiles(self, tickers: Optional[List[str]] = None) -> int:
+        """
+        Carga en bloque los perfiles de los tickers soportados que no estén vigentes en cache
+        El endpoint profile de FMP acepta símbolos separados por coma: una request
+        cada FMP_BATCH_SIZE tickers en vez de una por ticker. Los que no vengan en
+        la respuesta se consultan luego individualmente en get_company_profile
+        """
+        tickers = [
+            t for t in (tickers or settings.FMP_SUPPORTED_TICKERS)
+            if t in settings.FMP_SUPPORTED_TICKERS and self.cache.get("fmp_profile", t) is None
+        ]
+        if not tickers or not self.api_key:
+            return 0
+        
+        batch_size = settings.FMP_BATCH_SIZE
+        batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+        
+        try:
+            responses = await asyncio.gather(*(self._make_request(f"profile/{','.join(batch)}") for batch in batches))
+            
+            loaded = 0
+            requested = set(tickers)
+            for profiles in responses:
+                if not isinstance(profiles, list):
+                    continue
+                for profile in profiles:
+                    symbol = profile.get("symbol") if isinstance(profile, dict) else None
+                    if symbol in requested:
+                        self.cache.set("fmp_profile", symbol, profile)
+                        loaded += 1
+            
+            logger.info(f"Prefetch de perfiles FMP: {loaded}/{len(tickers)} en {len(batches)} requests")
+            return loaded
+        
+        except Exception as e:
+            logger.error(f"Error en descarga agrupada de perfiles FMP: {str(e)}")
+            return 0
+    
+    async def _fetch_company_profile(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Consulta el perfil de la empresa en FMP"""
         try:
             profile_data = await self._make_request(f"profile/{ticker}")
             
@@ -199,12 +263,16 @@ class FundamentalAnalyzer:
         # Calcular score
         fundamental_score = self._calculate_fundamental_score(ratios)
         
+        # Cuándo se consultó FMP por última vez (no cuándo se cargó el histórico local)
+        as_of = self.ratios_checked_at.get(ticker) if ratios else None
+        
         return {
             "ticker": ticker,
             "fundamental_score": fundamental_score,
             "ratios": ratios.dict() if ratios else None,
             "company_profile": profile,
             "supported": True,
+            "data_as_of": as_of.isoformat() if as_of else None,
             "timestamp": datetime.now().isoformat()
         }
     
@@ -223,6 +291,6 @@ class FundamentalAnalyzer:
             return False
     
     async def close(self):
-        """Cierra las conexiones"""
-        if self.session and not self.session.closed:
-            await self.session.close() 
\ No newline at end of file
+        """Cierra las conexiones (el pool compartido lo cierra la app)"""
+        if self._owns_http:
+            await self.http.close() 
\ No newline at end of file
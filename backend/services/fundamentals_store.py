@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Duración de cada tipo de período reportado por FMP
+PERIOD_LENGTH = {
+    "FY": timedelta(days=365),
+    "Q1": timedelta(days=91),
+    "Q2": timedelta(days=91),
+    "Q3": timedelta(days=91),
+    "Q4": timedelta(days=91),
+}
+
+
+class FundamentalsStore:
+    """
+    Histórico persistente de ratios fundamentales: un archivo JSON por ticker
+    Cada período reportado (fecha de cierre + FY/Qn) se guarda una sola vez y
+    se conserva la serie completa. Solo se vuelve a consultar FMP cuando se
+    espera un balance nuevo (cierre del período siguiente + demora de
+    presentación), como máximo una vez cada FUNDAMENTALS_RECHECK_HOURS, y
+    además cada FUNDAMENTALS_MAX_AGE_DAYS por si hubo correcciones
+    """
+    
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.FUNDAMENTALS_STORE_DIR)
+        self.filing_lag = timedelta(days=settings.FUNDAMENTALS_FILING_LAG_DAYS)
+        self.recheck = timedelta(hours=settings.FUNDAMENTALS_RECHECK_HOURS)
+        self.max_age = timedelta(days=settings.FUNDAMENTALS_MAX_AGE_DAYS)
+        self._lock = threading.Lock()
+    
+    def _path(self, ticker: str) -> Path:
+        return self.directory / f"{ticker}.json"
+    
+    @staticmethod
+    def period_key(row: Dict[str, Any]) -> Optional[str]:
+        """Clave del período de un registro de FMP: fecha de cierre y tipo (2024-12-31_FY)"""
+        date = row.get("date")
+        if not date:
+            return None
+        return f"{date}_{row.get('period') or 'FY'}"
+    
+    def load(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Lee el registro de un ticker: {"checked_at": ..., "periods": {clave: ratios}}"""
+        path = self._path(ticker)
+        try:
+            if path.exists():
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"Fundamentales guardados inválidos para {ticker}: {str(e)}")
+        return None
+    
+    def _save(self, ticker: str, record: Dict[str, Any]) -> None:
+        """Guarda el registro de un ticker de forma atómica"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(ticker)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def history(record: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Serie completa de períodos, del más reciente al más antiguo"""
+        if not record:
+            return []
+        return sorted(record.get("periods", {}).values(), key=lambda row: row.get("date", ""), reverse=True)
+    
+    def latest(self, record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        rows = self.history(record)
+        return rows[0] if rows else None
+    
+    def next_filing_expected(self, record: Optional[Dict[str, Any]]) -> Optional[datetime]:
+        """Desde cuándo puede aparecer el balance del período siguiente al último guardado"""
+        latest = self.latest(record)
+        if latest is None:
+            return None
+        try:
+            period_end = datetime.fromisoformat(latest["date"])
+        except (KeyError, ValueError):
+            return None
+        length = PERIOD_LENGTH.get(latest.get("period") or "FY", PERIOD_LENGTH["FY"])
+        return period_end + length + self.filing_lag
+    
+    @staticmethod
+    def checked_at(record: Optional[Dict[str, Any]]) -> Optional[datetime]:
+        """Última vez que se consultó FMP para el ticker (None si no consta)"""
+        try:
+            return datetime.fromisoformat(record["checked_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def needs_refresh(self, record: Optional[Dict[str, Any]], now: Optional[datetime] = None) -> bool:
+        """Indica si corresponde consultar FMP para un ticker"""
+        if not record or not record.get("periods"):
+            return True
+        now = now or datetime.now()
+        checked_at = self.checked_at(record)
+        if checked_at is None:
+            return True
+        
+        if now - checked_at >= self.max_age:
+            return True
+        
+        expected = self.next_filing_expected(record)
+        return expected is not None and now >= expected and now - checked_at >= self.recheck
+    
+    def merge(self, ticker: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Agrega los períodos recibidos de FMP al registro del ticker y marca la consulta
+        Devuelve el registro actualizado
+        """
+        with self._lock:
+            record = self.load(ticker) or {"ticker": ticker, "periods": {}}
+            new_periods = []
+            for row in rows:
+                key = self.period_key(row) if isinstance(row, dict) else None
+                if key is None:
+                    continue
+                if key not in record["periods"]:
+                    new_periods.append(key)
+                record["periods"][key] = row
+            
+            record["checked_at"] = datetime.now().isoformat()
+            if new_periods:
+                logger.info(f"Fundamentales de {ticker}: {len(new_periods)} períodos nuevos ({', '.join(sorted(new_periods)[-3:])})")
+            
+            try:
+                self._save(ticker, record)
+            except Exception as e:
+                logger.error(f"Error guardando fundamentales de {ticker}: {str(e)}")
+            return record
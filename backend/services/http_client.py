@@ -0,0 +1,275 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+import aiohttp
+
+from config.settings import settings
+from services.rate_limiter import TokenBucket, create_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamResponse(NamedTuple):
+    status: int                        # 0 si no hubo respuesta (error de red o sin cuota)
+    data: Any = None                   # JSON decodificado cuando status == 200
+    error: Optional[str] = None
+    retry_after: Optional[float] = None
+    no_quota: bool = False             # No se hizo la request porque no quedaba cuota
+    invalid_body: bool = False         # 200 con un cuerpo que no es JSON: reintentar no lo arregla
+    
+    @property
+    def final(self) -> bool:
+        """Respuesta definitiva: éxito, cuerpo inválido o 4xx distinto de 429"""
+        return self.status == 200 or self.invalid_body or (400 <= self.status < 500 and self.status != 429)
+    
+    @property
+    def quota_exhausted(self) -> bool:
+        """429 sin Retry-After o con uno largo: cuota del día agotada, no un límite por segundo"""
+        return self.status == 429 and (
+            self.retry_after is None or self.retry_after > settings.HTTP_MAX_RETRY_AFTER_SECONDS
+        )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos a esperar según un header Retry-After (segundos o fecha HTTP)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class _ProviderStats:
+    """Latencias recientes y contadores de resiliencia de un proveedor"""
+    
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=200)
+        self.requests = 0
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failures = 0
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95, p99 = (self.percentile(pct) for pct in (50, 95, 99))
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failures": self.failures,
+            "p50_ms": round(1000 * p50, 1) if p50 is not None else None,
+            "p95_ms": round(1000 * p95, 1) if p95 is not None else None,
+            "p99_ms": round(1000 * p99, 1) if p99 is not None else None,
+        }
+
+
+class HttpClient:
+    """
+    Cliente HTTP compartido por los servicios que consultan APIs (FMP, GNews, BCRA)
+    Una sola ClientSession con keep-alive, límite de conexiones por host, cache
+    de DNS y timeouts separados de conexión y lectura: el handshake TLS se paga
+    una vez por host y no en cada ráfaga. La app la abre y cierra en el lifespan.
+    Los rate limiters de los proveedores viven con el cliente (no a nivel módulo),
+    así sus locks no sobreviven al event loop que los usó
+    """
+    
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+        self._providers: Dict[str, _ProviderStats] = {}
+        self._limiters: Dict[str, TokenBucket] = {}
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_SECONDS,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=settings.HTTP_TOTAL_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            sock_read=settings.HTTP_READ_TIMEOUT
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={"User-Agent": settings.APP_NAME}
+        )
+    
+    async def start(self) -> None:
+        """Abre la sesión (idempotente)"""
+        await self.session()
+    
+    async def session(self) -> aiohttp.ClientSession:
+        """Sesión compartida; se crea la primera vez (o si se cerró) para usos fuera de la app"""
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    self._session = self._create_session()
+                    logger.info("Sesión HTTP compartida abierta")
+        return self._session
+    
+    async def close(self) -> None:
+        """Cierra la sesión y sus conexiones"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Sesión HTTP compartida cerrada")
+        self._session = None
+    
+    def _provider(self, provider: str) -> _ProviderStats:
+        if provider not in self._providers:
+            self._providers[provider] = _ProviderStats()
+        return self._providers[provider]
+    
+    def rate_limiter(self, provider: str) -> TokenBucket:
+        """Token bucket del proveedor (un bucket por proveedor, compartido por los servicios)"""
+        if provider not in self._limiters:
+            self._limiters[provider] = create_rate_limiter(provider)
+        return self._limiters[provider]
+    
+    def rate_limiter_stats(self) -> List[Dict[str, Any]]:
+        """Contadores de los rate limiters creados"""
+        return [limiter.stats() for limiter in self._limiters.values()]
+    
+    async def _acquire(self, provider: str, quota) -> bool:
+        """Reserva cuota (si el proveedor la tiene) y espera turno en su rate limiter"""
+        if quota is not None and not quota.try_acquire(provider):
+            return False
+        if provider in settings.RATE_LIMITS:
+            await self.rate_limiter(provider).acquire()
+        return True
+    
+    async def _fetch(self, provider: str, url: str, params: Optional[Dict[str, Any]]) -> UpstreamResponse:
+        """Un intento de GET; los errores de red y los JSON inválidos se devuelven como status 0"""
+        start = time.monotonic()
+        try:
+            session = await self.session()
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    body = await response.read()
+                    self._provider(provider).latencies.append(time.monotonic() - start)
+                    try:
+                        return UpstreamResponse(200, json.loads(body))
+                    except ValueError:  # Incluye UnicodeDecodeError
+                        return UpstreamResponse(0, error=f"JSON inválido: {body[:200]!r}", invalid_body=True)
+                return UpstreamResponse(
+                    response.status,
+                    error=(await response.text())[:200],
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
+        except asyncio.TimeoutError:
+            return UpstreamResponse(0, error="timeout")
+        except aiohttp.ClientError as e:
+            return UpstreamResponse(0, error=str(e) or type(e).__name__)
+    
+    async def _hedged_fetch(self, provider: str, url: str, params: Optional[Dict[str, Any]],
+                            quota) -> UpstreamResponse:
+        """
+        Si la primera request tarda más que el percentil configurado del proveedor,
+        lanza una segunda (si hay cuota) y se queda con la primera respuesta útil
+        """
+        stats = self._provider(provider)
+        first = asyncio.ensure_future(self._fetch(provider, url, params))
+        percentile = settings.HTTP_HEDGE_PERCENTILES.get(provider)
+        if percentile is None or len(stats.latencies) < settings.HTTP_HEDGE_MIN_SAMPLES:
+            return await first
+        
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait({first}, timeout=stats.percentile(percentile))
+            if done or not await self._acquire(provider, quota) or first.done():
+                return await first
+            
+            stats.hedged += 1
+            second = asyncio.ensure_future(self._fetch(provider, url, params))
+            tasks.append(second)
+            pending = set(tasks)
+            result = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    # Una respuesta definitiva (200, 4xx salvo 429): no vale la pena esperar al otro
+                    if result.final:
+                        if task is second:
+                            stats.hedge_wins += 1
+                        return result
+            return result
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    async def get_json(self, provider: str, url: str, params: Optional[Dict[str, Any]] = None,
+                       quota=None) -> UpstreamResponse:
+        """
+        GET resiliente contra una API externa
+        - Reintenta 5xx, 429 y errores de red con backoff exponencial y jitter completo
+          (HTTP_MAX_RETRIES); un 200 con JSON inválido no se reintenta. Ante 429 respeta
+          un Retry-After corto; sin Retry-After o con uno mayor a HTTP_MAX_RETRY_AFTER_SECONDS
+          es cuota agotada: se marca en el ledger y se devuelve el 429
+        - Cubre las requests lentas de los proveedores de HTTP_HEDGE_PERCENTILES
+        - Cada intento y cada request de cobertura pasan por la cuota y el rate
+          limiter del proveedor: sin cuota no se reintenta ni se cubre
+        """
+        stats = self._provider(provider)
+        stats.requests += 1
+        result = UpstreamResponse(0, error=f"Sin cuota de {provider}", no_quota=True)
+        
+        for attempt in range(settings.HTTP_MAX_RETRIES + 1):
+            if not await self._acquire(provider, quota):
+                break
+            if attempt > 0:
+                stats.retries += 1
+            
+            result = await self._hedged_fetch(provider, url, params, quota)
+            if result.final:
+                return result
+            if result.quota_exhausted:
+                # El proveedor ya rechazó el día: reintentar solo gastaría cuota
+                if quota is not None:
+                    quota.exhaust(provider)
+                break
+            if attempt == settings.HTTP_MAX_RETRIES:
+                break
+            
+            delay = result.retry_after if result.status == 429 else None
+            if delay is None:
+                delay = random.uniform(0, min(settings.HTTP_BACKOFF_MAX_SECONDS,
+                                              settings.HTTP_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            logger.warning(f"Reintentando {provider} ({result.status or result.error}) en {delay:.2f}s")
+            await asyncio.sleep(delay)
+        
+        stats.failures += 1
+        return result
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": self._session is not None and not self._session.closed,
+            "limit": settings.HTTP_POOL_LIMIT,
+            "limit_per_host": settings.HTTP_POOL_LIMIT_PER_HOST,
+            "providers": {name: stats.to_dict() for name, stats in self._providers.items()},
+        }
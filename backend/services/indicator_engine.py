@@ -0,0 +1,54 @@
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from models.schemas import TechnicalIndicators
+from services.indicator_pipeline import IndicatorPipeline, technical_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+def align_right(series: List[np.ndarray]) -> np.ndarray:
+    """
+    Alinea series de distinto largo en una matriz 2D (tickers x barras)
+    Cada fila queda alineada a la derecha (última barra en la última columna)
+    y se rellena con NaN a la izquierda
+    """
+    length = max((len(s) for s in series), default=0)
+    matrix = np.full((len(series), length), np.nan, dtype=np.float64)
+    for i, values in enumerate(series):
+        if len(values):
+            matrix[i, length - len(values):] = values
+    return matrix
+
+
+def compute_indicators_batch(frames: Dict[str, pd.DataFrame],
+                             pipeline: IndicatorPipeline = technical_pipeline) -> Dict[str, TechnicalIndicators]:
+    """
+    Calcula los indicadores técnicos de todos los tickers en pocas pasadas vectorizadas
+    Recibe los históricos por ticker (columnas Close y Volume), evalúa el grafo
+    del pipeline sobre la matriz de todo el universo y devuelve un
+    TechnicalIndicators por ticker con los valores de la última barra de cada
+    indicador registrado
+    """
+    tickers = [t for t, frame in frames.items() if frame is not None and not frame.empty]
+    if not tickers:
+        return {}
+    
+    inputs = {
+        name: align_right([frames[t][column].to_numpy(dtype=np.float64) for t in tickers])
+        for name, column in pipeline.INPUTS.items()
+    }
+    values = pipeline.compute_matrix(inputs)
+    latest = {name: values[name][:, -1] for name in pipeline.indicators}
+    
+    results = {}
+    for i, ticker in enumerate(tickers):
+        fields = {name: float(column[i]) for name, column in latest.items()}
+        # Sin ventana de volumen completa no hay promedio (como el cálculo pandas original)
+        if "volume_sma" in fields and np.isnan(fields["volume_sma"]):
+            fields["volume_sma"] = None
+        results[ticker] = TechnicalIndicators(**fields)
+    return results
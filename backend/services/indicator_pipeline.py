@@ -0,0 +1,204 @@
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+
+def ewm_mean(matrix: np.ndarray, span: int) -> np.ndarray:
+    """
+    EWM por filas equivalente a pandas ewm(span=span).mean() (adjust=True)
+    Recorre las barras una vez, vectorizado sobre todos los tickers
+    """
+    decay = 1 - 2 / (span + 1)
+    out = np.full(matrix.shape, np.nan)
+    numerator = np.zeros(matrix.shape[0])
+    denominator = np.zeros(matrix.shape[0])
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for t in range(matrix.shape[1]):
+            column = matrix[:, t]
+            valid = ~np.isnan(column)
+            numerator = numerator * decay + np.where(valid, column, 0.0)
+            denominator = denominator * decay + valid
+            out[:, t] = numerator / denominator
+    return out
+
+
+def rolling(matrix: np.ndarray, window: int, reducer: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """
+    Ventana móvil por filas; NaN mientras la ventana no esté completa (o incluya
+    relleno), igual que pandas rolling(window) con min_periods=window
+    """
+    out = np.full(matrix.shape, np.nan)
+    if matrix.shape[1] >= window:
+        out[:, window - 1:] = reducer(sliding_window_view(matrix, window, axis=1))
+    return out
+
+
+class IndicatorPipeline:
+    """
+    Grafo de indicadores técnicos con dependencias declaradas
+    Cada nodo (primitiva o indicador) se calcula una sola vez por request y su
+    serie se comparte con todos los nodos que dependen de él. Los nodos operan
+    sobre matrices (tickers x barras), así el mismo grafo da las series de un
+    ticker (backtest) y la última barra de todo el universo (indicator_engine)
+    """
+    
+    # Series de entrada disponibles para todos los nodos
+    INPUTS = {"close": "Close", "volume": "Volume"}
+    
+    def __init__(self):
+        self._nodes: Dict[str, Tuple[Tuple[str, ...], Callable[..., np.ndarray]]] = {}
+        self._indicators: List[str] = []
+    
+    def register(self, name: str, deps: Iterable[str], func: Callable[..., np.ndarray]) -> str:
+        """
+        Registra un indicador que se calcula como func(*matrices de sus dependencias)
+        Los indicadores registrados son la salida del pipeline: los reciben el
+        análisis técnico, la corrida diaria y el backtest
+        """
+        if name in self._nodes or name in self.INPUTS:
+            raise ValueError(f"Indicador ya registrado: {name}")
+        self._nodes[name] = (tuple(deps), func)
+        self._indicators.append(name)
+        return name
+    
+    def _primitive(self, name: str, deps: Iterable[str], func: Callable[..., np.ndarray]) -> str:
+        """Registra una primitiva solo si no existe (mismo nombre = mismo cálculo)"""
+        if name not in self._nodes:
+            self._nodes[name] = (tuple(deps), func)
+        return name
+    
+    # Primitivas compartidas: el nombre codifica los parámetros
+    
+    def diff(self, source: str) -> str:
+        def func(s):
+            out = np.full(s.shape, np.nan)
+            out[:, 1:] = s[:, 1:] - s[:, :-1]
+            return out
+        return self._primitive(f"diff({source})", [source], func)
+    
+    def gain(self, source: str) -> str:
+        # Como delta.where(delta > 0, 0) en pandas: el primer diff (NaN) cuenta como 0;
+        # el relleno a la izquierda de las filas cortas sigue siendo NaN
+        return self._primitive(
+            f"gain({source})", [self.diff(source), source],
+            lambda d, s: np.where(np.isnan(s), np.nan, np.where(d > 0, d, 0.0))
+        )
+    
+    def loss(self, source: str) -> str:
+        return self._primitive(
+            f"loss({source})", [self.diff(source), source],
+            lambda d, s: np.where(np.isnan(s), np.nan, np.where(d < 0, -d, 0.0))
+        )
+    
+    def rolling_mean(self, source: str, window: int) -> str:
+        return self._primitive(
+            f"rolling_mean({source},{window})", [source],
+            lambda s: rolling(s, window, lambda w: w.mean(axis=-1))
+        )
+    
+    def rolling_std(self, source: str, window: int) -> str:
+        return self._primitive(
+            f"rolling_std({source},{window})", [source],
+            lambda s: rolling(s, window, lambda w: w.std(axis=-1, ddof=1))
+        )
+    
+    def ewm(self, source: str, span: int) -> str:
+        return self._primitive(f"ewm({source},{span})", [source], lambda s: ewm_mean(s, span))
+    
+    @property
+    def names(self) -> List[str]:
+        return list(self._nodes)
+    
+    @property
+    def indicators(self) -> List[str]:
+        """Indicadores registrados (sin las primitivas intermedias)"""
+        return list(self._indicators)
+    
+    def compute_matrix(self, inputs: Dict[str, np.ndarray],
+                       targets: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Calcula las matrices pedidas (por defecto todos los indicadores) resolviendo el grafo
+        `inputs` tiene una matriz tickers x barras por entrada (ver INPUTS), con las
+        filas cortas rellenas con NaN a la izquierda. Devuelve también las
+        intermedias calculadas en el camino
+        """
+        values: Dict[str, np.ndarray] = dict(inputs)
+        in_progress = set()
+        
+        def resolve(name: str) -> np.ndarray:
+            if name in values:
+                return values[name]
+            if name not in self._nodes:
+                raise KeyError(f"Indicador desconocido: {name}")
+            if name in in_progress:
+                raise ValueError(f"Dependencia circular en {name}")
+            
+            in_progress.add(name)
+            deps, func = self._nodes[name]
+            values[name] = func(*(resolve(dep) for dep in deps))
+            in_progress.discard(name)
+            return values[name]
+        
+        # Las comparaciones y divisiones con NaN son parte del cálculo (como en pandas)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for name in (targets if targets is not None else self._indicators):
+                resolve(name)
+        return values
+    
+    def compute(self, data: pd.DataFrame, targets: Optional[Iterable[str]] = None) -> Dict[str, pd.Series]:
+        """Series completas de un ticker (una fila del grafo) indexadas como `data`"""
+        inputs = {
+            name: data[column].to_numpy(dtype=np.float64).reshape(1, -1)
+            for name, column in self.INPUTS.items()
+        }
+        values = self.compute_matrix(inputs, targets)
+        return {name: pd.Series(matrix[0], index=data.index, name=name) for name, matrix in values.items()}
+
+
+def build_default_pipeline(
+    rsi_period: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+    bollinger_period: int = 20,
+    bollinger_std: int = 2
+) -> IndicatorPipeline:
+    """Pipeline con los indicadores de TechnicalIndicators"""
+    pipeline = IndicatorPipeline()
+    
+    # RSI (promedio simple de ganancias/pérdidas)
+    pipeline.register(
+        "rsi",
+        [pipeline.rolling_mean(pipeline.gain("close"), rsi_period),
+         pipeline.rolling_mean(pipeline.loss("close"), rsi_period)],
+        lambda g, l: 100 - (100 / (1 + g / l))
+    )
+    
+    # MACD
+    macd = pipeline.register(
+        "macd", [pipeline.ewm("close", macd_fast), pipeline.ewm("close", macd_slow)], lambda f, s: f - s
+    )
+    signal = pipeline.register("macd_signal", [pipeline.ewm(macd, macd_signal)], lambda s: s)
+    pipeline.register("macd_histogram", [macd, signal], lambda m, s: m - s)
+    
+    # Medias móviles (la SMA de Bollinger es la misma primitiva que sma_20)
+    for window in (20, 50, 200):
+        pipeline.register(f"sma_{window}", [pipeline.rolling_mean("close", window)], lambda s: s)
+    
+    middle = pipeline.rolling_mean("close", bollinger_period)
+    std = pipeline.rolling_std("close", bollinger_period)
+    pipeline.register("bollinger_upper", [middle, std], lambda m, s: m + s * bollinger_std)
+    pipeline.register("bollinger_lower", [middle, std], lambda m, s: m - s * bollinger_std)
+    
+    pipeline.register("volume_sma", [pipeline.rolling_mean("volume", 20)], lambda s: s)
+    return pipeline
+
+
+# Pipeline por defecto del análisis técnico (última barra, corrida diaria y backtest)
+technical_pipeline = build_default_pipeline()
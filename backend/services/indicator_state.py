@@ -0,0 +1,268 @@
+import json
+import logging
+import math
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from config.settings import settings
+from models.schemas import TechnicalIndicators
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+
+class RollingWindow:
+    """
+    Ventana móvil con media y suma de desvíos cuadrados (M2) actualizadas en
+    O(1) por barra con el método de Welford: a diferencia de suma y suma de
+    cuadrados, no pierde precisión cuando el precio es grande y la varianza chica
+    """
+    
+    __slots__ = ("size", "values", "_mean", "_m2", "_pushes")
+    
+    # Cada cuántas barras se recalculan media y M2 desde la ventana para no acumular redondeo
+    RESYNC_EVERY = 1000
+    
+    def __init__(self, size: int, values: Iterable[float] = ()):
+        self.size = size
+        self.values = deque(values, maxlen=size)
+        self._pushes = 0
+        self._resync()
+    
+    def _resync(self) -> None:
+        count = len(self.values)
+        self._mean = math.fsum(self.values) / count if count else 0.0
+        self._m2 = math.fsum((v - self._mean) ** 2 for v in self.values)
+    
+    def copy(self) -> "RollingWindow":
+        clone = RollingWindow.__new__(RollingWindow)
+        clone.size = self.size
+        clone.values = self.values.copy()
+        clone._mean, clone._m2, clone._pushes = self._mean, self._m2, self._pushes
+        return clone
+    
+    def push(self, value: float) -> None:
+        if len(self.values) == self.size:
+            # Reemplazo del valor más viejo: la cantidad de elementos no cambia
+            oldest = self.values[0]
+            self.values.append(value)
+            previous_mean = self._mean
+            self._mean += (value - oldest) / self.size
+            self._m2 += (value - oldest) * (value - self._mean + oldest - previous_mean)
+        else:
+            self.values.append(value)
+            delta = value - self._mean
+            self._mean += delta / len(self.values)
+            self._m2 += delta * (value - self._mean)
+        
+        self._pushes += 1
+        if self._pushes % self.RESYNC_EVERY == 0:
+            self._resync()
+    
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+    
+    def mean(self) -> float:
+        return self._mean if self.full else NAN
+    
+    def std(self) -> float:
+        """Desvío muestral (ddof=1), igual que pandas rolling().std()"""
+        if not self.full or self.size < 2:
+            return NAN
+        return math.sqrt(max(self._m2 / (self.size - 1), 0.0))
+
+
+class EmaAccumulator:
+    """EWM equivalente a pandas ewm(span).mean() con adjust=True"""
+    
+    __slots__ = ("decay", "numerator", "denominator")
+    
+    def __init__(self, span: int, numerator: float = 0.0, denominator: float = 0.0):
+        self.decay = 1 - 2 / (span + 1)
+        self.numerator = numerator
+        self.denominator = denominator
+    
+    def copy(self) -> "EmaAccumulator":
+        clone = EmaAccumulator.__new__(EmaAccumulator)
+        clone.decay, clone.numerator, clone.denominator = self.decay, self.numerator, self.denominator
+        return clone
+    
+    def push(self, value: float) -> None:
+        self.numerator = self.numerator * self.decay + value
+        self.denominator = self.denominator * self.decay + 1.0
+    
+    def value(self) -> float:
+        return self.numerator / self.denominator if self.denominator else NAN
+
+
+class IndicatorState:
+    """
+    Estado incremental de los indicadores técnicos de un ticker
+    Cada barra nueva se incorpora en O(1) sin recalcular el histórico, y el
+    estado se serializa para sobrevivir reinicios. Cubre los indicadores de
+    TechnicalIndicators con las mismas fórmulas que el pipeline técnico
+    """
+    
+    RSI_PERIOD = 14
+    MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+    BOLLINGER_PERIOD, BOLLINGER_STD = 20, 2
+    VOLUME_SMA_WINDOW = 20
+    
+    # Indicadores que el estado sabe mantener en forma incremental
+    INDICATORS = frozenset(TechnicalIndicators.model_fields)
+    
+    def __init__(self):
+        self.last_date: Optional[str] = None  # Fecha (YYYY-MM-DD) de la última barra incorporada
+        self.bars = 0
+        self.prev_close: Optional[float] = None
+        
+        self.ema_fast = EmaAccumulator(self.MACD_FAST)
+        self.ema_slow = EmaAccumulator(self.MACD_SLOW)
+        self.ema_signal = EmaAccumulator(self.MACD_SIGNAL)
+        
+        self.gains = RollingWindow(self.RSI_PERIOD)
+        self.losses = RollingWindow(self.RSI_PERIOD)
+        self.sma_windows = {window: RollingWindow(window) for window in (20, 50, 200)}
+        self.volumes = RollingWindow(self.VOLUME_SMA_WINDOW)
+    
+    def update(self, date: str, close: float, volume: float) -> None:
+        """Incorpora una barra cerrada"""
+        if close is None or math.isnan(close):
+            return
+        
+        # Como en pandas, el primer diff (NaN) cuenta como ganancia/pérdida 0
+        delta = close - self.prev_close if self.prev_close is not None else 0.0
+        self.gains.push(delta if delta > 0 else 0.0)
+        self.losses.push(-delta if delta < 0 else 0.0)
+        
+        self.ema_fast.push(close)
+        self.ema_slow.push(close)
+        self.ema_signal.push(self.ema_fast.value() - self.ema_slow.value())
+        
+        for window in self.sma_windows.values():
+            window.push(close)
+        self.volumes.push(0.0 if volume is None or math.isnan(volume) else volume)
+        
+        self.prev_close = close
+        self.last_date = date
+        self.bars += 1
+    
+    def indicators(self) -> TechnicalIndicators:
+        """Indicadores de la última barra incorporada"""
+        rsi = NAN
+        if self.gains.full:
+            gain, loss = self.gains.mean(), self.losses.mean()
+            if loss > 0:
+                rsi = 100 - (100 / (1 + gain / loss))
+            elif gain > 0:
+                rsi = 100.0
+        
+        macd = self.ema_fast.value() - self.ema_slow.value()
+        signal = self.ema_signal.value()
+        
+        sma_20 = self.sma_windows[self.BOLLINGER_PERIOD].mean()
+        std_20 = self.sma_windows[self.BOLLINGER_PERIOD].std()
+        
+        return TechnicalIndicators(
+            rsi=rsi,
+            macd=macd,
+            macd_signal=signal,
+            macd_histogram=macd - signal,
+            sma_20=sma_20,
+            sma_50=self.sma_windows[50].mean(),
+            sma_200=self.sma_windows[200].mean(),
+            bollinger_upper=sma_20 + std_20 * self.BOLLINGER_STD,
+            bollinger_lower=sma_20 - std_20 * self.BOLLINGER_STD,
+            volume_sma=self.volumes.mean() if self.volumes.full else None
+        )
+    
+    def copy(self) -> "IndicatorState":
+        """Copia independiente (mucho más barata que copy.deepcopy)"""
+        clone = IndicatorState.__new__(IndicatorState)
+        clone.last_date, clone.bars, clone.prev_close = self.last_date, self.bars, self.prev_close
+        clone.ema_fast = self.ema_fast.copy()
+        clone.ema_slow = self.ema_slow.copy()
+        clone.ema_signal = self.ema_signal.copy()
+        clone.gains = self.gains.copy()
+        clone.losses = self.losses.copy()
+        clone.sma_windows = {window: rolling.copy() for window, rolling in self.sma_windows.items()}
+        clone.volumes = self.volumes.copy()
+        return clone
+    
+    def peek(self, date: str, close: float, volume: float) -> TechnicalIndicators:
+        """Indicadores incluyendo una barra provisoria (p.ej. la del día en curso) sin incorporarla"""
+        preview = self.copy()
+        preview.update(date, close, volume)
+        return preview.indicators()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa el estado a un dict apto para JSON"""
+        return {
+            "last_date": self.last_date,
+            "bars": self.bars,
+            "prev_close": self.prev_close,
+            "ema": {
+                name: [acc.numerator, acc.denominator]
+                for name, acc in (("fast", self.ema_fast), ("slow", self.ema_slow), ("signal", self.ema_signal))
+            },
+            "gains": list(self.gains.values),
+            "losses": list(self.losses.values),
+            "closes": list(self.sma_windows[200].values),
+            "volumes": list(self.volumes.values)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        """Reconstruye el estado serializado con to_dict"""
+        state = cls()
+        state.last_date = data["last_date"]
+        state.bars = data["bars"]
+        state.prev_close = data["prev_close"]
+        
+        state.ema_fast = EmaAccumulator(cls.MACD_FAST, *data["ema"]["fast"])
+        state.ema_slow = EmaAccumulator(cls.MACD_SLOW, *data["ema"]["slow"])
+        state.ema_signal = EmaAccumulator(cls.MACD_SIGNAL, *data["ema"]["signal"])
+        
+        state.gains = RollingWindow(cls.RSI_PERIOD, data["gains"])
+        state.losses = RollingWindow(cls.RSI_PERIOD, data["losses"])
+        closes = data["closes"]
+        state.sma_windows = {window: RollingWindow(window, closes[-window:]) for window in (20, 50, 200)}
+        state.volumes = RollingWindow(cls.VOLUME_SMA_WINDOW, data["volumes"])
+        return state
+
+
+class IndicatorStateStore:
+    """Persistencia del estado incremental: un archivo JSON por ticker"""
+    
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.INDICATOR_STATE_DIR)
+    
+    def _path(self, ticker: str) -> Path:
+        return self.directory / f"{ticker}.json"
+    
+    def load(self, ticker: str) -> Optional[IndicatorState]:
+        """Lee el estado de un ticker (None si no existe o está corrupto)"""
+        path = self._path(ticker)
+        try:
+            if path.exists():
+                with open(path, encoding="utf-8") as f:
+                    return IndicatorState.from_dict(json.load(f))
+        except Exception as e:
+            logger.warning(f"Estado de indicadores inválido para {ticker}: {str(e)}")
+        return None
+    
+    def save(self, ticker: str, data: Dict[str, Any]) -> None:
+        """Guarda el estado serializado de un ticker de forma atómica"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(ticker)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error guardando estado de indicadores de {ticker}: {str(e)}")
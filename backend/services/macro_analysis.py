@@ -1,43 +1,43 @@
 import asyncio
-import aiohttp
 import logging
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from config.settings import settings
 from models.schemas import MacroIndicators
+from services.cache import CacheService
+from services.http_client import HttpClient
 
 logger = logging.getLogger(__name__)
 
+BCRA_INDICATORS = ("usd", "cer", "inflation", "country_risk")
+
 class MacroAnalyzer:
     """Analizador de indicadores macroeconómicos argentinos"""
     
-    def __init__(self):
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.cache = {}
-        self.cache_expiry = {}
-        self.cache_duration = timedelta(hours=6)  # Cache más largo para datos macro
+    def __init__(self, cache: Optional[CacheService] = None,
+                 http: Optional[HttpClient] = None):
+        # Pool HTTP compartido de la app (o uno propio si se usa el servicio suelto)
+        self.http = http or HttpClient()
+        self._owns_http = http is None
+        self.cache = cache or CacheService()  # Namespace "macro" (TTL largo)
         
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """Obtiene o crea una sesión HTTP"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30)
-            )
-        return self.session
-    
-    def _is_cache_valid(self, key: str) -> bool:
-        """Verifica si el cache es válido"""
-        if key not in self.cache_expiry:
-            return False
-        return datetime.now() < self.cache_expiry[key]
-    
     async def _fetch_bcra_data(self, indicator: str) -> Optional[float]:
         """Obtiene datos del BCRA (Banco Central de la República Argentina)"""
+        # Si el BCRA no responde se sigue usando el último valor conocido
+        return await self.cache.get_or_load(
+            "macro", f"bcra_{indicator}", lambda: self._request_bcra_data(indicator)
+        )
+    
+    def data_as_of(self) -> Optional[datetime]:
+        """Momento de obtención del indicador BCRA más viejo en uso"""
+        fetched = [self.cache.fetched_at("macro", f"bcra_{indicator}") for indicator in BCRA_INDICATORS]
+        fetched = [ts for ts in fetched if ts is not None]
+        return min(fetched) if fetched else None
+    
+    async def _request_bcra_data(self, indicator: str) -> Optional[float]:
+        """Consulta un indicador en la API del BCRA"""
         try:
-            if self._is_cache_valid(f"bcra_{indicator}"):
-                return self.cache[f"bcra_{indicator}"]
-            
             # Mapeo de indicadores BCRA
             indicator_map = {
                 'usd': 'usd',       # Tipo de cambio USD
@@ -50,22 +50,19 @@ class MacroAnalyzer:
             if not bcra_indicator:
                 return None
             
-            session = await self._get_session()
             url = f"{settings.BCRA_API_URL}/{bcra_indicator}"
             
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data and len(data) > 0:
-                        # Tomar el valor más reciente
-                        latest_value = data[-1].get('valor', data[-1].get('v'))
-                        if latest_value is not None:
-                            self.cache[f"bcra_{indicator}"] = latest_value
-                            self.cache_expiry[f"bcra_{indicator}"] = datetime.now() + self.cache_duration
-                            return latest_value
+            response = await self.http.get_json("bcra", url)
+            if response.status == 200:
+                data = response.data
+                if data and len(data) > 0:
+                    # Tomar el valor más reciente
+                    latest_value = data[-1].get('valor', data[-1].get('v'))
+                    if latest_value is not None:
+                        return latest_value
                 
-                logger.warning(f"No se pudo obtener {indicator} del BCRA: {response.status}")
-                return None
+            logger.warning(f"No se pudo obtener {indicator} del BCRA: {response.status or response.error}")
+            return None
                 
         except Exception as e:
             logger.error(f"Error obteniendo {indicator} del BCRA: {str(e)}")
@@ -186,6 +183,7 @@ class MacroAnalyzer:
             
             # Calcular tendencias (requeriría datos históricos, por ahora simplificado)
             trends = self._analyze_trends(indicators)
+            as_of = self.data_as_of()
             
             return {
                 "macro_score": macro_score,
@@ -193,6 +191,7 @@ class MacroAnalyzer:
                 "interpretation": interpretation,
                 "trends": trends,
                 "impact_on_stocks": self._assess_stock_impact(indicators),
+                "data_as_of": as_of.isoformat() if as_of else None,
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -315,6 +314,6 @@ class MacroAnalyzer:
             return False
     
     async def close(self):
-        """Cierra las conexiones"""
-        if self.session and not self.session.closed:
-            await self.session.close() 
\ No newline at end of file
+        """Cierra las conexiones (el pool compartido lo cierra la app)"""
+        if self._owns_http:
+            await self.http.close() 
\ No newline at end of file
@@ -0,0 +1,43 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from services.price_store import EPOCH, PriceStore
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSeries:
+    """
+    Histórico compacto de un ticker para el cache en memoria
+    Guarda solo lo que usan los indicadores: cierre y volumen como float32 y el
+    índice como días desde epoch (int64), en arrays contiguos. El presupuesto
+    de memoria es el de CacheService (CACHE_MAX_MB), que la mide por `nbytes`
+    """
+    
+    __slots__ = ("days", "close", "volume")
+    
+    def __init__(self, days: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.days = np.ascontiguousarray(days, dtype=np.int64)
+        self.close = np.ascontiguousarray(close, dtype=np.float32)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float32)
+    
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "PriceSeries":
+        return cls(PriceStore.to_epoch_days(frame.index), frame['Close'].to_numpy(), frame['Volume'].to_numpy())
+    
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame (Close, Volume en float64) con índice de fechas diarias, como espera el análisis"""
+        index = pd.DatetimeIndex((EPOCH + self.days).astype("datetime64[ns]"))
+        return pd.DataFrame(
+            {"Close": self.close.astype(np.float64), "Volume": self.volume.astype(np.float64)},
+            index=index
+        )
+    
+    def __len__(self) -> int:
+        return len(self.days)
+    
+    @property
+    def nbytes(self) -> int:
+        return self.days.nbytes + self.close.nbytes + self.volume.nbytes
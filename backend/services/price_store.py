@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+class PriceStore:
+    """
+    Almacén local append-only de barras diarias OHLCV
+    Cada ticker es un directorio con un archivo binario por columna; las
+    barras nuevas se agregan al final de cada archivo sin reescribir nada
+    """
+    
+    # Columna -> (archivo, dtype)
+    COLUMNS = {
+        "Date": ("date.i8", np.int64),  # Días desde epoch
+        "Open": ("open.f8", np.float64),
+        "High": ("high.f8", np.float64),
+        "Low": ("low.f8", np.float64),
+        "Close": ("close.f8", np.float64),
+        "Volume": ("volume.f8", np.float64),
+    }
+    
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.PRICE_STORE_DIR)
+        self._lock = threading.Lock()
+    
+    def _ticker_dir(self, ticker: str) -> Path:
+        return self.directory / ticker
+    
+    def _column_path(self, ticker: str, column: str) -> Path:
+        return self._ticker_dir(ticker) / self.COLUMNS[column][0]
+    
+    def _rows(self, ticker: str) -> int:
+        """Cantidad de filas completas (mínimo entre columnas, por si una escritura quedó a medias)"""
+        rows = []
+        for column, (_, dtype) in self.COLUMNS.items():
+            path = self._column_path(ticker, column)
+            if not path.exists():
+                return 0
+            rows.append(path.stat().st_size // np.dtype(dtype).itemsize)
+        return min(rows)
+    
+    def _repair(self, ticker: str) -> int:
+        """Trunca todas las columnas al largo de la más corta antes de escribir"""
+        rows = self._rows(ticker)
+        for column, (_, dtype) in self.COLUMNS.items():
+            path = self._column_path(ticker, column)
+            size = rows * np.dtype(dtype).itemsize
+            if path.exists() and path.stat().st_size != size:
+                os.truncate(path, size)
+        return rows
+    
+    @staticmethod
+    def to_epoch_days(index: pd.DatetimeIndex) -> np.ndarray:
+        """Convierte un índice de fechas (con o sin zona horaria) a días desde epoch"""
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.normalize().values.astype("datetime64[D]").astype(np.int64)
+    
+    def _last_day(self, ticker: str, rows: int) -> int:
+        """Día (desde epoch) de la última barra guardada, leyendo solo el final del archivo"""
+        path = self._column_path(ticker, "Date")
+        return int(np.fromfile(path, dtype=np.int64, count=1, offset=(rows - 1) * 8)[0])
+    
+    def read(self, ticker: str) -> Optional[pd.DataFrame]:
+        """Lee todo el histórico guardado de un ticker"""
+        try:
+            rows = self._rows(ticker)
+            if rows == 0:
+                return None
+            
+            columns = {
+                column: np.fromfile(self._column_path(ticker, column), dtype=dtype, count=rows)
+                for column, (_, dtype) in self.COLUMNS.items()
+            }
+            index = pd.DatetimeIndex((EPOCH + columns.pop("Date")).astype("datetime64[ns]"))
+            return pd.DataFrame(columns, index=index)
+        
+        except Exception as e:
+            logger.error(f"Error leyendo precios guardados de {ticker}: {str(e)}")
+            return None
+    
+    def read_many(self, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+        """Lee el histórico guardado de varios tickers"""
+        frames = {}
+        for ticker in tickers:
+            frame = self.read(ticker)
+            if frame is not None:
+                frames[ticker] = frame
+        return frames
+    
+    def clear(self, ticker: str) -> None:
+        """Borra el histórico guardado de un ticker (p.ej. tras un split)"""
+        with self._lock:
+            for column in self.COLUMNS:
+                path = self._column_path(ticker, column)
+                if path.exists():
+                    path.unlink()
+    
+    def append(self, ticker: str, frame: pd.DataFrame) -> int:
+        """
+        Agrega al final las barras posteriores a la última guardada
+        Devuelve la cantidad de barras escritas
+        """
+        if frame is None or frame.empty:
+            return 0
+        
+        try:
+            with self._lock:
+                self._ticker_dir(ticker).mkdir(parents=True, exist_ok=True)
+                rows = self._repair(ticker)
+                
+                days = self.to_epoch_days(frame.index)
+                if rows:
+                    mask = days > self._last_day(ticker, rows)
+                else:
+                    mask = np.ones(len(days), dtype=bool)
+                
+                if not mask.any():
+                    return 0
+                
+                for column, (_, dtype) in self.COLUMNS.items():
+                    if column == "Date":
+                        values = days[mask]
+                    else:
+                        values = frame[column].to_numpy(dtype=dtype)[mask]
+                    with open(self._column_path(ticker, column), "ab") as f:
+                        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                
+                return int(mask.sum())
+        
+        except Exception as e:
+            logger.error(f"Error guardando precios de {ticker}: {str(e)}")
+            return 0
@@ -0,0 +1,188 @@
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaLedger:
+    """
+    Registro persistente del consumo diario de cada API con cuota (FMP, GNews)
+    - El contador se guarda en disco y sobrevive reinicios; vuelve a cero a la
+      medianoche de la zona horaria en que el proveedor renueva la cuota
+    - Planificador de presupuesto: el día se divide en ciclos de refresco y en
+      cada ciclo solo se puede gastar lo que queda dividido los ciclos restantes,
+      así la cuota no se agota en la primera corrida
+    - Rotación: si el presupuesto del ciclo no alcanza para todos los consumidores,
+      plan() devuelve desde dónde empezar y advance() corre ese punto, así cada
+      ciclo refresca a los que quedaron afuera en el anterior
+    - El registro se escribe en disco en un thread aparte, agrupando las
+      reservas de QUOTA_SAVE_DELAY_SECONDS (no en cada request)
+    """
+    
+    def __init__(self, path: Optional[str] = None, limits: Optional[Dict[str, int]] = None):
+        self.path = Path(path or settings.QUOTA_LEDGER_PATH)
+        self.limits = limits or {
+            "fmp": settings.FMP_DAILY_LIMIT,
+            "gnews": settings.GNEWS_DAILY_LIMIT,
+        }
+        self._lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self.state: Dict[str, Dict[str, Any]] = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Carga el registro desde disco (vacío si no existe o está corrupto)"""
+        try:
+            if self.path.exists():
+                with open(self.path, encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el registro de cuotas {self.path}: {str(e)}")
+        return {}
+    
+    def _save(self) -> None:
+        """Persiste el registro de forma atómica (se llama con el lock tomado)"""
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando registro de cuotas: {str(e)}")
+    
+    def _schedule_save(self) -> None:
+        """Programa una escritura en background si no hay una pendiente (con el lock tomado)"""
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(settings.QUOTA_SAVE_DELAY_SECONDS, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def flush(self) -> None:
+        """Escribe ya los cambios pendientes"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save()
+    
+    def close(self) -> None:
+        self.flush()
+    
+    def _window(self, provider: str, now: Optional[datetime] = None):
+        """Inicio y fin (con zona horaria) del día de cuota vigente del proveedor"""
+        zone = ZoneInfo(settings.QUOTA_RESET_TIMEZONES.get(provider, "UTC"))
+        now = (now or datetime.now(zone)).astimezone(zone)
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return now, start, start + timedelta(days=1)
+    
+    def _cycle_length(self, provider: str) -> timedelta:
+        return timedelta(minutes=settings.QUOTA_CYCLE_MINUTES.get(provider, 24 * 60))
+    
+    def _current(self, provider: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Estado del proveedor, renovando el día y el ciclo si corresponde (con el lock tomado)"""
+        now, start, end = self._window(provider, now)
+        limit = self.limits[provider]
+        state = self.state.get(provider)
+        if state is None or state.get("window") != start.date().isoformat():
+            # El punto de rotación se conserva de un día al otro
+            offset = state.get("offset", 0) if state is not None else 0
+            state = {"window": start.date().isoformat(), "used": 0, "offset": offset}
+            self.state[provider] = state
+        
+        cycle_length = self._cycle_length(provider)
+        cycle = int((now - start) / cycle_length)
+        if state.get("cycle") != cycle:
+            # Lo que queda del día se reparte entre este ciclo y los que faltan
+            remaining = max(limit - state["used"], 0)
+            cycles_left = max(math.ceil((end - start) / cycle_length) - cycle, 1)
+            state.update({
+                "cycle": cycle,
+                "cycle_allowance": math.ceil(remaining / cycles_left),
+                "cycle_used": 0,
+            })
+        return state
+    
+    def try_acquire(self, provider: str, calls: int = 1) -> bool:
+        """Reserva `calls` requests del proveedor; False si se agotó la cuota del día o del ciclo"""
+        if provider not in self.limits:
+            return True
+        with self._lock:
+            state = self._current(provider)
+            if state["used"] + calls > self.limits[provider]:
+                return False
+            if state["cycle_used"] + calls > state["cycle_allowance"]:
+                return False
+            state["used"] += calls
+            state["cycle_used"] += calls
+            self._schedule_save()
+            return True
+    
+    def exhaust(self, provider: str) -> None:
+        """Marca la cuota del día como agotada (el proveedor respondió 429)"""
+        if provider not in self.limits:
+            return
+        with self._lock:
+            state = self._current(provider)
+            state["used"] = max(state["used"], self.limits[provider])
+            self._save()
+        logger.warning(f"Cuota diaria de {provider} agotada hasta {self._window(provider)[2].isoformat()}")
+    
+    def remaining(self, provider: str) -> int:
+        """Requests que quedan en el día de cuota"""
+        with self._lock:
+            return max(self.limits[provider] - self._current(provider)["used"], 0)
+    
+    def plan(self, provider: str, consumers: int, cost: int = 1) -> Dict[str, Any]:
+        """
+        Presupuesto del ciclo actual repartido entre `consumers` (p.ej. tickers)
+        que gastan `cost` requests cada uno. Si no alcanza para todos, `covered`
+        indica cuántos pueden refrescarse empezando por el consumidor `offset`
+        """
+        with self._lock:
+            state = self._current(provider)
+            available = max(min(state["cycle_allowance"] - state["cycle_used"],
+                                self.limits[provider] - state["used"]), 0)
+            offset = state.get("offset", 0) % consumers if consumers else 0
+        return {
+            "provider": provider,
+            "available": available,
+            "consumers": consumers,
+            "per_consumer": available // consumers if consumers else available,
+            "covered": min(available // max(cost, 1), consumers),
+            "offset": offset,
+        }
+    
+    def advance(self, provider: str, consumers: int, covered: int) -> None:
+        """Corre el punto de rotación después de refrescar `covered` de `consumers`"""
+        if provider not in self.limits or not consumers:
+            return
+        with self._lock:
+            state = self._current(provider)
+            state["offset"] = (state.get("offset", 0) + covered) % consumers
+            self._schedule_save()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Uso, restante y próxima renovación por proveedor"""
+        result = {}
+        with self._lock:
+            for provider, limit in self.limits.items():
+                state = self._current(provider)
+                result[provider] = {
+                    "limit": limit,
+                    "used": state["used"],
+                    "remaining": max(limit - state["used"], 0),
+                    "cycle_allowance": state["cycle_allowance"],
+                    "cycle_used": state["cycle_used"],
+                    "resets_at": self._window(provider)[2].isoformat(),
+                }
+        return result
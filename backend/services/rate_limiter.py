@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Rate limiter asíncrono de tipo token bucket
+    - Respeta `limit` requests por ventana de `period` segundos, permitiendo
+      ráfagas de hasta `burst`: el ritmo de recarga es (limit - burst + 1) / period,
+      de modo que ninguna ventana deslizante supera el límite del proveedor
+    - `jitter` alarga la ventana para cubrir la variación entre que se entrega el
+      token y la request llega al proveedor (p.ej. la primera ráfaga abre conexiones)
+    - Los que esperan se atienden en orden de llegada (FIFO): el que está
+      primero espera su token con el lock tomado y el resto hace cola detrás
+    - `clock` y `sleep` permiten usar un reloj simulado (tests)
+    """
+    
+    def __init__(self, name: str, limit: int, period: float = 1.0, burst: int = 1, jitter: float = 0.0,
+                 clock: Optional[Callable[[], float]] = None,
+                 sleep: Optional[Callable[[float], Awaitable[None]]] = None):
+        self.name = name
+        self._clock = clock or time.monotonic
+        self._sleep = sleep or asyncio.sleep
+        self.limit = limit
+        self.period = period
+        self.capacity = max(min(burst, limit), 1)
+        self.rate = (limit - self.capacity + 1) / (period + jitter)
+        self._tokens = float(self.capacity)
+        self._updated = self._clock()
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.waiting = 0
+    
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self) -> None:
+        """Espera (sin bloquear el event loop) hasta que haya un token disponible"""
+        self.waiting += 1
+        start = self._clock()
+        try:
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    await self._sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            self.waiting -= 1
+        self.acquired += 1
+        self.waited_seconds += self._clock() - start
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "period_seconds": self.period,
+            "burst": self.capacity,
+            "rate_per_second": round(self.rate, 3),
+            "acquired": self.acquired,
+            "waiting": self.waiting,
+            "avg_wait_ms": round(1000 * self.waited_seconds / self.acquired, 1) if self.acquired else None,
+        }
+
+
+def create_rate_limiter(provider: str) -> TokenBucket:
+    """Rate limiter de un proveedor según RATE_LIMITS"""
+    config = settings.RATE_LIMITS.get(provider, {})
+    return TokenBucket(
+        provider,
+        limit=config.get("limit", 1),
+        period=config.get("period", 1.0),
+        burst=config.get("burst", 1),
+        jitter=settings.RATE_LIMIT_JITTER_SECONDS
+    )
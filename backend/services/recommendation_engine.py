@@ -1,6 +1,8 @@
 import asyncio
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 from config.settings import settings
@@ -14,6 +16,8 @@ from services.technical_analysis import TechnicalAnalyzer
 from services.fundamental_analysis import FundamentalAnalyzer
 from services.sentiment_analysis import SentimentAnalyzer
 from services.macro_analysis import MacroAnalyzer
+from services.singleflight import SingleFlight
+from services.universe import Universe
 
 logger = logging.getLogger(__name__)
 
@@ -23,47 +27,130 @@ class RecommendationEngine:
     def __init__(self, technical_analyzer: TechnicalAnalyzer, 
                  fundamental_analyzer: FundamentalAnalyzer,
                  sentiment_analyzer: SentimentAnalyzer,
-                 macro_analyzer: MacroAnalyzer):
+                 macro_analyzer: MacroAnalyzer,
+                 universe: Optional[Universe] = None):
         self.technical_analyzer = technical_analyzer
         self.fundamental_analyzer = fundamental_analyzer
         self.sentiment_analyzer = sentiment_analyzer
         self.macro_analyzer = macro_analyzer
+        # Requests idénticos concurrentes (mismo ticker, o la corrida diaria)
+        # esperan un único análisis en vez de repetirlo
+        self._flights = SingleFlight("engine")
+        self.universe = universe or Universe()
+        self.last_run: Optional[Dict[str, Any]] = None
         
-    async def generate_daily_recommendations(self) -> List[RecommendationResponse]:
-        """Genera recomendaciones diarias para todos los tickers argentinos"""
-        recommendations = []
+    async def generate_daily_recommendations(self, top_k: Optional[int] = None) -> List[RecommendationResponse]:
+        """Genera recomendaciones diarias (llamadas concurrentes comparten la corrida)"""
+        top_k = top_k or settings.RECOMMENDATION_TOP_K
+        return await self._flights.do(("daily", top_k), lambda: self._generate_daily_recommendations(top_k))
         
-        # Obtener contexto macro una sola vez (es el mismo para todos)
+    async def _generate_daily_recommendations(self, top_k: Optional[int]) -> List[RecommendationResponse]:
+        """
+        Genera las recomendaciones diarias para todo el universo
+        El universo se procesa por bloques (precios e indicadores en lote por
+        bloque). Con top_k solo se retienen las mejores en un heap, así la memoria
+        no crece con la cantidad de tickers; sin top_k se devuelven todas
+        """
+        total = len(self.universe)
+        capacity = top_k if top_k is not None else total
+        shard_size = settings.RECOMMENDATION_SHARD_SIZE
+        shard_count = (total + shard_size - 1) // shard_size
+        logger.info(f"Generando recomendaciones para {total} tickers en {shard_count} bloques")
+        
+        # Presupuesto de las APIs con cuota para este ciclo: si no alcanza para
+        # todos, los tickers sin cuota usan los datos guardados o score neutral.
+        # Los que la reciben son los primeros en recorrerse, así que el universo
+        # se recorre desde el punto de rotación de GNews (una búsqueda por
+        # ticker): cada ciclo empieza por los que quedaron sin cuota en el anterior
+        supported = sum(1 for t in self.universe.tickers() if t in settings.FMP_SUPPORTED_TICKERS)
+        quota_plan = {
+            "fmp": self.fundamental_analyzer.quota.plan("fmp", supported),
+            "gnews": self.sentiment_analyzer.quota.plan("gnews", total)
+        }
+        for plan in quota_plan.values():
+            if plan["covered"] < plan["consumers"]:
+                logger.warning(
+                    f"Cuota de {plan['provider']} para este ciclo: {plan['available']} requests "
+                    f"para {plan['consumers']} tickers (desde el {plan['offset']})"
+                )
+        offset = quota_plan["gnews"]["offset"]
+        
+        # El contexto macro es el mismo para todos: se obtiene una sola vez
         macro_context = await self.macro_analyzer.analyze_macro_context()
         macro_score = macro_context.get('macro_score', 50.0)
         
-        logger.info(f"Generando recomendaciones para {len(settings.ARGENTINE_TICKERS)} tickers")
+        semaphore = asyncio.Semaphore(settings.RECOMMENDATION_CONCURRENCY)
         
-        # Procesar tickers en paralelo (en lotes para no sobrecargar APIs)
-        batch_size = 3  # Procesar de a 3 para respetar rate limits
+        async def analyze(ticker: str) -> Optional[RecommendationResponse]:
+            async with semaphore:
+                return await self._analyze_single_ticker(ticker, macro_score, macro_context)
         
-        for i in range(0, len(settings.ARGENTINE_TICKERS), batch_size):
-            batch = settings.ARGENTINE_TICKERS[i:i + batch_size]
-            batch_tasks = [
-                self._analyze_single_ticker(ticker, macro_score, macro_context)
-                for ticker in batch
-            ]
-            
-            batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
+        # Min-heap de (score, -orden, recomendación): la raíz es la peor de las top_k
+        top: List[Tuple[float, int, RecommendationResponse]] = []
+        analyzed = failed = processed = 0
+        start = time.perf_counter()
+            
+        for shard_number, shard in enumerate(self.universe.shards(shard_size, offset), 1):
+            shard_start = time.perf_counter()
+            # Precios y perfiles FMP del bloque en pocas requests agrupadas
+            await asyncio.gather(
+                self.technical_analyzer.prefetch_universe(shard),
+                self.fundamental_analyzer.prefetch_profiles(shard)
+            )
+            await self.technical_analyzer.precompute_indicators(shard)
             
-            for result in batch_results:
+            results = await asyncio.gather(*(analyze(ticker) for ticker in shard), return_exceptions=True)
+            for index, result in enumerate(results, processed):
+                position = (offset + index) % total  # Índice en el universo, para desempatar
                 if isinstance(result, Exception):
-                    logger.error(f"Error en batch: {result}")
+                    logger.error(f"Error en bloque {shard_number}: {result}")
+                    failed += 1
                     continue
-                if result:
-                    recommendations.append(result)
+                if not result:
+                    failed += 1
+                    continue
+                analyzed += 1
+                item = (result.total_score, -position, result)
+                if len(top) < capacity:
+                    heapq.heappush(top, item)
+                elif item[:2] > top[0][:2]:
+                    heapq.heapreplace(top, item)
+            processed += len(shard)
+        
+            shard_elapsed = time.perf_counter() - shard_start
+            logger.info(
+                f"Bloque {shard_number}/{shard_count}: {len(shard)} tickers en {shard_elapsed:.1f}s "
+                f"({len(shard) / shard_elapsed:.2f} tickers/s) - progreso {processed}/{total}"
+            )
+        
+        # El próximo ciclo empieza por el primer ticker que quedó sin cuota
+        self.sentiment_analyzer.quota.advance("gnews", total, quota_plan["gnews"]["covered"])
         
-        # Ordenar por score descendente
-        recommendations.sort(key=lambda x: x.total_score, reverse=True)
+        elapsed = time.perf_counter() - start
+        self.last_run = {
+            "finished_at": datetime.now().isoformat(),
+            "tickers": total,
+            "analyzed": analyzed,
+            "failed": failed,
+            "shards": shard_count,
+            "top_k": top_k,
+            "elapsed_seconds": round(elapsed, 2),
+            "tickers_per_second": round(processed / elapsed, 2) if elapsed else None,
+            "quota_plan": quota_plan
+        }
         
-        logger.info(f"Generadas {len(recommendations)} recomendaciones")
+        # Ordenar por score descendente (a igual score, en el orden del universo)
+        recommendations = [rec for _, _, rec in sorted(top, key=lambda item: item[:2], reverse=True)]
+        logger.info(
+            f"Generadas {len(recommendations)} recomendaciones ({analyzed} analizados, {failed} con error) "
+            f"en {elapsed:.1f}s, {self.last_run['tickers_per_second']} tickers/s"
+        )
         return recommendations
     
+    def run_stats(self) -> Optional[Dict[str, Any]]:
+        """Resumen de la última corrida diaria (duración y throughput)"""
+        return self.last_run
+    
     async def _analyze_single_ticker(self, ticker: str, macro_score: float, 
                                    macro_context: Dict[str, Any]) -> Optional[RecommendationResponse]:
         """Analiza un ticker individual y genera recomendación"""
@@ -143,7 +230,8 @@ class RecommendationEngine:
                 target_price=target_price,
                 risk_level=risk_level,
                 color=color,
-                summary=summary
+                summary=summary,
+                data_freshness=self._data_freshness(tech_result, fund_result, sent_result, macro_context)
             )
             
         except Exception as e:
@@ -166,6 +254,17 @@ class RecommendationEngine:
                 summary=f"Error analizando {ticker} - recomendación neutral"
             )
     
+    @staticmethod
+    def _data_freshness(tech_result: Dict[str, Any], fund_result: Dict[str, Any],
+                        sent_result: Dict[str, Any], macro_context: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """Fecha de obtención de los datos de cada componente del score"""
+        return {
+            "technical": tech_result.get('data_as_of'),
+            "fundamental": fund_result.get('data_as_of'),
+            "sentiment": sent_result.get('data_as_of'),
+            "macro": macro_context.get('data_as_of')
+        }
+    
     def _determine_recommendation_level(self, total_score: float) -> RecommendationLevel:
         """Determina el nivel de recomendación basado en el score total"""
         if total_score >= settings.SCORE_THRESHOLDS["buy"]:
@@ -298,6 +397,10 @@ class RecommendationEngine:
             return "medium"
     
     async def analyze_ticker(self, ticker: str) -> TickerAnalysis:
+        """Análisis completo de un ticker (llamadas concurrentes para el mismo ticker comparten el resultado)"""
+        return await self._flights.do(("analysis", ticker), lambda: self._analyze_ticker(ticker))
+    
+    async def _analyze_ticker(self, ticker: str) -> TickerAnalysis:
         """Análisis completo y detallado de un ticker específico"""
         try:
             # Obtener contexto macro
@@ -345,7 +448,8 @@ class RecommendationEngine:
                 cer_stability=macro_context.get('indicators', {}).get('cer_rate') if macro_context.get('indicators') else None,
                 # Detalles sentimiento
                 news_sentiment=sent_result.get('overall_sentiment'),
-                news_count=sent_result.get('news_count', 0)
+                news_count=sent_result.get('news_count', 0),
+                data_freshness=self._data_freshness(tech_result, fund_result, sent_result, macro_context)
             )
             
             # Determinar recomendación
@@ -396,6 +500,7 @@ class RecommendationEngine:
     async def close_all_services(self):
         """Cierra todas las conexiones de los servicios"""
         await asyncio.gather(
+            self.technical_analyzer.close(),
             self.fundamental_analyzer.close(),
             self.sentiment_analyzer.close(),
             self.macro_analyzer.close(),
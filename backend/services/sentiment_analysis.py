@@ -1,65 +1,121 @@
 import asyncio
-import aiohttp
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import re
+import threading
+import time
 
 from config.settings import settings
 from models.schemas import NewsItem
+from services.cache import CacheService
+from services.http_client import HttpClient
+from services.quota import QuotaLedger
+from services.sentiment_backends import load_backend
+from services.sentiment_cache import SentimentCache
+from services.sentiment_worker import SentimentUnavailable, SentimentWorker
 
 logger = logging.getLogger(__name__)
 
 class SentimentAnalyzer:
     """Analizador de sentimiento usando noticias y BERT"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[CacheService] = None, quota: Optional[QuotaLedger] = None,
+                 http: Optional[HttpClient] = None, worker: Optional[SentimentWorker] = None,
+                 sentiment_cache: Optional[SentimentCache] = None):
         self.gnews_api_key = settings.GNEWS_API_KEY
         self.gnews_base_url = settings.GNEWS_BASE_URL
-        self.session: Optional[aiohttp.ClientSession] = None
+        # Pool HTTP compartido de la app (o uno propio si se usa el servicio suelto)
+        self.http = http or HttpClient()
+        self._owns_http = http is None
+        self.cache = cache or CacheService()  # Namespace "news"
+        self.quota = quota or QuotaLedger()  # Cuota diaria (GNEWS_DAILY_LIMIT)
         self.sentiment_pipeline = None
-        self.last_request_time = {}
+        self.backend_name = settings.SENTIMENT_BACKEND  # El que quedó cargado (puede caer a transformers)
+        self._model_lock = threading.Lock()
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self.model_load_seconds: Optional[float] = None
+        # Carga e inferencia del modelo en threads propios, con cola acotada
+        self.worker = worker or SentimentWorker(self._analyze_sentiment_bert)
+        # Resultados por artículo (hash del texto + modelo), persistidos en disco
+        self.sentiment_cache = sentiment_cache or SentimentCache()
         
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """Obtiene o crea una sesión HTTP"""
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30)
-            )
-        return self.session
-    
     def _load_sentiment_model(self):
-        """Carga el modelo de sentimiento BERT (lazy loading)"""
-        if self.sentiment_pipeline is None:
+        """Carga el modelo de sentimiento BERT (lazy loading, desde un thread del worker)"""
+        with self._model_lock:
+            if self.sentiment_pipeline is not None:
+                return
             try:
-                from transformers import pipeline
-                logger.info(f"Cargando modelo de sentimiento: {settings.SENTIMENT_MODEL}")
-                self.sentiment_pipeline = pipeline(
-                    "sentiment-analysis", 
-                    model=settings.SENTIMENT_MODEL,
-                    device=-1  # CPU para evitar problemas de GPU
-                )
+                logger.info(f"Cargando modelo de sentimiento: {settings.SENTIMENT_MODEL} ({settings.SENTIMENT_BACKEND})")
+                self.sentiment_pipeline = self._load_backend()
                 logger.info("Modelo de sentimiento cargado exitosamente")
             except Exception as e:
                 logger.error(f"Error cargando modelo de sentimiento: {str(e)}")
                 # Fallback a un análisis básico de palabras clave
                 self.sentiment_pipeline = "fallback"
     
+    def _load_backend(self):
+        """Backend de SENTIMENT_BACKEND; si el ONNX no está disponible se usa transformers"""
+        try:
+            backend = load_backend(settings.SENTIMENT_BACKEND)
+            self.backend_name = settings.SENTIMENT_BACKEND
+            return backend
+        except Exception as e:
+            if settings.SENTIMENT_BACKEND == "transformers":
+                raise
+            logger.warning(f"Backend {settings.SENTIMENT_BACKEND} no disponible ({str(e)}), usando transformers")
+        backend = load_backend("transformers")
+        self.backend_name = "transformers"
+        return backend
+    
+    @property
+    def model_state(self) -> str:
+        """not_loaded, loading, ready o failed (queda el análisis por palabras clave)"""
+        if self.sentiment_pipeline is None:
+            loading = self._warm_up_task is not None and not self._warm_up_task.done()
+            return "loading" if loading else "not_loaded"
+        return "failed" if self.sentiment_pipeline == "fallback" else "ready"
+    
+    def start_warm_up(self) -> asyncio.Task:
+        """Carga y calienta el modelo en background (una sola vez); no bloquea al llamador"""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+        return self._warm_up_task
+    
+    async def _warm_up(self) -> None:
+        start = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.worker.executor, self._warm_up_model)
+            self.model_load_seconds = round(time.monotonic() - start, 2)
+            logger.info(f"Modelo de sentimiento {self.model_state} en {self.model_load_seconds}s")
+        except Exception as e:
+            logger.error(f"Error precalentando modelo de sentimiento: {str(e)}")
+            # Sin un modelo que responda queda el análisis por palabras clave (estado failed)
+            self.sentiment_pipeline = "fallback"
+    
+    def _warm_up_model(self) -> None:
+        """Carga el modelo y hace una primera inferencia (reserva de buffers, compilación de kernels)"""
+        self._load_sentiment_model()
+        if self.sentiment_pipeline != "fallback":
+            # Directo al pipeline: _analyze_sentiment_bert cae a palabras clave sin
+            # propagar el error y el modelo quedaría como listo
+            self.sentiment_pipeline(["YPF sube tras presentar su balance trimestral"], batch_size=1)
+    
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "state": self.model_state,
+            "model": settings.SENTIMENT_MODEL,
+            "backend": self.backend_name,
+            "load_seconds": self.model_load_seconds,
+        }
+    
     async def _get_news_gnews(self, ticker: str, company_name: str = None) -> List[NewsItem]:
         """Obtiene noticias de GNews API"""
         if not self.gnews_api_key:
             logger.warning("GNews API key no configurada")
             return []
         
-        # Rate limiting
-        now = datetime.now()
-        if "gnews" in self.last_request_time:
-            time_since_last = (now - self.last_request_time["gnews"]).total_seconds()
-            if time_since_last < 2:  # 2 segundos entre requests
-                await asyncio.sleep(2 - time_since_last)
-        
-        self.last_request_time["gnews"] = now
-        
         try:
             # Construir query de búsqueda
             search_terms = [ticker]
@@ -81,41 +137,91 @@ class SentimentAnalyzer:
                 'token': self.gnews_api_key
             }
             
-            session = await self._get_session()
-            async with session.get(f"{self.gnews_base_url}/search", params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    articles = data.get('articles', [])
+            response = await self.http.get_json("gnews", f"{self.gnews_base_url}/search", params, quota=self.quota)
+            if response.status == 200:
+                articles = (response.data or {}).get('articles', [])
                     
-                    news_items = []
-                    for article in articles:
-                        news_item = NewsItem(
-                            title=article.get('title', ''),
-                            description=article.get('description', ''),
-                            url=article.get('url', ''),
-                            published_at=datetime.fromisoformat(
-                                article.get('publishedAt', '').replace('Z', '+00:00')
-                            ),
-                            source=article.get('source', {}).get('name', 'Unknown')
-                        )
-                        news_items.append(news_item)
+                news_items = []
+                for article in articles:
+                    news_item = NewsItem(
+                        title=article.get('title', ''),
+                        description=article.get('description', ''),
+                        url=article.get('url', ''),
+                        published_at=datetime.fromisoformat(
+                            article.get('publishedAt', '').replace('Z', '+00:00')
+                        ),
+                        source=article.get('source', {}).get('name', 'Unknown')
+                    )
+                    news_items.append(news_item)
                     
-                    logger.info(f"Obtenidas {len(news_items)} noticias para {ticker}")
-                    return news_items
+                logger.info(f"Obtenidas {len(news_items)} noticias para {ticker}")
+                return news_items
                     
-                elif response.status == 429:
-                    logger.warning("Rate limit alcanzado para GNews API")
-                    return []
-                else:
-                    logger.error(f"Error en GNews API: {response.status}")
-                    return []
+            elif response.status == 429:
+                logger.warning("Rate limit alcanzado para GNews API")
+                return []
+            elif response.no_quota:
+                logger.warning(f"Sin cuota de GNews para {ticker} (restan {self.quota.remaining('gnews')} en el día)")
+                return []
+            else:
+                logger.error(f"Error en GNews API: {response.status or response.error}")
+                return []
                     
         except Exception as e:
             logger.error(f"Error obteniendo noticias para {ticker}: {str(e)}")
             return []
     
+    async def _get_news_or_none(self, ticker: str, company_name: str = None) -> Optional[List[NewsItem]]:
+        news_items = await self._get_news_gnews(ticker, company_name)
+        return news_items or None
+    
+    @property
+    def model_id(self) -> str:
+        """Modelo, revisión y backend con los que se generan (y cachean) los resultados"""
+        model_id = f"{settings.SENTIMENT_MODEL}@{settings.SENTIMENT_MODEL_REVISION}"
+        # El int8 puede diferir levemente del modelo completo: sus resultados se cachean aparte
+        return model_id if self.backend_name == "transformers" else f"{model_id}+{self.backend_name}"
+    
+    async def _analyze_sentiment(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Sentimiento de cada texto: primero el cache por artículo y solo los
+        textos nuevos pasan por el worker de inferencia (por palabras clave si
+        está saturado o si el modelo todavía no cargó). Los resultados del
+        modelo se guardan en bloque
+        """
+        if not texts:
+            return []
+        
+        model = self.model_id
+        keys = [SentimentCache.key(text, model) for text in texts]
+        cached = await asyncio.to_thread(self.sentiment_cache.get_many, keys)
+        pending = {key: text for key, text in zip(keys, texts) if key not in cached}
+        
+        if pending and self.model_state != "ready":
+            # Mientras el modelo carga no se bloquea la request: palabras clave
+            self.start_warm_up()
+            fresh = self._analyze_sentiment_fallback(list(pending.values()))
+            cached.update(zip(pending.keys(), fresh))
+        elif pending:
+            try:
+                fresh = await self.worker.submit(list(pending.values()))
+            except SentimentUnavailable as e:
+                logger.warning(f"{str(e)}, usando análisis por palabras clave")
+                fresh = self._analyze_sentiment_fallback(list(pending.values()))
+            computed = dict(zip(pending.keys(), fresh))
+            # Los resultados del respaldo por palabras clave no se cachean
+            await asyncio.to_thread(self.sentiment_cache.put_many, {
+                key: result for key, result in computed.items() if result.get('model') == model
+            })
+            cached.update(computed)
+        
+        return [
+            {'text': text, 'sentiment': cached[key]['sentiment'], 'confidence': cached[key]['confidence']}
+            for key, text in zip(keys, texts)
+        ]
+    
     def _analyze_sentiment_bert(self, texts: List[str]) -> List[Dict[str, Any]]:
-        """Analiza sentimiento usando BERT"""
+        """Analiza sentimiento usando BERT (bloqueante, corre en el worker)"""
         if not texts:
             return []
             
@@ -125,30 +231,26 @@ class SentimentAnalyzer:
             if self.sentiment_pipeline == "fallback":
                 return self._analyze_sentiment_fallback(texts)
             
-            # Procesar textos en lotes pequeños para evitar problemas de memoria
-            batch_size = 5
-            results = []
+            # Un forward con padding por lote; el worker ya juntó los textos
+            # de los pedidos concurrentes según el tamaño que ajusta el tuner
+            batch_results = self.sentiment_pipeline(
+                texts, batch_size=min(len(texts), settings.SENTIMENT_MAX_BATCH)
+            )
+            label_map = {
+                'POS': 'positive',
+                'NEG': 'negative',
+                'NEU': 'neutral'
+            }
             
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                batch_results = self.sentiment_pipeline(batch)
-                
-                for j, result in enumerate(batch_results):
-                    # Convertir labels del modelo BETO
-                    label_map = {
-                        'POS': 'positive',
-                        'NEG': 'negative', 
-                        'NEU': 'neutral'
-                    }
-                    
-                    sentiment = label_map.get(result['label'], 'neutral')
-                    confidence = result['score']
-                    
-                    results.append({
-                        'text': batch[j],
-                        'sentiment': sentiment,
-                        'confidence': confidence
-                    })
+            results = []
+            for text, result in zip(texts, batch_results):
+                # Convertir labels del modelo BETO
+                results.append({
+                    'text': text,
+                    'sentiment': label_map.get(result['label'], 'neutral'),
+                    'confidence': result['score'],
+                    'model': self.model_id
+                })
             
             return results
             
@@ -230,8 +332,11 @@ class SentimentAnalyzer:
     async def analyze_ticker_sentiment(self, ticker: str, company_name: str = None) -> Dict[str, Any]:
         """Análisis completo de sentimiento para un ticker"""
         try:
-            # Obtener noticias
-            news_items = await self._get_news_gnews(ticker, company_name)
+            # Obtener noticias (cacheadas; una búsqueda sin resultados no se cachea)
+            news_key = f"{ticker}|{company_name or ''}"
+            news_items = await self.cache.get_or_load(
+                "news", news_key, lambda: self._get_news_or_none(ticker, company_name)
+            ) or []
             
             if not news_items:
                 logger.info(f"No se encontraron noticias para {ticker}, usando score neutral")
@@ -255,7 +360,7 @@ class SentimentAnalyzer:
                 texts.append(text)
             
             # Analizar sentimiento
-            sentiment_results = self._analyze_sentiment_bert(texts)
+            sentiment_results = await self._analyze_sentiment(texts)
             
             # Calcular score final
             sentiment_score = self._calculate_sentiment_score(sentiment_results)
@@ -276,6 +381,7 @@ class SentimentAnalyzer:
             
             # Calcular confidence promedio
             avg_confidence = sum(r.get('confidence', 0.5) for r in sentiment_results) / len(sentiment_results)
+            as_of = self.cache.fetched_at("news", news_key)
             
             return {
                 "ticker": ticker,
@@ -285,6 +391,7 @@ class SentimentAnalyzer:
                 "overall_sentiment": overall_sentiment,
                 "confidence": round(avg_confidence, 3),
                 "sentiment_distribution": self._get_sentiment_distribution(sentiment_results),
+                "data_as_of": as_of.isoformat() if as_of else None,
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -312,23 +419,15 @@ class SentimentAnalyzer:
         return distribution
     
     async def health_check(self) -> bool:
-        """Verifica si el servicio está funcionando"""
-        try:
-            # Verificar API key
-            if not self.gnews_api_key:
-                return False
-            
-            # Test básico del modelo
-            test_texts = ["Esta es una noticia positiva", "Texto neutral"]
-            results = self._analyze_sentiment_bert(test_texts)
-            
-            return len(results) == 2
-            
-        except Exception as e:
-            logger.error(f"Health check de sentimiento falló: {str(e)}")
-            return False
+        """
+        Verifica si el servicio está funcionando, sin correr inferencia: sin API
+        key no hay noticias que analizar. El estado del modelo está en readiness()
+        """
+        return bool(self.gnews_api_key)
     
     async def close(self):
-        """Cierra las conexiones"""
-        if self.session and not self.session.closed:
-            await self.session.close() 
\ No newline at end of file
+        """Cierra las conexiones (el pool compartido lo cierra la app) y el worker de inferencia"""
+        await self.worker.close()
+        self.sentiment_cache.close()
+        if self._owns_http:
+            await self.http.close() 
\ No newline at end of file
@@ -0,0 +1,132 @@
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Nombres de archivo dentro de SENTIMENT_ONNX_DIR
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+
+
+class OnnxSentimentBackend:
+    """
+    BETO exportado a ONNX con cuantización dinámica int8, ejecutado con ONNX Runtime en CPU
+    Se llama igual que el pipeline de transformers: backend(textos, batch_size=n)
+    devuelve [{"label": "POS", "score": 0.93}, ...]. Solo necesita el tokenizer
+    de transformers, no torch
+    """
+    
+    def __init__(self, model_dir: Optional[str] = None):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+        
+        self.model_dir = Path(model_dir or settings.SENTIMENT_ONNX_DIR)
+        model_path = self.model_dir / ONNX_INT8_FILE
+        if not model_path.exists():
+            raise FileNotFoundError(f"No existe {model_path} (generarlo con `make sentiment-onnx`)")
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.id2label = AutoConfig.from_pretrained(self.model_dir).id2label
+        options = ort.SessionOptions()
+        if settings.SENTIMENT_ONNX_THREADS:
+            options.intra_op_num_threads = settings.SENTIMENT_ONNX_THREADS
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+    
+    def __call__(self, texts: List[str], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        batch_size = batch_size or len(texts) or 1
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=settings.SENTIMENT_MAX_LENGTH,
+                return_tensors="np"
+            )
+            feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+            logits = self.session.run(None, feeds)[0]
+            # Softmax estable por fila
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+            for row in probs:
+                index = int(row.argmax())
+                results.append({"label": self.id2label[index], "score": float(row[index])})
+        return results
+
+
+def _load_transformers() -> Callable:
+    """Pipeline de transformers sobre PyTorch (precisión completa)"""
+    from transformers import pipeline
+    return pipeline(
+        "sentiment-analysis",
+        model=settings.SENTIMENT_MODEL,
+        revision=settings.SENTIMENT_MODEL_REVISION,
+        device=-1,  # CPU para evitar problemas de GPU
+        truncation=True,
+        max_length=settings.SENTIMENT_MAX_LENGTH
+    )
+
+
+def _load_onnx() -> Callable:
+    return OnnxSentimentBackend()
+
+
+# Backend de inferencia -> función que lo carga
+BACKENDS: Dict[str, Callable[[], Callable]] = {
+    "transformers": _load_transformers,
+    "onnx": _load_onnx,
+}
+
+
+def load_backend(name: Optional[str] = None) -> Callable:
+    """Carga el backend de inferencia configurado en SENTIMENT_BACKEND"""
+    name = name or settings.SENTIMENT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de sentimiento desconocido: {name} (opciones: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def export_onnx(output_dir: Optional[str] = None) -> Path:
+    """
+    Exporta SENTIMENT_MODEL a ONNX y lo cuantiza (pesos int8, activaciones
+    dinámicas). Guarda también tokenizer y config para que el backend ONNX
+    no dependa del Hub. Requiere torch, transformers y onnxruntime
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    
+    output = Path(output_dir or settings.SENTIMENT_ONNX_DIR)
+    output.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(settings.SENTIMENT_MODEL, revision=settings.SENTIMENT_MODEL_REVISION)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        settings.SENTIMENT_MODEL, revision=settings.SENTIMENT_MODEL_REVISION
+    ).eval()
+    
+    sample = tokenizer(["YPF sube tras el balance trimestral"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    
+    fp32_path = output / ONNX_FP32_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    quantize_dynamic(str(fp32_path), str(output / ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output)
+    model.config.save_pretrained(output)
+    logger.info(f"Modelo ONNX int8 exportado en {output / ONNX_INT8_FILE}")
+    return output
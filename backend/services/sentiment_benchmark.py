@@ -0,0 +1,158 @@
+"""
+Comparación de backends de sentimiento (transformers vs ONNX int8)
+
+Cada backend corre en un proceso nuevo, así la memoria medida (RSS) es solo
+la suya. Reporta tiempo de carga, latencia por lote (p50/p95), throughput,
+RSS y el acuerdo de labels de cada backend contra el primero de la lista
+(el de referencia). Sale con código 1 si algún backend queda por debajo de
+--min-agreement.
+
+Uso:
+    python -m services.sentiment_benchmark --export
+    python -m services.sentiment_benchmark --backends transformers onnx --texts noticias.txt
+"""
+import argparse
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.sentiment_backends import BACKENDS, export_onnx, load_backend
+
+logger = logging.getLogger(__name__)
+
+# Titulares de ejemplo si no se pasa un archivo de textos
+SAMPLE_TEXTS = [
+    "YPF sube 8% tras presentar un balance con ganancias récord",
+    "Grupo Galicia cae por la incertidumbre cambiaria",
+    "Pampa Energía anunció inversiones por USD 500 millones en Vaca Muerta",
+    "El riesgo país se mantiene estable a la espera de datos de inflación",
+    "Telecom Argentina reportó pérdidas por la devaluación del peso",
+    "Central Puerto completa la compra de un parque eólico",
+    "Banco Macro distribuirá dividendos a sus accionistas",
+    "Loma Negra enfrenta una caída en la demanda de cemento",
+    "MercadoLibre amplía su negocio de créditos en la región",
+    "TGS obtuvo la adjudicación de la ampliación del gasoducto",
+    "Supervielle recorta personal ante la baja de la rentabilidad",
+    "Cresud informó una cosecha menor a la esperada por la sequía",
+    "Vista Oil & Gas alcanza un nuevo récord de producción",
+    "El BCRA mantuvo sin cambios la tasa de política monetaria",
+    "Globant presentó resultados en línea con lo esperado",
+    "Despegar sufre por la baja del turismo emisivo",
+]
+
+
+def _rss_mb() -> float:
+    """RSS actual del proceso en MB (Linux); si no está disponible, el pico"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(name: str, texts: List[str], batch_size: int, repeat: int) -> Dict[str, Any]:
+    """Carga un backend y mide latencia, throughput y memoria (corre en su propio proceso)"""
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    backend = load_backend(name)
+    load_seconds = time.perf_counter() - start
+    
+    backend(texts[:batch_size], batch_size=batch_size)  # Warm-up
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        labels = []
+        for i in range(0, len(texts), batch_size):
+            batch_start = time.perf_counter()
+            labels.extend(r["label"] for r in backend(texts[i:i + batch_size], batch_size=batch_size))
+            latencies.append(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+    
+    return {
+        "backend": name,
+        "load_seconds": round(load_seconds, 2),
+        "p50_batch_ms": round(1000 * float(np.percentile(latencies, 50)), 1),
+        "p95_batch_ms": round(1000 * float(np.percentile(latencies, 95)), 1),
+        "texts_per_second": round(repeat * len(texts) / elapsed, 1),
+        "rss_mb": round(_rss_mb(), 1),
+        "model_rss_mb": round(_rss_mb() - rss_before, 1),
+        "labels": labels,
+    }
+
+
+def agreement(reference: List[str], other: List[str]) -> float:
+    """Proporción de textos con el mismo label"""
+    if not reference:
+        return 1.0
+    return sum(a == b for a, b in zip(reference, other)) / len(reference)
+
+
+def compare(backends: List[str], texts: List[str], batch_size: int = 16, repeat: int = 3,
+            isolate: bool = True) -> List[Dict[str, Any]]:
+    """Corre cada backend (en un proceso aparte si `isolate`) y agrega el acuerdo contra el primero"""
+    results = []
+    for name in backends:
+        if isolate:
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                result = pool.apply(run_backend, (name, texts, batch_size, repeat))
+        else:
+            result = run_backend(name, texts, batch_size, repeat)
+        results.append(result)
+    
+    reference = results[0]["labels"] if results else []
+    for result in results:
+        result["label_agreement"] = round(agreement(reference, result.pop("labels")), 4)
+    return results
+
+
+def _load_texts(path: Optional[str], size: int) -> List[str]:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = SAMPLE_TEXTS
+    # Repetir hasta `size` textos para medir throughput con lotes llenos
+    return [texts[i % len(texts)] for i in range(max(size, len(texts)))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Paridad y benchmark de backends de sentimiento")
+    parser.add_argument("--export", action="store_true", help="Exporta y cuantiza el modelo ONNX antes de comparar")
+    parser.add_argument("--backends", nargs="+", default=["transformers", "onnx"], choices=list(BACKENDS))
+    parser.add_argument("--texts", help="Archivo con un texto por línea (por defecto, titulares de ejemplo)")
+    parser.add_argument("--size", type=int, default=256, help="Cantidad de textos por repetición")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.export:
+        export_onnx()
+    
+    texts = _load_texts(args.texts, args.size)
+    results = compare(args.backends, texts, args.batch_size, args.repeat)
+    
+    print(f"\n{len(texts)} textos, lotes de {args.batch_size}, {args.repeat} repeticiones")
+    print(f"{'backend':<14}{'carga s':>9}{'p50 ms':>9}{'p95 ms':>9}{'textos/s':>10}{'RSS MB':>9}{'acuerdo':>9}")
+    for r in results:
+        print(f"{r['backend']:<14}{r['load_seconds']:>9}{r['p50_batch_ms']:>9}{r['p95_batch_ms']:>9}"
+              f"{r['texts_per_second']:>10}{r['rss_mb']:>9}{r['label_agreement']:>9.2%}")
+    
+    failed = [r["backend"] for r in results if r["label_agreement"] < args.min_agreement]
+    if failed:
+        print(f"\nAcuerdo de labels por debajo de {args.min_agreement:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
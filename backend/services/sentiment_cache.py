@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentCache:
+    """
+    Resultados de sentimiento por artículo, persistidos en SQLite
+    La clave es el hash del texto normalizado junto con el modelo y su
+    revisión: la misma noticia que vuelve en otra búsqueda (u otro ticker)
+    dentro de NEWS_DAYS_LOOKBACK no se vuelve a pasar por el modelo, y un
+    cambio de modelo invalida todo sin borrar nada. Las entradas más viejas
+    que SENTIMENT_CACHE_MAX_AGE_DAYS se purgan al abrir el archivo
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_age_days: Optional[int] = None):
+        self.path = Path(path or settings.SENTIMENT_CACHE_PATH)
+        self.max_age = 86400 * (max_age_days or settings.SENTIMENT_CACHE_MAX_AGE_DAYS)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la base la primera vez (se llama con el lock tomado)"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, sentiment TEXT NOT NULL,"
+                " confidence REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            pruned = conn.execute(
+                "DELETE FROM sentiment WHERE created_at < ?", (time.time() - self.max_age,)
+            ).rowcount
+            conn.commit()
+            if pruned:
+                logger.info(f"Cache de sentimiento: {pruned} resultados vencidos purgados")
+            self._conn = conn
+        return self._conn
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Unicode NFKC y espacios colapsados (no cambia mayúsculas: el modelo las distingue)"""
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text or "")).strip()
+    
+    @classmethod
+    def key(cls, text: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{cls.normalize(text)}".encode("utf-8")).hexdigest()
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resultados guardados para las claves pedidas (las ausentes no aparecen)"""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                # Consultas en bloques para no pasar el límite de parámetros de SQLite
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    rows = conn.execute(
+                        f"SELECT key, model, sentiment, confidence FROM sentiment"
+                        f" WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                    for key, model, sentiment, confidence in rows:
+                        found[key] = {"sentiment": sentiment, "confidence": confidence, "model": model}
+        except Exception as e:
+            logger.error(f"Error leyendo cache de sentimiento: {str(e)}")
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+    
+    def put_many(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """Guarda en una sola transacción {clave: {"sentiment", "confidence", "model"}}"""
+        if not results:
+            return
+        now = time.time()
+        rows = [
+            (key, r["model"], r["sentiment"], float(r["confidence"]), now)
+            for key, r in results.items()
+        ]
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany("INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?, ?)", rows)
+                conn.commit()
+            self.writes += len(rows)
+        except Exception as e:
+            logger.error(f"Error guardando cache de sentimiento: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "writes": self.writes,
+        }
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
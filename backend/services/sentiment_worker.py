@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentUnavailable(Exception):
+    """El worker no puede atender el pedido; el llamador usa el análisis de respaldo"""
+
+
+class SentimentQueueFull(SentimentUnavailable):
+    """La cola de inferencia siguió llena durante todo SENTIMENT_SUBMIT_TIMEOUT"""
+
+
+class SentimentWorkerClosed(SentimentUnavailable):
+    """El worker se cerró (apagado de la app) antes de atender el pedido"""
+
+
+class BatchSizeTuner:
+    """
+    Elige el tamaño de lote de inferencia según el throughput medido (textos/s)
+    Los tamaños candidatos son potencias de 2 entre SENTIMENT_MIN_BATCH y
+    SENTIMENT_MAX_BATCH. Solo cuentan los lotes que llegaron a llenarse (un lote
+    chico por falta de demanda no dice nada de la capacidad); cada
+    `tune_every` mediciones se pasa al vecino con mejor throughput o se
+    prueba uno todavía no medido
+    """
+    
+    def __init__(self, minimum: int, maximum: int, tune_every: int = 5):
+        sizes, size = [], max(minimum, 1)
+        while size < maximum:
+            sizes.append(size)
+            size *= 2
+        sizes.append(maximum)
+        self.sizes = sizes
+        self.index = len(sizes) // 2
+        self.tune_every = tune_every
+        self.throughput: Dict[int, float] = {}  # Media exponencial de textos/s por tamaño
+        self._samples = 0
+    
+    @property
+    def batch_size(self) -> int:
+        return self.sizes[self.index]
+    
+    def record(self, texts: int, seconds: float) -> None:
+        size = self.batch_size
+        if seconds <= 0 or texts < 0.75 * size:
+            return
+        rate = texts / seconds
+        previous = self.throughput.get(size)
+        self.throughput[size] = rate if previous is None else 0.7 * previous + 0.3 * rate
+        self._samples += 1
+        if self._samples % self.tune_every:
+            return
+        
+        neighbors = [i for i in (self.index - 1, self.index, self.index + 1) if 0 <= i < len(self.sizes)]
+        unexplored = [i for i in neighbors if self.sizes[i] not in self.throughput]
+        if unexplored:
+            self.index = unexplored[-1]
+        else:
+            self.index = max(neighbors, key=lambda i: self.throughput[self.sizes[i]])
+        if self.sizes[self.index] != size:
+            logger.info(f"Tamaño de lote de sentimiento: {size} -> {self.sizes[self.index]}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batch_size": self.batch_size,
+            "throughput": {size: round(rate, 1) for size, rate in sorted(self.throughput.items())},
+        }
+
+
+class SentimentWorker:
+    """
+    Inferencia de sentimiento fuera del event loop
+    - La carga del modelo y la inferencia corren en un pool dedicado de threads
+      (SENTIMENT_WORKERS); torch libera el GIL durante el forward, así que el
+      event loop sigue atendiendo requests mientras se procesa un lote
+    - Los pedidos pasan por una cola acotada (SENTIMENT_QUEUE_SIZE): submit()
+      espera lugar hasta SENTIMENT_SUBMIT_TIMEOUT y después lanza
+      SentimentQueueFull, para que el llamador use el análisis de respaldo en
+      vez de acumular trabajo que nunca se va a terminar a tiempo
+    - Micro-batching: cada consumidor junta los textos de varios pedidos
+      concurrentes (p.ej. varios tickers de la corrida diaria) en un solo
+      forward con padding y le devuelve a cada uno su parte
+    """
+    
+    def __init__(self, predict: Callable[[List[str]], List[Dict[str, Any]]],
+                 workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 submit_timeout: Optional[float] = None):
+        self.predict = predict  # Función bloqueante: textos -> resultados en el mismo orden
+        self.workers = workers or settings.SENTIMENT_WORKERS
+        self.queue_size = queue_size or settings.SENTIMENT_QUEUE_SIZE
+        self.submit_timeout = submit_timeout if submit_timeout is not None else settings.SENTIMENT_SUBMIT_TIMEOUT
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sentiment")
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumers: List[asyncio.Task] = []
+        self._pending: Set[asyncio.Future] = set()  # Pedidos encolados o en inferencia
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.queued_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.batches = 0
+        self.batched_texts = 0
+        self.tuner = BatchSizeTuner(settings.SENTIMENT_MIN_BATCH, settings.SENTIMENT_MAX_BATCH)
+    
+    def _start(self) -> asyncio.Queue:
+        """Crea la cola y los consumidores la primera vez (necesita el event loop corriendo)"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._consumers = [
+                asyncio.create_task(self._consume()) for _ in range(self.workers)
+            ]
+        return self._queue
+    
+    async def _collect(self) -> List[Tuple[List[str], asyncio.Future, float]]:
+        """
+        Junta pedidos de la cola hasta completar el tamaño de lote del tuner o
+        hasta que pasen SENTIMENT_BATCH_WAIT_MS desde el primero
+        """
+        jobs = [await self._queue.get()]
+        count = len(jobs[0][0])
+        deadline = time.monotonic() + settings.SENTIMENT_BATCH_WAIT_MS / 1000
+        while count < self.tuner.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 and self._queue.empty():
+                break
+            try:
+                job = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            jobs.append(job)
+            count += len(job[0])
+        return jobs
+    
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            collected = await self._collect()
+            try:
+                jobs = [job for job in collected if not job[1].cancelled()]
+                if not jobs:
+                    continue
+                texts = [text for job in jobs for text in job[0]]
+                start = time.monotonic()
+                self.queued_seconds += sum(start - job[2] for job in jobs)
+                try:
+                    results = await loop.run_in_executor(self.executor, self.predict, texts)
+                except Exception as e:
+                    self.failed += len(jobs)
+                    for _, future, _ in jobs:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                elapsed = time.monotonic() - start
+                self.inference_seconds += elapsed
+                self.tuner.record(len(texts), elapsed)
+                self.batches += 1
+                self.batched_texts += len(texts)
+                self.completed += len(jobs)
+                
+                # Devolver a cada llamador su porción de resultados
+                offset = 0
+                for job_texts, future, _ in jobs:
+                    if not future.done():
+                        future.set_result(results[offset:offset + len(job_texts)])
+                    offset += len(job_texts)
+            finally:
+                for _ in collected:
+                    self._queue.task_done()
+    
+    async def submit(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Encola un lote de textos y espera sus resultados"""
+        if self._closed:
+            raise SentimentWorkerClosed("Worker de sentimiento cerrado")
+        queue = self._start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        job: Tuple[List[str], asyncio.Future, float] = (texts, future, time.monotonic())
+        try:
+            await asyncio.wait_for(queue.put(job), timeout=self.submit_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            future.cancel()
+            raise SentimentQueueFull(f"Cola de sentimiento llena ({queue.qsize()} lotes pendientes)")
+        self.submitted += 1
+        return await future
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "avg_queue_ms": round(1000 * self.queued_seconds / self.completed, 1) if self.completed else None,
+            "batches": self.batches,
+            "avg_batch_texts": round(self.batched_texts / self.batches, 1) if self.batches else None,
+            "avg_batch_ms": round(1000 * self.inference_seconds / self.batches, 1) if self.batches else None,
+            **self.tuner.stats(),
+        }
+    
+    async def close(self) -> None:
+        """
+        Detiene los consumidores y el pool de inferencia. Los pedidos que
+        seguían en la cola o en inferencia fallan con SentimentWorkerClosed
+        (no quedan esperando para siempre) y los submit() posteriores también
+        """
+        self._closed = True
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self._queue = None
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(SentimentWorkerClosed("Worker de sentimiento cerrado"))
+        self._pending.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
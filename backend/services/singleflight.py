@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+# Instancias vivas, para exponer sus contadores en /api/metrics
+_instances: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas concurrentes idénticas
+    Mientras hay una llamada en curso para una clave, los demás llamadores con
+    la misma clave esperan esa misma tarea en vez de repetir el trabajo
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0   # Ejecuciones reales
+        self.shared = 0  # Llamadas que se sumaron a una ejecución en curso
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        _instances.add(self)
+    
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Marca la excepción como leída aunque ya no quede nadie esperando
+        if not task.cancelled():
+            task.exception()
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Ejecuta func() una sola vez por clave entre todos los llamadores concurrentes"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.calls += 1
+        else:
+            self.shared += 1
+        # shield: si un llamador se cancela (p.ej. el cliente cortó) la tarea sigue para el resto
+        return await asyncio.shield(task)
+    
+    def is_inflight(self, key: Hashable) -> bool:
+        return key in self._inflight
+    
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "shared": self.shared, "inflight": self.inflight}
+
+
+def singleflight_stats() -> List[Dict[str, Any]]:
+    """Contadores de todas las instancias vivas"""
+    return [{"name": flight.name, **flight.stats()} for flight in _instances]
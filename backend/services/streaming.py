@@ -0,0 +1,506 @@
+"""
+Streaming intradiario de scores
+
+Un BarFeed emite barras (la barra del día en curso se va actualizando), el
+StreamingScorer recalcula en forma incremental solo el ticker afectado y el
+ScoreHub difunde los cambios del ScoreBreakdown a los suscriptores (SSE o
+WebSocket en main.py).
+
+Prueba de carga offline con el feed de replay:
+    python -m services.streaming --subscribers 500 --days 60 --ticks 4
+"""
+import abc
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Any, List, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+from config.settings import settings
+from models.schemas import ScoreBreakdown, RecommendationResponse, TechnicalIndicators
+from services.indicator_state import IndicatorState
+from services.price_store import PriceStore
+from services.technical_analysis import TechnicalAnalyzer
+from services.universe import Universe
+
+logger = logging.getLogger(__name__)
+
+
+class Bar(NamedTuple):
+    """Barra diaria de un ticker; varias barras con la misma fecha son actualizaciones intradiarias"""
+    ticker: str
+    date: str  # YYYY-MM-DD
+    close: float
+    volume: float
+
+
+def _to_float(value: Any) -> float:
+    value = float(value)
+    return 0.0 if math.isnan(value) else value
+
+
+class BarFeed(abc.ABC):
+    """Fuente de barras del streaming"""
+    
+    def __init__(self, tickers: List[str]):
+        self.tickers = list(tickers)
+    
+    async def history(self, ticker: str) -> Optional[pd.DataFrame]:
+        """
+        Barras cerradas anteriores a la primera que emite el feed, para sembrar el
+        estado de indicadores. None = usar el histórico del TechnicalAnalyzer
+        """
+        return None
+    
+    @abc.abstractmethod
+    def bars(self) -> AsyncIterator[Bar]:
+        """Iterador asíncrono de barras en orden de fecha"""
+
+
+class YFinanceFeed(BarFeed):
+    """Feed en vivo: consulta periódicamente la barra diaria en curso de todo el universo"""
+    
+    def __init__(self, technical_analyzer: TechnicalAnalyzer, tickers: List[str],
+                 poll_seconds: Optional[int] = None):
+        super().__init__(tickers)
+        self.technical_analyzer = technical_analyzer
+        self.poll_seconds = poll_seconds or settings.STREAM_POLL_SECONDS
+    
+    def _symbols(self) -> Dict[str, str]:
+        """Símbolo de yfinance de cada ticker (omite los que no tienen datos)"""
+        symbols = {}
+        for ticker in self.tickers:
+            known, symbol = self.technical_analyzer.symbol_resolver.lookup(ticker)
+            if not known or symbol:
+                symbols[ticker] = symbol or self.technical_analyzer.symbol_resolver.preferred(ticker)
+        return symbols
+    
+    async def bars(self) -> AsyncIterator[Bar]:
+        last_emitted: Dict[str, Bar] = {}
+        while True:
+            try:
+                symbols = self._symbols()
+                # Un solo request para todo el universo por ciclo de polling
+                frames = await self.technical_analyzer.fetch_frames(list(symbols.values()), period="5d")
+                
+                for ticker, symbol in symbols.items():
+                    frame = frames.get(symbol)
+                    if frame is None or frame.empty:
+                        continue
+                    bar = Bar(
+                        ticker,
+                        frame.index[-1].strftime("%Y-%m-%d"),
+                        _to_float(frame['Close'].iloc[-1]),
+                        _to_float(frame['Volume'].iloc[-1])
+                    )
+                    # Solo se emiten las barras que cambiaron desde el último ciclo
+                    if last_emitted.get(ticker) != bar:
+                        last_emitted[ticker] = bar
+                        yield bar
+            
+            except Exception as e:
+                logger.error(f"Error consultando barras en vivo: {str(e)}")
+            
+            await asyncio.sleep(self.poll_seconds)
+
+
+class ReplayFeed(BarFeed):
+    """
+    Feed offline que reproduce las últimas barras guardadas en el PriceStore
+    Cada barra se emite en `ticks_per_bar` actualizaciones intradiarias
+    (interpolando de la apertura al cierre) para ejercitar el camino incremental
+    """
+    
+    def __init__(self, tickers: List[str], days: Optional[int] = None, ticks_per_bar: int = 1,
+                 interval: Optional[float] = None, price_store: Optional[PriceStore] = None):
+        super().__init__(tickers)
+        self.days = days or settings.STREAM_REPLAY_DAYS
+        self.ticks_per_bar = max(ticks_per_bar, 1)
+        self.interval = settings.STREAM_REPLAY_INTERVAL if interval is None else interval
+        self.price_store = price_store or PriceStore()
+        self._frames: Optional[Dict[str, pd.DataFrame]] = None
+    
+    def _load(self) -> Dict[str, pd.DataFrame]:
+        if self._frames is None:
+            self._frames = self.price_store.read_many(self.tickers)
+        return self._frames
+    
+    async def history(self, ticker: str) -> Optional[pd.DataFrame]:
+        frame = self._load().get(ticker)
+        if frame is None:
+            return pd.DataFrame(columns=["Close", "Volume"])
+        return frame.iloc[:-self.days]
+    
+    async def bars(self) -> AsyncIterator[Bar]:
+        # Fecha -> [(ticker, apertura, cierre, volumen)] con las barras a reproducir
+        sessions: Dict[str, List[tuple]] = {}
+        for ticker, frame in self._load().items():
+            tail = frame.iloc[-self.days:]
+            dates = TechnicalAnalyzer.bar_dates(tail)
+            for date, open_, close, volume in zip(dates, tail['Open'], tail['Close'], tail['Volume']):
+                open_ = close if math.isnan(open_) else open_
+                sessions.setdefault(date, []).append((ticker, open_, close, _to_float(volume)))
+        
+        for date in sorted(sessions):
+            for step in range(1, self.ticks_per_bar + 1):
+                fraction = step / self.ticks_per_bar
+                for ticker, open_, close, volume in sessions[date]:
+                    price = close if step == self.ticks_per_bar else open_ + (close - open_) * fraction
+                    yield Bar(ticker, date, float(price), volume * fraction)
+                # También cede el event loop cuando el intervalo es 0
+                await asyncio.sleep(self.interval)
+
+
+class StreamingScorer:
+    """
+    Rescoring técnico incremental por ticker
+    Las barras cerradas se incorporan al IndicatorState del ticker; la barra en
+    curso se evalúa con peek() hasta que llega una barra de fecha posterior
+    """
+    
+    def __init__(self, technical_analyzer: TechnicalAnalyzer):
+        self.technical_analyzer = technical_analyzer
+        self.states: Dict[str, IndicatorState] = {}
+        self.pending: Dict[str, Bar] = {}
+        self.breakdowns: Dict[str, ScoreBreakdown] = {}
+        # Scores no técnicos vigentes por ticker (se actualizan con cada análisis completo)
+        self.context: Dict[str, Dict[str, float]] = {}
+    
+    def seed(self, ticker: str, history: Optional[pd.DataFrame]) -> None:
+        """Siembra el estado de un ticker con barras ya cerradas"""
+        state = IndicatorState()
+        if history is not None and not history.empty:
+            dates = self.technical_analyzer.bar_dates(history)
+            for date, close, volume in zip(dates, history['Close'], history['Volume']):
+                state.update(date, float(close), float(volume))
+        self.states[ticker] = state
+        self.pending.pop(ticker, None)
+    
+    def set_context(self, ticker: str, **scores: Optional[float]) -> None:
+        """Actualiza los scores fundamental/macro/sentimiento usados en el total"""
+        context = self.context.setdefault(ticker, {})
+        context.update({name: value for name, value in scores.items() if value is not None})
+    
+    def on_bar(self, bar: Bar) -> Optional[Dict[str, Any]]:
+        """
+        Procesa una barra del feed y recalcula el score del ticker
+        Devuelve los campos del ScoreBreakdown que cambiaron (None si ninguno)
+        """
+        state = self.states.setdefault(bar.ticker, IndicatorState())
+        if state.last_date is not None and bar.date <= state.last_date:
+            return None  # Barra ya incorporada
+        
+        pending = self.pending.get(bar.ticker)
+        if pending is not None:
+            if bar.date < pending.date:
+                return None  # Llegó fuera de orden
+            if bar.date > pending.date:
+                # Empezó una sesión nueva: la barra en curso quedó cerrada
+                state.update(pending.date, pending.close, pending.volume)
+        self.pending[bar.ticker] = bar
+        
+        indicators = state.peek(bar.date, bar.close, bar.volume)
+        breakdown = self._breakdown(bar.ticker, indicators, bar.close)
+        previous = self.breakdowns.get(bar.ticker)
+        self.breakdowns[bar.ticker] = breakdown
+        return self._diff(previous, breakdown)
+    
+    def _breakdown(self, ticker: str, indicators: TechnicalIndicators, price: float) -> ScoreBreakdown:
+        technical_score, signals = self.technical_analyzer.evaluate(indicators, price)
+        
+        context = self.context.get(ticker, {})
+        fundamental_score = context.get("fundamental_score", 50.0)
+        macro_score = context.get("macro_score", 50.0)
+        sentiment_score = context.get("sentiment_score", 50.0)
+        total_score = (
+            settings.TECHNICAL_WEIGHT * technical_score +
+            settings.FUNDAMENTAL_WEIGHT * fundamental_score +
+            settings.MACRO_WEIGHT * macro_score +
+            settings.SENTIMENT_WEIGHT * sentiment_score
+        )
+        
+        rsi = indicators.rsi
+        return ScoreBreakdown(
+            ticker=ticker,
+            technical_score=round(technical_score, 2),
+            fundamental_score=round(fundamental_score, 2),
+            macro_score=round(macro_score, 2),
+            sentiment_score=round(sentiment_score, 2),
+            total_score=round(total_score, 2),
+            rsi=round(rsi, 2) if rsi is not None and not math.isnan(rsi) else None,
+            macd_signal=signals.get('macd'),
+            moving_average_trend=signals.get('trend')
+        )
+    
+    @staticmethod
+    def _diff(previous: Optional[ScoreBreakdown], current: ScoreBreakdown) -> Optional[Dict[str, Any]]:
+        new = current.model_dump(mode="json", exclude={"timestamp"})
+        if previous is None:
+            return new
+        old = previous.model_dump(mode="json", exclude={"timestamp"})
+        changes = {name: value for name, value in new.items() if old.get(name) != value}
+        return changes or None
+
+
+class Subscription:
+    """
+    Cola acotada de un suscriptor
+    Cada elemento es un lote de mensajes JSON ya serializados
+    """
+    
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(maxsize, 1))
+        self.resyncs = 0
+    
+    async def get(self) -> Optional[Tuple[str, ...]]:
+        return await self.queue.get()
+
+
+class ScoreHub:
+    """
+    Difusión de mensajes a los suscriptores
+    - Cada mensaje se serializa una sola vez para todos los suscriptores
+    - Los mensajes publicados en la misma vuelta del event loop se entregan
+      como un único lote (una operación de cola por suscriptor)
+    - Si la cola de un suscriptor lento se llena se descartan sus pendientes
+      y se le envía un snapshot completo
+    """
+    
+    def __init__(self, snapshot: Callable[[], str], queue_size: Optional[int] = None):
+        self.snapshot = snapshot
+        self.queue_size = queue_size or settings.STREAM_QUEUE_SIZE
+        self.subscribers: Set[Subscription] = set()
+        self.published = 0
+        self.resyncs = 0
+        self._batch: List[str] = []
+    
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        subscription.queue.put_nowait((self.snapshot(),))
+        self.subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+    
+    def publish(self, message: Dict[str, Any]) -> None:
+        if not self._batch:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._batch.append(json.dumps(message))
+        self.published += 1
+    
+    def _flush(self) -> None:
+        batch, self._batch = tuple(self._batch), []
+        for subscription in self.subscribers:
+            try:
+                subscription.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self._resync(subscription)
+    
+    def _resync(self, subscription: Subscription) -> None:
+        """Vacía la cola del suscriptor y la reemplaza por el estado completo"""
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait((self.snapshot(),))
+        subscription.resyncs += 1
+        self.resyncs += 1
+
+
+class StreamingService:
+    """Conecta el feed de barras, el rescoring incremental y la difusión a suscriptores"""
+    
+    def __init__(self, technical_analyzer: TechnicalAnalyzer, feed: Optional[BarFeed] = None,
+                 queue_size: Optional[int] = None, universe: Optional[Universe] = None):
+        self.technical_analyzer = technical_analyzer
+        # Mismos tickers que la corrida diaria
+        self.universe = universe or Universe()
+        self.feed = feed or self._default_feed()
+        self.scorer = StreamingScorer(technical_analyzer)
+        self.hub = ScoreHub(self._snapshot, queue_size)
+        self.bars_processed = 0
+        self._snapshot_payload: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self.restarts = 0
+    
+    def _default_feed(self) -> BarFeed:
+        tickers = self.universe.tickers()
+        if settings.STREAM_FEED == "replay":
+            return ReplayFeed(tickers)
+        return YFinanceFeed(self.technical_analyzer, tickers)
+    
+    async def _warm_up(self) -> None:
+        """Siembra el estado de indicadores de cada ticker antes de consumir el feed"""
+        async def seed(ticker: str) -> None:
+            history = await self.feed.history(ticker)
+            if history is None:
+                # La última barra del histórico es la del día en curso: la aporta el feed
+                data = await self.technical_analyzer.get_stock_data(ticker)
+                history = data.iloc[:-1] if data is not None else None
+            self.scorer.seed(ticker, history)
+        
+        results = await asyncio.gather(*(seed(t) for t in self.feed.tickers), return_exceptions=True)
+        for ticker, result in zip(self.feed.tickers, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error sembrando streaming de {ticker}: {result}")
+    
+    async def _consume(self) -> None:
+        """Siembra los estados y procesa el feed hasta que termine"""
+        await self._warm_up()
+        async for bar in self.feed.bars():
+            self.bars_processed += 1
+            changes = self.scorer.on_bar(bar)
+            if not changes:
+                continue
+            self._snapshot_payload = None
+            self.hub.publish({
+                "type": "delta",
+                "ticker": bar.ticker,
+                "date": bar.date,
+                "changes": changes,
+                "timestamp": datetime.now().isoformat()
+            })
+    
+    async def _run(self) -> None:
+        """
+        Consume el feed; si falla se reanuda con backoff exponencial, así los
+        suscriptores SSE/WS no quedan esperando un feed que ya no corre
+        """
+        failures = 0
+        while True:
+            processed = self.bars_processed
+            try:
+                await self._consume()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # El backoff crece solo mientras el feed falla sin entregar barras
+                failures = failures + 1 if self.bars_processed == processed else 1
+                self.restarts += 1
+                delay = min(settings.STREAM_RESTART_BASE_SECONDS * 2 ** (failures - 1),
+                            settings.STREAM_RESTART_MAX_SECONDS)
+                logger.error(f"Error en el streaming de scores: {str(e)} (reintento en {delay:.1f}s)")
+                await asyncio.sleep(delay)
+    
+    def _on_done(self, task: asyncio.Task) -> None:
+        # Un feed terminado o cancelado se puede volver a arrancar con start()
+        if self._task is task:
+            self._task = None
+    
+    def _snapshot(self) -> str:
+        """Mensaje con el ScoreBreakdown vigente de todos los tickers (cacheado hasta el próximo cambio)"""
+        if self._snapshot_payload is None:
+            self._snapshot_payload = json.dumps({
+                "type": "snapshot",
+                "scores": {
+                    ticker: breakdown.model_dump(mode="json")
+                    for ticker, breakdown in self.scorer.breakdowns.items()
+                },
+                "timestamp": datetime.now().isoformat()
+            })
+        return self._snapshot_payload
+    
+    def start(self) -> None:
+        """Arranca el consumo del feed (una sola vez)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._on_done)
+    
+    async def wait(self) -> None:
+        """Espera a que el feed termine (solo termina el replay)"""
+        task = self._task
+        if task is not None:
+            await task
+    
+    def subscribe(self) -> Subscription:
+        self.start()
+        return self.hub.subscribe()
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.hub.unsubscribe(subscription)
+    
+    def update_context(self, recommendations: List[RecommendationResponse]) -> None:
+        """Toma los scores no técnicos de las últimas recomendaciones diarias"""
+        for rec in recommendations:
+            self.scorer.set_context(
+                rec.ticker,
+                fundamental_score=rec.fundamental_score,
+                macro_score=rec.macro_score,
+                sentiment_score=rec.sentiment_score
+            )
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "subscribers": len(self.hub.subscribers),
+            "bars_processed": self.bars_processed,
+            "messages_published": self.hub.published,
+            "resyncs": self.hub.resyncs,
+            "restarts": self.restarts
+        }
+    
+    async def stop(self) -> None:
+        task = self._task
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+async def _load_test(args: argparse.Namespace) -> None:
+    """Replay de barras guardadas hacia N suscriptores en proceso"""
+    feed = ReplayFeed(args.tickers or Universe().tickers(), days=args.days, ticks_per_bar=args.ticks, interval=0)
+    technical_analyzer = TechnicalAnalyzer()
+    service = StreamingService(technical_analyzer, feed=feed, queue_size=args.queue_size)
+    
+    subscriptions = [service.subscribe() for _ in range(args.subscribers)]
+    slow_count = int(args.subscribers * args.slow_fraction)
+    received = [0] * len(subscriptions)
+    
+    async def consume(i: int, subscription: Subscription) -> None:
+        while True:
+            batch = await subscription.get()
+            if batch is None:
+                return
+            received[i] += len(batch)
+            # Una fracción de suscriptores lentos fuerza resincronizaciones
+            if i < slow_count:
+                await asyncio.sleep(args.slow_delay)
+    
+    consumers = [asyncio.create_task(consume(i, s)) for i, s in enumerate(subscriptions)]
+    start = time.perf_counter()
+    await service.wait()
+    for subscription in subscriptions:
+        await subscription.queue.put(None)
+    await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - start
+    
+    stats = service.stats()
+    print(f"{stats['bars_processed']} barras, {stats['messages_published']} deltas publicados "
+          f"en {elapsed:.2f}s ({stats['bars_processed'] / elapsed:.0f} barras/s)")
+    print(f"{len(subscriptions)} suscriptores, {sum(received)} mensajes entregados, "
+          f"{stats['resyncs']} resincronizaciones")
+    await technical_analyzer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del streaming de scores (replay offline)")
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=settings.STREAM_REPLAY_DAYS, help="Barras a reproducir")
+    parser.add_argument("--ticks", type=int, default=4, help="Actualizaciones intradiarias por barra")
+    parser.add_argument("--queue-size", type=int, default=settings.STREAM_QUEUE_SIZE)
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="Fracción de suscriptores lentos")
+    parser.add_argument("--slow-delay", type=float, default=0.01, help="Demora por mensaje de los lentos (s)")
+    parser.add_argument("--tickers", nargs="*", help="Tickers a reproducir (por defecto, el universo)")
+    asyncio.run(_load_test(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta
+
+from config.settings import settings
+from services.universe import Universe
+
+logger = logging.getLogger(__name__)
+
+class SymbolResolver:
+    """
+    Tabla persistente de resolución ticker -> símbolo de yfinance
+    Recuerda qué sufijo (.BA, .MX, ninguno) funcionó para cada ticker y
+    también los tickers sin datos (entradas negativas), ambos con TTL.
+    Los tickers con mercado en el universo solo prueban los sufijos de ese
+    mercado: una acción de BYMA sin sufijo puede ser otra empresa en EE.UU.
+    (AGRO es Agrometal en BYMA y Adecoagro en NYSE)
+    """
+    
+    SUFFIXES = ["", ".BA", ".MX"]  # Orden de preferencia al probar variantes
+    MARKET_SUFFIXES = {               # Sufijos válidos por mercado del universo
+        "byma": [".BA"],
+        "adr": [""],
+        "cedear": [""],               # Se usa el subyacente en EE.UU.
+    }
+    
+    def __init__(self, path: Optional[str] = None, universe: Optional[Universe] = None):
+        self.path = Path(path or settings.SYMBOL_CACHE_PATH)
+        self.universe = universe or Universe()
+        self.ttl = timedelta(days=settings.SYMBOL_RESOLUTION_TTL_DAYS)
+        self.negative_ttl = timedelta(hours=settings.SYMBOL_NEGATIVE_TTL_HOURS)
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Carga la tabla desde disco (vacía si no existe o está corrupta)"""
+        try:
+            if self.path.exists():
+                with open(self.path, encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la tabla de símbolos {self.path}: {str(e)}")
+        return {}
+    
+    def _save(self) -> None:
+        """Persiste la tabla de forma atómica (se llama con el lock tomado)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error guardando tabla de símbolos: {str(e)}")
+    
+    def variants(self, ticker: str) -> List[str]:
+        """Variantes de símbolo a probar para un ticker (la primera es la preferida)"""
+        suffixes = self.MARKET_SUFFIXES.get(self.universe.market(ticker), self.SUFFIXES)
+        return [f"{ticker}{suffix}" for suffix in suffixes]
+    
+    def preferred(self, ticker: str) -> str:
+        """Símbolo a usar para un ticker todavía sin resolver (descargas agrupadas)"""
+        return self.variants(ticker)[0]
+    
+    def lookup(self, ticker: str) -> Tuple[bool, Optional[str]]:
+        """
+        Busca la resolución vigente de un ticker
+        Devuelve (conocido, símbolo): (True, None) es una entrada negativa vigente
+        """
+        with self._lock:
+            entry = self.entries.get(ticker)
+        if not entry:
+            return False, None
+        
+        symbol = entry.get("symbol")
+        ttl = self.ttl if symbol else self.negative_ttl
+        resolved_at = datetime.fromisoformat(entry["resolved_at"])
+        if datetime.now() - resolved_at > ttl:
+            return False, None
+        # Resolución que no corresponde al mercado del ticker (p.ej. guardada antes de conocerlo)
+        if symbol and symbol not in self.variants(ticker):
+            return False, None
+        return True, symbol
+    
+    def record(self, ticker: str, symbol: Optional[str]) -> None:
+        """Registra la variante que funcionó (None = sin datos) y persiste"""
+        self.record_many({ticker: symbol})
+    
+    def record_many(self, resolutions: Dict[str, Optional[str]]) -> None:
+        """Registra varias resoluciones con una sola escritura a disco"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for ticker, symbol in resolutions.items():
+                self.entries[ticker] = {"symbol": symbol, "resolved_at": now}
+            self._save()
+    
+    def invalidate(self, ticker: str) -> None:
+        """Elimina la resolución de un ticker (p.ej. el símbolo dejó de devolver datos)"""
+        with self._lock:
+            if self.entries.pop(ticker, None) is not None:
+                self._save()
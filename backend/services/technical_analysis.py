@@ -1,136 +1,348 @@
 import asyncio
+import bisect
+import functools
 import yfinance as yf
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 
 from config.settings import settings
 from models.schemas import TechnicalIndicators
+from services.cache import CacheService
+from services.indicator_engine import compute_indicators_batch
+from services.indicator_pipeline import technical_pipeline
+from services.indicator_state import IndicatorState, IndicatorStateStore
+from services.price_series import PriceSeries
+from services.price_store import PriceStore
+from services.symbol_resolver import SymbolResolver
+from services.universe import Universe
 
 logger = logging.getLogger(__name__)
 
+# Ventana de histórico que usan los indicadores (un año alcanza para la SMA de 200)
+HISTORY_PERIOD = "1y"
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
 class TechnicalAnalyzer:
     """Analizador técnico usando indicadores tradicionales"""
     
-    def __init__(self):
-        self.cache = {}
-        self.cache_expiry = {}
-        self.cache_duration = timedelta(minutes=settings.CACHE_EXPIRY_MINUTES)
+    def __init__(self, cache: Optional[CacheService] = None, universe: Optional[Universe] = None):
+        # Cache compartido: históricos (PriceSeries compactas) e indicadores
+        self.cache = cache or CacheService()
+        # Pool dedicado para el I/O bloqueante de yfinance (no bloquea el event loop)
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.MARKET_DATA_MAX_WORKERS,
+            thread_name_prefix="market-data"
+        )
+        # El mercado de cada ticker del universo define qué sufijos se prueban
+        self.symbol_resolver = SymbolResolver(universe=universe)
+        self.price_store = PriceStore()
+        # Estado incremental de indicadores por ticker (persistido en disco)
+        self.state_store = IndicatorStateStore()
+        self.indicator_states: Dict[str, IndicatorState] = {}
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Ejecuta una función bloqueante en el pool de datos de mercado"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    @staticmethod
+    def _download_history(symbol: str, period: Optional[str] = None, start: Optional[str] = None) -> pd.DataFrame:
+        """Descarga el histórico de un símbolo (bloqueante, corre en el executor)"""
+        if start is not None:
+            return yf.Ticker(symbol).history(start=start)
+        return yf.Ticker(symbol).history(period=period)
     
-    def _is_cache_valid(self, ticker: str) -> bool:
-        """Verifica si el cache es válido"""
-        if ticker not in self.cache_expiry:
+    @staticmethod
+    def _download_bulk(symbols: List[str], period: Optional[str] = None, start: Optional[str] = None) -> pd.DataFrame:
+        """Descarga agrupada de varios símbolos en un solo request (bloqueante)"""
+        return yf.download(
+            symbols,
+            period=period if start is None else None,
+            start=start,
+            group_by="ticker",
+            auto_adjust=True,  # Mismo ajuste que Ticker.history()
+            actions=True,      # Dividendos/splits para detectar históricos reajustados
+            threads=False,     # Ya corremos dentro del executor
+            progress=False
+        )
+    
+    @staticmethod
+    def _split_bulk_frame(bulk: pd.DataFrame, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        """Separa el DataFrame agrupado de yf.download en un frame por símbolo"""
+        frames = {}
+        if bulk is None or bulk.empty:
+            return frames
+        
+        if not isinstance(bulk.columns, pd.MultiIndex):
+            # Con un único símbolo yfinance puede devolver columnas planas
+            if len(symbols) == 1:
+                frames[symbols[0]] = bulk.dropna(how="all")
+            return frames
+        
+        available = set(bulk.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol in available:
+                frames[symbol] = bulk[symbol].dropna(how="all", subset=["Close"])
+        return frames
+    
+    @staticmethod
+    def _normalize_frame(frame: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Deja el índice como fechas diarias sin zona horaria"""
+        if frame is None or frame.empty:
+            return frame
+        frame = frame.copy()
+        index = frame.index
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        frame.index = index.normalize()
+        return frame
+    
+    @classmethod
+    def download_frames(cls, symbols: List[str], period: Optional[str] = None,
+                        start: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """Descarga agrupada y normalizada: {símbolo: OHLCV} (bloqueante)"""
+        bulk = cls._download_bulk(symbols, period=period, start=start)
+        return {
+            symbol: cls._normalize_frame(frame)
+            for symbol, frame in cls._split_bulk_frame(bulk, symbols).items()
+        }
+    
+    async def fetch_frames(self, symbols: List[str], period: Optional[str] = None,
+                           start: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """download_frames en el pool de datos de mercado"""
+        return await self._run_blocking(self.download_frames, symbols, period=period, start=start)
+    
+    @staticmethod
+    def _has_corporate_action(frame: Optional[pd.DataFrame]) -> bool:
+        """Indica si hubo dividendos o splits (yfinance reajusta todo el histórico)"""
+        if frame is None or frame.empty:
             return False
-        return datetime.now() < self.cache_expiry[ticker]
+        for column in ("Dividends", "Stock Splits"):
+            if column in frame.columns and (frame[column].fillna(0) != 0).any():
+                return True
+        return False
+    
+    @staticmethod
+    def _merge_history(stored: Optional[pd.DataFrame], fresh: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Une el histórico guardado con las barras nuevas (las nuevas pisan a las guardadas)"""
+        frames = [f[OHLCV_COLUMNS] for f in (stored, fresh) if f is not None and not f.empty]
+        if not frames:
+            return None
+        merged = pd.concat(frames)
+        return merged[~merged.index.duplicated(keep="last")].sort_index()
+    
+    @staticmethod
+    def _slice_period(history: pd.DataFrame, period: str) -> pd.DataFrame:
+        """Recorta el histórico a la ventana pedida ("6mo", "1y", "2y", "max"...)"""
+        if period == "max":
+            return history
+        if period.endswith("mo"):
+            offset = pd.DateOffset(months=int(period[:-2]))
+        elif period.endswith("y"):
+            offset = pd.DateOffset(years=int(period[:-1]))
+        elif period.endswith("d"):
+            offset = pd.DateOffset(days=int(period[:-1]))
+        else:
+            return history
+        return history[history.index >= history.index[-1] - offset]
+    
+    async def _store_history(self, ticker: str, history: pd.DataFrame, replace: bool = False) -> None:
+        """Guarda las barras cerradas; la última barra es provisoria y no se persiste"""
+        if replace:
+            await self._run_blocking(self.price_store.clear, ticker)
+        await self._run_blocking(self.price_store.append, ticker, history.iloc[:-1])
     
-    async def _get_stock_data(self, ticker: str, period: str = "6mo") -> Optional[pd.DataFrame]:
-        """Obtiene datos históricos de un ticker"""
+    async def prefetch_universe(self, tickers: Optional[List[str]] = None, period: str = HISTORY_PERIOD) -> int:
+        """
+        Descarga en bloque los históricos de todo el universo y llena el cache
+        Los tickers con histórico local solo descargan las barras posteriores a la
+        última guardada; los que no vengan en la descarga agrupada se resuelven
+        luego individualmente en get_stock_data (probando sufijos)
+        """
+        tickers = tickers or settings.ARGENTINE_TICKERS
+        pending = [t for t in tickers if self.cache.get("prices", f"{t}_{period}") is None]
+        
+        # Usar el símbolo ya resuelto y omitir los tickers sin datos conocidos
+        symbols = {}
+        resolved = set()
+        for ticker in pending:
+            known, symbol = self.symbol_resolver.lookup(ticker)
+            if known and symbol is None:
+                continue
+            symbols[ticker] = symbol or self.symbol_resolver.preferred(ticker)
+            if known:
+                resolved.add(ticker)
+        
+        if not symbols:
+            return 0
+        
         try:
-            # Verificar cache
-            cache_key = f"{ticker}_{period}"
-            if self._is_cache_valid(cache_key):
-                return self.cache[cache_key]
+            start = datetime.now()
+            stored = await self._run_blocking(self.price_store.read_many, list(resolved))
             
-            # Para tickers argentinos, intentar múltiples sufijos
-            ticker_variants = [
-                ticker,
-                f"{ticker}.BA",  # Buenos Aires
-                f"{ticker}.MX",  # México (para algunos ADRs)
-            ]
+            # Dos descargas agrupadas como máximo: solo el delta para los tickers con
+            # histórico local y el histórico completo para el resto
+            delta_tickers = {t: symbols[t] for t in stored}
+            full_tickers = {t: s for t, s in symbols.items() if t not in stored}
             
-            stock_data = None
-            for variant in ticker_variants:
-                try:
-                    stock = yf.Ticker(variant)
-                    hist = stock.history(period=period)
+            fresh = {}
+            if delta_tickers:
+                since = min(frame.index[-1] for frame in stored.values()) + timedelta(days=1)
+                bulk = await self._run_blocking(
+                    self._download_bulk, list(delta_tickers.values()), start=since.strftime("%Y-%m-%d")
+                )
+                frames = self._split_bulk_frame(bulk, list(delta_tickers.values()))
+                for ticker, symbol in delta_tickers.items():
+                    fresh[ticker] = self._normalize_frame(frames.get(symbol))
                     
-                    if not hist.empty and len(hist) > 20:  # Mínimo 20 días de datos
-                        stock_data = hist
-                        logger.info(f"Datos obtenidos para {ticker} usando {variant}")
-                        break
-                except Exception as e:
-                    logger.debug(f"Error con {variant}: {str(e)}")
-                    continue
+            rebuild = [t for t in delta_tickers if self._has_corporate_action(fresh.get(t))]
+            for ticker in rebuild:
+                # Histórico reajustado por dividendos/splits: se vuelve a bajar completo
+                stored.pop(ticker, None)
+                full_tickers[ticker] = symbols[ticker]
             
-            if stock_data is None or stock_data.empty:
-                logger.warning(f"No se pudieron obtener datos para {ticker}")
-                return None
+            if full_tickers:
+                bulk = await self._run_blocking(
+                    self._download_bulk, list(full_tickers.values()), period=settings.PRICE_STORE_BOOTSTRAP_PERIOD
+                )
+                frames = self._split_bulk_frame(bulk, list(full_tickers.values()))
+                for ticker, symbol in full_tickers.items():
+                    fresh[ticker] = self._normalize_frame(frames.get(symbol))
             
-            # Guardar en cache
-            self.cache[cache_key] = stock_data
-            self.cache_expiry[cache_key] = datetime.now() + self.cache_duration
+            loaded = 0
+            new_resolutions = {}
+            for ticker in symbols:
+                if ticker in stored:
+                    history = self._merge_history(stored[ticker], fresh.get(ticker))
+                else:
+                    history = self._merge_history(None, fresh.get(ticker))
+                
+                if history is not None and len(history) > 20:  # Mismo mínimo que la descarga individual
+                    await self._store_history(ticker, history, replace=ticker in rebuild)
+                    self.cache.set("prices", f"{ticker}_{period}", PriceSeries.from_frame(self._slice_period(history, period)))
+                    loaded += 1
+                    if ticker not in resolved:
+                        new_resolutions[ticker] = symbols[ticker]
             
-            return stock_data
+            if new_resolutions:
+                await self._run_blocking(self.symbol_resolver.record_many, new_resolutions)
             
+            elapsed = (datetime.now() - start).total_seconds()
+            logger.info(f"Prefetch de precios: {loaded}/{len(symbols)} tickers en {elapsed:.2f}s")
+            return loaded
+        
         except Exception as e:
-            logger.error(f"Error obteniendo datos para {ticker}: {str(e)}")
-            return None
+            logger.error(f"Error en descarga agrupada de precios: {str(e)}")
+            return 0
     
-    def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """Calcula el RSI (Relative Strength Index)"""
+    async def _try_symbol(self, symbol: str, period: str) -> Tuple[Optional[pd.DataFrame], bool]:
+        """
+        Intenta descargar un símbolo concreto
+        Devuelve (datos o None, si yfinance respondió sin error)
+        """
         try:
-            delta = prices.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi
+            hist = await self._run_blocking(self._download_history, symbol, period)
+            if not hist.empty and len(hist) > 20:  # Mínimo 20 días de datos
+                return self._normalize_frame(hist), True
+            return None, True
         except Exception as e:
-            logger.error(f"Error calculando RSI: {str(e)}")
-            return pd.Series()
+            logger.debug(f"Error con {symbol}: {str(e)}")
+            return None, False
     
-    def _calculate_macd(self, prices: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, pd.Series]:
-        """Calcula MACD"""
+    async def _resolve_and_fetch(self, ticker: str, period: str) -> Optional[pd.DataFrame]:
+        """Prueba todas las variantes del ticker en paralelo y recuerda la que funcionó"""
+        variants = self.symbol_resolver.variants(ticker)
+        results = await asyncio.gather(*[self._try_symbol(v, period) for v in variants])
+        
+        # Respetar el orden de preferencia de las variantes
+        for variant, (hist, _) in zip(variants, results):
+            if hist is not None:
+                logger.info(f"Datos obtenidos para {ticker} usando {variant}")
+                await self._run_blocking(self.symbol_resolver.record, ticker, variant)
+                return hist
+        
+        # Entrada negativa solo si yfinance respondió (no ante errores de red)
+        if any(answered for _, answered in results):
+            await self._run_blocking(self.symbol_resolver.record, ticker, None)
+        return None
+    
+    async def _fetch_full_history(self, ticker: str, symbol: Optional[str]) -> Optional[pd.DataFrame]:
+        """Descarga el histórico completo (bootstrap del almacén local)"""
+        period = settings.PRICE_STORE_BOOTSTRAP_PERIOD
+        if symbol:
+            history, answered = await self._try_symbol(symbol, period)
+            if history is not None or not answered:
+                return history
+            # El símbolo conocido dejó de tener datos: volver a resolver
+            await self._run_blocking(self.symbol_resolver.invalidate, ticker)
+        return await self._resolve_and_fetch(ticker, period)
+    
+    async def _fetch_delta(self, symbol: str, last_date: pd.Timestamp) -> Optional[pd.DataFrame]:
+        """Descarga solo las barras posteriores a la última guardada"""
         try:
-            exp1 = prices.ewm(span=fast).mean()
-            exp2 = prices.ewm(span=slow).mean()
-            macd = exp1 - exp2
-            signal_line = macd.ewm(span=signal).mean()
-            histogram = macd - signal_line
-            
-            return {
-                'macd': macd,
-                'signal': signal_line,
-                'histogram': histogram
-            }
+            since = (last_date + timedelta(days=1)).strftime("%Y-%m-%d")
+            fresh = self._normalize_frame(await self._run_blocking(self._download_history, symbol, start=since))
+            if fresh is None or fresh.empty:
+                return fresh
+            return fresh[fresh.index > last_date]
         except Exception as e:
-            logger.error(f"Error calculando MACD: {str(e)}")
-            return {}
+            logger.debug(f"Error actualizando {symbol}: {str(e)}")
+            return None
+    
+    async def get_stock_data(self, ticker: str, period: str = HISTORY_PERIOD) -> Optional[pd.DataFrame]:
+        """
+        Obtiene datos históricos de un ticker desde el cache compartido
+        Vencido el TTL se sirve el último histórico y se actualiza en background;
+        las llamadas concurrentes comparten la descarga
+        """
+        series = await self.cache.get_or_load(
+            "prices", f"{ticker}_{period}", lambda: self._load_stock_data(ticker, period)
+        )
+        return series.to_frame() if series is not None else None
+    
+    def data_as_of(self, ticker: str, period: str = HISTORY_PERIOD) -> Optional[datetime]:
+        """Momento en que se obtuvo el histórico que se está usando para el ticker"""
+        return self.cache.fetched_at("prices", f"{ticker}_{period}")
     
-    def _calculate_bollinger_bands(self, prices: pd.Series, period: int = 20, std_dev: int = 2) -> Dict[str, pd.Series]:
-        """Calcula Bandas de Bollinger"""
+    async def _load_stock_data(self, ticker: str, period: str) -> Optional[PriceSeries]:
+        """Obtiene datos históricos de un ticker: almacén local y descarga"""
         try:
-            sma = prices.rolling(window=period).mean()
-            std = prices.rolling(window=period).std()
+            # Para tickers argentinos el símbolo puede llevar sufijo (.BA, .MX)
+            known, symbol = self.symbol_resolver.lookup(ticker)
+            if known and symbol is None:
+                logger.debug(f"{ticker} sin datos según la tabla de símbolos")
+                return None
             
-            upper_band = sma + (std * std_dev)
-            lower_band = sma - (std * std_dev)
+            # Primero el almacén local: solo se descarga lo que falta
+            stored = await self._run_blocking(self.price_store.read, ticker)
+            replace = False
+            if stored is not None and symbol:
+                fresh = await self._fetch_delta(symbol, stored.index[-1])
+                if self._has_corporate_action(fresh):
+                    # Histórico reajustado por dividendos/splits: se vuelve a bajar completo
+                    stored, replace = None, True
+                    fresh = await self._fetch_full_history(ticker, symbol)
+            else:
+                fresh = await self._fetch_full_history(ticker, symbol)
+            
+            stock_data = self._merge_history(stored, fresh)
+            if stock_data is None or len(stock_data) <= 20:
+                logger.warning(f"No se pudieron obtener datos para {ticker}")
+                return None
+            
+            if fresh is not None and not fresh.empty:
+                await self._store_history(ticker, stock_data, replace=replace)
+            
+            # El cache guarda solo cierre/volumen en formato compacto
+            return PriceSeries.from_frame(self._slice_period(stock_data, period))
             
-            return {
-                'upper': upper_band,
-                'middle': sma,
-                'lower': lower_band
-            }
-        except Exception as e:
-            logger.error(f"Error calculando Bollinger Bands: {str(e)}")
-            return {}
-    
-    def _calculate_moving_averages(self, prices: pd.Series) -> Dict[str, pd.Series]:
-        """Calcula medias móviles"""
-        try:
-            return {
-                'sma_20': prices.rolling(window=20).mean(),
-                'sma_50': prices.rolling(window=50).mean(),
-                'sma_200': prices.rolling(window=200).mean(),
-                'ema_20': prices.ewm(span=20).mean(),
-                'ema_50': prices.ewm(span=50).mean()
-            }
         except Exception as e:
-            logger.error(f"Error calculando medias móviles: {str(e)}")
-            return {}
+            logger.error(f"Error obteniendo datos para {ticker}: {str(e)}")
+            return None
     
     def _calculate_technical_score(self, indicators: TechnicalIndicators, current_price: float) -> float:
         """
@@ -165,24 +377,16 @@ class TechnicalAnalyzer:
             else:
                 score += 10  # Señal bajista
         
-        # Medias móviles (25 puntos máximo)
+        # Medias móviles (25 puntos máximo); una SMA en NaN (histórico más corto
+        # que la ventana) cuenta como faltante, igual que None
         ma_signals = 0
         ma_count = 0
         
-        if indicators.sma_20 is not None:
-            ma_count += 1
-            if current_price > indicators.sma_20:
-                ma_signals += 1
-                
-        if indicators.sma_50 is not None:
-            ma_count += 1
-            if current_price > indicators.sma_50:
-                ma_signals += 1
-                
-        if indicators.sma_200 is not None:
-            ma_count += 1
-            if current_price > indicators.sma_200:
-                ma_signals += 1
+        for sma in (indicators.sma_20, indicators.sma_50, indicators.sma_200):
+            if sma is not None and not np.isnan(sma):
+                ma_count += 1
+                if current_price > sma:
+                    ma_signals += 1
         
         if ma_count > 0:
             signals_count += 1
@@ -213,40 +417,120 @@ class TechnicalAnalyzer:
         
         return round(normalized_score, 2)
     
-    async def get_technical_indicators(self, ticker: str) -> Optional[TechnicalIndicators]:
-        """Obtiene indicadores técnicos para un ticker"""
+    async def precompute_indicators(self, tickers: Optional[List[str]] = None, period: str = HISTORY_PERIOD) -> int:
+        """
+        Calcula en lote (vectorizado) los indicadores de todos los tickers con
+        precios en cache y los deja cacheados para get_technical_indicators
+        """
+        tickers = tickers or settings.ARGENTINE_TICKERS
+        frames = {}
+        for ticker in tickers:
+            series = self.cache.get("prices", f"{ticker}_{period}")
+            if series is not None and len(series):
+                frames[ticker] = series.to_frame()
+        
+        if not frames:
+            return 0
+        
         try:
-            data = await self._get_stock_data(ticker)
+            results = await self._run_blocking(compute_indicators_batch, frames)
+            for ticker, indicators in results.items():
+                self.cache.set("indicators", f"{ticker}_{period}", indicators)
+            return len(results)
+        except Exception as e:
+            logger.error(f"Error calculando indicadores en lote: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def bar_dates(data: pd.DataFrame) -> List[str]:
+        """Fechas (YYYY-MM-DD) de las barras diarias"""
+        return [ts.strftime("%Y-%m-%d") for ts in data.index]
+    
+    async def _load_indicator_state(self, ticker: str) -> Optional[IndicatorState]:
+        """Obtiene el estado incremental de un ticker (memoria o disco)"""
+        if ticker not in self.indicator_states:
+            state = await self._run_blocking(self.state_store.load, ticker)
+            if state is not None:
+                self.indicator_states[ticker] = state
+        return self.indicator_states.get(ticker)
+    
+    def _feed_new_bars(self, state: IndicatorState, data: pd.DataFrame) -> Optional[int]:
+        """
+        Incorpora al estado solo las barras cerradas posteriores a su última fecha
+        La última barra del histórico se considera provisoria y no se incorpora
+        Devuelve la cantidad de barras nuevas o None si el estado no empalma con los datos
+        """
+        dates = self.bar_dates(data)
+        if state.last_date is None or state.last_date < dates[0] or state.last_date >= dates[-1]:
+            return None
+        
+        start = bisect.bisect_right(dates, state.last_date)
+        closes = data['Close'].to_numpy(dtype=float)
+        
+        # Si el cierre de la última barra incorporada cambió (histórico reajustado
+        # por dividendos o splits) el estado ya no es válido
+        if start == 0 or dates[start - 1] != state.last_date:
+            return None
+        if not np.isclose(closes[start - 1], state.prev_close, rtol=1e-6):
+            return None
+        
+        volumes = data['Volume'].to_numpy(dtype=float)
+        for i in range(start, len(dates) - 1):
+            state.update(dates[i], closes[i], volumes[i])
+        return max(len(dates) - 1 - start, 0)
+    
+    def _seed_indicator_state(self, data: pd.DataFrame) -> IndicatorState:
+        """Construye el estado incremental a partir de todas las barras cerradas"""
+        state = IndicatorState()
+        dates = self.bar_dates(data)
+        closes = data['Close'].to_numpy(dtype=float)
+        volumes = data['Volume'].to_numpy(dtype=float)
+        for i in range(len(dates) - 1):
+            state.update(dates[i], closes[i], volumes[i])
+        return state
+    
+    async def get_technical_indicators(self, ticker: str, data: Optional[pd.DataFrame] = None) -> Optional[TechnicalIndicators]:
+        """
+        Obtiene indicadores técnicos para un ticker (reutiliza `data` si ya se descargó)
+        Usa la misma clave de cache que precompute_indicators. Vencido el cache, el
+        estado incremental del ticker incorpora solo las barras nuevas; el cálculo
+        completo corre solo sin estado previo o con un histórico reajustado, y
+        también cuando el pipeline tiene indicadores que el estado no mantiene
+        """
+        try:
+            key = f"{ticker}_{HISTORY_PERIOD}"
+            precomputed = self.cache.get("indicators", key)
+            if precomputed is not None:
+                return precomputed
+            
+            if data is None:
+                data = await self.get_stock_data(ticker)
             if data is None or data.empty:
                 return None
             
-            close_prices = data['Close']
-            volume = data['Volume']
+            if not set(technical_pipeline.indicators) <= IndicatorState.INDICATORS:
+                indicators = compute_indicators_batch({ticker: data}).get(ticker)
+                self.cache.set("indicators", key, indicators)
+                return indicators
+            
+            state = await self._load_indicator_state(ticker)
+            new_bars = self._feed_new_bars(state, data) if state is not None else None
             
-            # Calcular indicadores
-            rsi = self._calculate_rsi(close_prices)
-            macd_data = self._calculate_macd(close_prices)
-            bb_data = self._calculate_bollinger_bands(close_prices)
-            ma_data = self._calculate_moving_averages(close_prices)
+            if new_bars is None:
+                # Sin estado previo (o con un hueco/reajuste): cálculo completo y se siembra el estado
+                indicators = compute_indicators_batch({ticker: data}).get(ticker)
+                state = self._seed_indicator_state(data)
+                self.indicator_states[ticker] = state
+            else:
+                # Refresh incremental: solo se procesaron las barras nuevas
+                last_date = self.bar_dates(data.iloc[-1:])[0]
+                indicators = state.peek(last_date, float(data['Close'].iloc[-1]), float(data['Volume'].iloc[-1]))
             
-            # Obtener valores más recientes
-            latest_rsi = rsi.iloc[-1] if not rsi.empty else None
-            latest_macd = macd_data.get('macd', pd.Series()).iloc[-1] if macd_data.get('macd') is not None else None
-            latest_macd_signal = macd_data.get('signal', pd.Series()).iloc[-1] if macd_data.get('signal') is not None else None
-            latest_macd_hist = macd_data.get('histogram', pd.Series()).iloc[-1] if macd_data.get('histogram') is not None else None
+            if new_bars != 0:
+                await self._run_blocking(self.state_store.save, ticker, state.to_dict())
             
-            return TechnicalIndicators(
-                rsi=latest_rsi,
-                macd=latest_macd,
-                macd_signal=latest_macd_signal,
-                macd_histogram=latest_macd_hist,
-                sma_20=ma_data.get('sma_20', pd.Series()).iloc[-1] if ma_data.get('sma_20') is not None else None,
-                sma_50=ma_data.get('sma_50', pd.Series()).iloc[-1] if ma_data.get('sma_50') is not None else None,
-                sma_200=ma_data.get('sma_200', pd.Series()).iloc[-1] if ma_data.get('sma_200') is not None else None,
-                bollinger_upper=bb_data.get('upper', pd.Series()).iloc[-1] if bb_data.get('upper') is not None else None,
-                bollinger_lower=bb_data.get('lower', pd.Series()).iloc[-1] if bb_data.get('lower') is not None else None,
-                volume_sma=volume.rolling(window=20).mean().iloc[-1] if len(volume) >= 20 else None
-            )
+            self.cache.set("indicators", key, indicators)
+            return indicators
             
         except Exception as e:
             logger.error(f"Error calculando indicadores técnicos para {ticker}: {str(e)}")
@@ -256,7 +540,7 @@ class TechnicalAnalyzer:
         """Análisis técnico completo de un ticker"""
         try:
             # Obtener datos y calcular indicadores
-            data = await self._get_stock_data(ticker)
+            data = await self.get_stock_data(ticker)
             if data is None or data.empty:
                 logger.warning(f"No se pudieron obtener datos para {ticker}")
                 return {
@@ -269,7 +553,7 @@ class TechnicalAnalyzer:
                     "timestamp": datetime.now().isoformat()
                 }
             
-            indicators = await self.get_technical_indicators(ticker)
+            indicators = await self.get_technical_indicators(ticker, data)
             if indicators is None:
                 return {
                     "ticker": ticker,
@@ -292,6 +576,9 @@ class TechnicalAnalyzer:
             # Generar señales interpretables
             signals = self._generate_signals(indicators, current_price)
             
+            # Antigüedad del histórico usado (puede ser un dato vencido mientras se refresca)
+            as_of = self.data_as_of(ticker)
+            
             return {
                 "ticker": ticker,
                 "technical_score": technical_score,
@@ -299,6 +586,7 @@ class TechnicalAnalyzer:
                 "current_price": round(current_price, 2),
                 "price_change": round(price_change, 2),
                 "signals": signals,
+                "data_as_of": as_of.isoformat() if as_of else None,
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -314,6 +602,13 @@ class TechnicalAnalyzer:
                 "timestamp": datetime.now().isoformat()
             }
     
+    def evaluate(self, indicators: TechnicalIndicators, current_price: float) -> Tuple[float, Dict[str, str]]:
+        """Score técnico y señales para unos indicadores y un precio"""
+        return (
+            self._calculate_technical_score(indicators, current_price),
+            self._generate_signals(indicators, current_price)
+        )
+    
     def _generate_signals(self, indicators: TechnicalIndicators, current_price: float) -> Dict[str, str]:
         """Genera señales interpretables"""
         signals = {}
@@ -348,9 +643,13 @@ class TechnicalAnalyzer:
     async def health_check(self) -> bool:
         """Verifica si el servicio está funcionando"""
         try:
-            # Test con un ticker conocido
-            test_data = await self._get_stock_data("AAPL", period="1mo")
+            # Test con un ticker conocido (sin cachear ni guardar su histórico)
+            test_data = await self._run_blocking(self._download_history, "AAPL", period="5d")
             return test_data is not None and not test_data.empty
         except Exception as e:
             logger.error(f"Health check técnico falló: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+    
+    async def close(self):
+        """Libera el pool de threads de datos de mercado"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,95 @@
+import csv
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UniverseEntry(NamedTuple):
+    ticker: str
+    name: Optional[str] = None
+    market: Optional[str] = None  # adr, byma, cedear
+
+
+class Universe:
+    """
+    Universo de tickers a analizar, leído de un CSV (ticker,name,market)
+    Las líneas vacías o que empiezan con # se ignoran y los tickers repetidos
+    se cuentan una sola vez. Si el archivo no existe se usa ARGENTINE_TICKERS.
+    El archivo se relee solo cuando cambia (mtime), así se puede editar sin reiniciar
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.UNIVERSE_PATH)
+        self._mtime: Optional[float] = None
+        self._entries: List[UniverseEntry] = []
+        self._index: Dict[str, UniverseEntry] = {}  # Se rearma al releer el archivo
+        self._checked = False
+    
+    def _read(self) -> List[UniverseEntry]:
+        entries: Dict[str, UniverseEntry] = {}
+        with open(self.path, encoding="utf-8", newline="") as f:
+            rows = (line for line in f if line.strip() and not line.lstrip().startswith("#"))
+            for row in csv.DictReader(rows):
+                ticker = (row.get("ticker") or "").strip().upper()
+                if not ticker or ticker in entries:
+                    continue
+                entries[ticker] = UniverseEntry(
+                    ticker,
+                    (row.get("name") or "").strip() or None,
+                    (row.get("market") or "").strip().lower() or None
+                )
+        return list(entries.values())
+    
+    def entries(self) -> List[UniverseEntry]:
+        """Entradas del universo en el orden del archivo"""
+        self._checked = True
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            logger.warning(f"No existe el universo {self.path}, usando ARGENTINE_TICKERS")
+            return [UniverseEntry(ticker) for ticker in settings.ARGENTINE_TICKERS]
+        
+        if mtime != self._mtime:
+            try:
+                self._entries = self._read()
+                self._index = {entry.ticker: entry for entry in self._entries}
+                self._mtime = mtime
+                logger.info(f"Universo cargado: {len(self._entries)} tickers desde {self.path}")
+            except Exception as e:
+                logger.error(f"Error leyendo universo {self.path}: {str(e)}")
+                if not self._entries:
+                    return [UniverseEntry(ticker) for ticker in settings.ARGENTINE_TICKERS]
+        return self._entries
+    
+    def get(self, ticker: str) -> Optional[UniverseEntry]:
+        """
+        Entrada de un ticker por índice, sin recorrer el universo ni consultar el
+        archivo: refleja la última lectura (cada corrida recorre entries())
+        """
+        if not self._checked:
+            self.entries()
+        return self._index.get(ticker)
+    
+    def market(self, ticker: str) -> Optional[str]:
+        """Mercado del ticker según el universo (None si no figura o no lo indica)"""
+        entry = self.get(ticker)
+        return entry.market if entry else None
+    
+    def tickers(self, market: Optional[str] = None) -> List[str]:
+        return [e.ticker for e in self.entries() if market is None or e.market == market]
+    
+    def shards(self, size: int, offset: int = 0) -> Iterator[List[str]]:
+        """Recorre el universo en bloques de `size` tickers, empezando por el de índice `offset`"""
+        tickers = self.tickers()
+        if tickers:
+            offset %= len(tickers)
+            tickers = tickers[offset:] + tickers[:offset]
+        for start in range(0, len(tickers), size):
+            yield tickers[start:start + size]
+    
+    def __len__(self) -> int:
+        return len(self.entries())
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.settings import settings
+from services.backtest import BUY, HOLD, SELL, backtest_ticker, score_series, signals_from_scores
+from services.indicator_engine import compute_indicators_batch
+from services.technical_analysis import TechnicalAnalyzer
+
+
+def make_frame(length: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, length)))
+    volume = rng.integers(1_000, 100_000, length).astype(float)
+    index = pd.date_range("2023-01-02", periods=length, freq="B")
+    return pd.DataFrame({"Close": close, "Volume": volume}, index=index)
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDICATOR_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(settings, "SYMBOL_CACHE_PATH", str(tmp_path / "symbols.json"))
+    monkeypatch.setattr(settings, "PRICE_STORE_DIR", str(tmp_path / "prices"))
+    analyzer = TechnicalAnalyzer()
+    yield analyzer
+    analyzer.executor.shutdown()
+
+
+# Barras finales antes y después de que aparezcan sma_20, sma_50 y sma_200
+@pytest.mark.parametrize("end", [10, 15, 30, 60, 150, 210, 260])
+def test_score_series_matches_scalar_score(analyzer, end):
+    frame = make_frame(260, 11)
+    scores = score_series(frame)
+    
+    window = frame.iloc[:end]
+    indicators = compute_indicators_batch({"T": window})["T"]
+    expected = analyzer._calculate_technical_score(indicators, float(window["Close"].iloc[-1]))
+    assert scores.iloc[end - 1] == pytest.approx(expected, abs=1e-9)
+
+
+def test_score_series_matches_scalar_score_on_every_bar(analyzer):
+    frame = make_frame(230, 12)
+    scores = score_series(frame)
+    for end in range(2, len(frame) + 1):
+        window = frame.iloc[:end]
+        indicators = compute_indicators_batch({"T": window})["T"]
+        expected = analyzer._calculate_technical_score(indicators, float(window["Close"].iloc[-1]))
+        assert scores.iloc[end - 1] == pytest.approx(expected, abs=1e-9), end
+
+
+def test_ma_component_uses_available_averages(analyzer):
+    # Tendencia alcista de 60 barras: precio sobre sma_20 y sma_50, sin sma_200
+    frame = make_frame(60, 13)
+    frame["Close"] = np.linspace(100, 160, 60)
+    indicators = compute_indicators_batch({"T": frame})["T"]
+    assert np.isnan(indicators.sma_200)
+    
+    score = score_series(frame).iloc[-1]
+    assert score == analyzer._calculate_technical_score(indicators, 160.0)
+    # Sin el componente de medias: 2 de 2 SMA disponibles valen los 25 puntos completos
+    without_ma = indicators.model_copy(update={"sma_20": None, "sma_50": None, "sma_200": None})
+    assert score - analyzer._calculate_technical_score(without_ma, 160.0) == pytest.approx(25)
+
+
+def test_signals_from_scores_thresholds():
+    scores = pd.Series([0.0, 39.99, 40.0, 69.99, 70.0, 100.0])
+    signals = signals_from_scores(scores, {"buy": 70, "hold": 40, "sell": 0})
+    assert signals.tolist() == [SELL, SELL, HOLD, HOLD, BUY, BUY]
+
+
+def test_backtest_always_long_matches_buy_and_hold():
+    frame = make_frame(300, 14)
+    result = backtest_ticker(frame, horizon=20, warmup=50, thresholds={"buy": 0, "hold": 0})
+    
+    assert result["bars"] == 250
+    assert result["exposure"] == 1.0
+    assert result["sell_signals"] == 0
+    assert result["buy_signals"] == 250 - 20
+    assert result["strategy_return"] == pytest.approx(result["buy_and_hold_return"])
+    assert 0.0 <= result["buy_hit_rate"] <= 1.0
+
+
+def test_backtest_always_out_has_no_exposure():
+    frame = make_frame(300, 15)
+    result = backtest_ticker(frame, horizon=20, warmup=50, thresholds={"buy": 101, "hold": 101})
+    
+    assert result["exposure"] == 0.0
+    assert result["trades"] == 0
+    assert result["strategy_return"] == 0.0
+    assert result["buy_signals"] == 0
+    assert result["buy_hit_rate"] is None
+    assert result["sell_signals"] == 250 - 20
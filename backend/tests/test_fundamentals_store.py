@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.fundamental_analysis import FundamentalAnalyzer
+from services.fundamentals_store import FundamentalsStore
+from services.http_client import HttpClient
+from services.quota import QuotaLedger
+
+# Último período guardado: Q1 2025 (cierra 2025-03-31). El Q2 cierra 91 días
+# después y con 30 días de demora de presentación se espera desde 2025-07-30
+Q1 = {"date": "2025-03-31", "period": "Q1", "returnOnEquity": 12.0, "currentRatio": 1.6}
+NEXT_FILING = datetime(2025, 7, 30)
+
+
+def record(checked_at: datetime) -> dict:
+    return {"ticker": "YPF", "checked_at": checked_at.isoformat(), "periods": {"2025-03-31_Q1": Q1}}
+
+
+@pytest.fixture
+def store(tmp_path) -> FundamentalsStore:
+    store = FundamentalsStore(str(tmp_path))
+    store.filing_lag = timedelta(days=30)
+    store.recheck = timedelta(hours=24)
+    store.max_age = timedelta(days=120)
+    return store
+
+
+def test_missing_record_needs_refresh(store):
+    assert store.needs_refresh(None)
+    assert store.needs_refresh({"periods": {}})
+    assert store.needs_refresh({"periods": {"2025-03-31_Q1": Q1}})  # Sin checked_at
+
+
+def test_no_refresh_before_the_next_filing_is_due(store):
+    checked = NEXT_FILING - timedelta(days=20)
+    assert store.next_filing_expected(record(checked)) == NEXT_FILING
+    assert not store.needs_refresh(record(checked), now=NEXT_FILING - timedelta(seconds=1))
+    assert store.needs_refresh(record(checked), now=NEXT_FILING)
+
+
+def test_rechecks_at_most_once_per_interval_while_waiting(store):
+    checked = NEXT_FILING + timedelta(days=3)
+    assert not store.needs_refresh(record(checked), now=checked + timedelta(hours=23))
+    assert store.needs_refresh(record(checked), now=checked + timedelta(hours=24))
+
+
+def test_max_age_forces_a_refresh(store):
+    checked = datetime(2025, 4, 1)
+    store.filing_lag = timedelta(days=3650)  # Ningún balance esperado
+    assert not store.needs_refresh(record(checked), now=checked + timedelta(days=119))
+    assert store.needs_refresh(record(checked), now=checked + timedelta(days=120))
+
+
+def test_merge_keeps_every_period(store):
+    store.merge("YPF", [Q1])
+    merged = store.merge("YPF", [{"date": "2025-06-30", "period": "Q2", "returnOnEquity": 14.0}, {"bad": 1}])
+    assert [row["date"] for row in store.history(merged)] == ["2025-06-30", "2025-03-31"]
+    assert store.load("YPF")["periods"].keys() == merged["periods"].keys()
+
+
+async def test_data_as_of_is_when_fmp_was_last_checked(tmp_path, store):
+    checked = datetime.now() - timedelta(days=20)
+    store._save("YPF", record(checked))
+    store.filing_lag = timedelta(days=3650)
+    
+    analyzer = FundamentalAnalyzer(quota=QuotaLedger(str(tmp_path / "quota.json")), http=HttpClient())
+    analyzer.api_key = ""  # Sin requests a FMP
+    analyzer.fundamentals_store = store
+    
+    result = await analyzer.analyze_ticker("YPF")
+    assert result["ratios"]["roe"] == 12.0
+    assert result["data_as_of"] == checked.isoformat()
+    analyzer.quota.close()
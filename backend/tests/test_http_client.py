@@ -0,0 +1,171 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from config.settings import settings
+from services.http_client import HttpClient, parse_retry_after
+from services.quota import QuotaLedger
+
+
+class FakeUpstream:
+    """API local con respuestas programadas por ruta y conteo de requests"""
+
+    def __init__(self):
+        self.counts = {}
+        self.app = web.Application()
+        for path, handler in [
+            ("/flaky", self.flaky), ("/retry-after", self.retry_after), ("/daily", self.daily),
+            ("/throttled", self.throttled), ("/missing", self.missing), ("/garbage", self.garbage),
+            ("/slow", self.slow),
+        ]:
+            self.app.router.add_get(path, handler)
+
+    def hit(self, name: str) -> int:
+        self.counts[name] = self.counts.get(name, 0) + 1
+        return self.counts[name]
+
+    async def flaky(self, request):
+        # 503 dos veces, después 200
+        if self.hit("flaky") % 3:
+            return web.Response(status=503, text="down")
+        return web.json_response({"ok": True})
+
+    async def retry_after(self, request):
+        if self.hit("retry-after") == 1:
+            return web.Response(status=429, headers={"Retry-After": "0.2"})
+        return web.json_response({"ok": True})
+
+    async def daily(self, request):
+        self.hit("daily")
+        return web.Response(status=429, headers={"Retry-After": "3600"})
+    
+    async def throttled(self, request):
+        # 429 sin Retry-After: la cuota del día está agotada
+        self.hit("throttled")
+        return web.Response(status=429, text="quota exceeded")
+
+    async def missing(self, request):
+        self.hit("missing")
+        return web.Response(status=404, text="not found")
+
+    async def garbage(self, request):
+        self.hit("garbage")
+        return web.Response(status=200, text="<html>mantenimiento</html>")
+
+    async def slow(self, request):
+        # Solo la primera request lenta de cada par: la cobertura llega antes
+        n = self.hit("slow")
+        await asyncio.sleep(1.0 if request.query.get("slow") and n % 2 else 0.005)
+        return web.json_response({"n": n})
+
+
+@asynccontextmanager
+async def serve():
+    """Levanta FakeUpstream en un puerto libre y un HttpClient para consultarlo"""
+    fake = FakeUpstream()
+    runner = web.AppRunner(fake.app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    fake.url = "http://127.0.0.1:%d" % runner.addresses[0][1]
+    http = HttpClient()
+    try:
+        yield fake, http
+    finally:
+        await http.close()
+        await runner.cleanup()
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "HTTP_HEDGE_PERCENTILES", {})
+
+
+async def test_retries_5xx_until_success():
+    async with serve() as (upstream, http):
+        response = await http.get_json("test", upstream.url + "/flaky")
+        assert response.status == 200 and response.data == {"ok": True}
+        assert upstream.counts["flaky"] == 3
+        assert http.stats()["providers"]["test"]["retries"] == 2
+
+
+async def test_short_retry_after_is_honored():
+    async with serve() as (upstream, http):
+        start = time.monotonic()
+        response = await http.get_json("test", upstream.url + "/retry-after")
+        assert response.status == 200
+        assert time.monotonic() - start >= 0.2
+        assert upstream.counts["retry-after"] == 2
+
+
+async def test_long_retry_after_is_not_waited():
+    async with serve() as (upstream, http):
+        start = time.monotonic()
+        response = await http.get_json("test", upstream.url + "/daily")
+        assert response.status == 429 and response.retry_after == 3600
+        assert upstream.counts["daily"] == 1
+        assert time.monotonic() - start < 1
+
+
+async def test_429_without_retry_after_exhausts_quota(tmp_path):
+    async with serve() as (upstream, http):
+        quota = QuotaLedger(str(tmp_path / "quota.json"), limits={"test": 10})
+        response = await http.get_json("test", upstream.url + "/throttled", quota=quota)
+        assert response.status == 429 and response.quota_exhausted
+        assert upstream.counts["throttled"] == 1
+        assert quota.remaining("test") == 0
+        quota.close()
+
+
+async def test_4xx_is_not_retried():
+    async with serve() as (upstream, http):
+        response = await http.get_json("test", upstream.url + "/missing")
+        assert response.status == 404
+        assert upstream.counts["missing"] == 1
+
+
+async def test_invalid_json_is_not_retried():
+    async with serve() as (upstream, http):
+        response = await http.get_json("test", upstream.url + "/garbage")
+        assert response.status == 0 and response.invalid_body
+        assert upstream.counts["garbage"] == 1
+
+
+async def test_quota_exhaustion_stops_retries(tmp_path):
+    async with serve() as (upstream, http):
+        quota = QuotaLedger(str(tmp_path / "quota.json"), limits={"test": 2})
+        response = await http.get_json("test", upstream.url + "/flaky", quota=quota)
+        assert response.status == 503  # Última respuesta antes de quedarse sin cuota
+        assert upstream.counts["flaky"] == 2
+        assert quota.remaining("test") == 0
+
+        response = await http.get_json("test", upstream.url + "/flaky", quota=quota)
+        assert response.status == 0 and response.no_quota
+        assert upstream.counts["flaky"] == 2
+
+
+async def test_slow_request_is_hedged(monkeypatch):
+    async with serve() as (upstream, http):
+        monkeypatch.setattr(settings, "HTTP_HEDGE_PERCENTILES", {"test": 95})
+        monkeypatch.setattr(settings, "HTTP_HEDGE_MIN_SAMPLES", 5)
+        for _ in range(6):
+            upstream.counts["slow"] = 1  # Par: sin demora
+            await http.get_json("test", upstream.url + "/slow")
+
+        upstream.counts["slow"] = 0
+        start = time.monotonic()
+        response = await http.get_json("test", upstream.url + "/slow", {"slow": "1"})
+        assert response.status == 200
+        assert time.monotonic() - start < 0.5
+        stats = http.stats()["providers"]["test"]
+        assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.indicator_engine import align_right, compute_indicators_batch
+from services.indicator_pipeline import ewm_mean
+
+
+def make_frame(length: int, seed: int) -> pd.DataFrame:
+    """Histórico sintético fijo (paseo aleatorio con semilla)"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    volume = rng.integers(1_000, 100_000, length).astype(float)
+    index = pd.date_range("2023-01-02", periods=length, freq="B")
+    return pd.DataFrame({"Close": close, "Volume": volume}, index=index)
+
+
+def pandas_indicators(data: pd.DataFrame) -> dict:
+    """Cálculo de referencia con pandas (el que usaba TechnicalAnalyzer)"""
+    close, volume = data["Close"], data["Volume"]
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rsi = 100 - (100 / (1 + gain / loss))
+
+    macd = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+    signal = macd.ewm(span=9).mean()
+
+    sma_20 = close.rolling(window=20).mean()
+    std_20 = close.rolling(window=20).std()
+    return {
+        "rsi": rsi.iloc[-1],
+        "macd": macd.iloc[-1],
+        "macd_signal": signal.iloc[-1],
+        "macd_histogram": (macd - signal).iloc[-1],
+        "sma_20": sma_20.iloc[-1],
+        "sma_50": close.rolling(window=50).mean().iloc[-1],
+        "sma_200": close.rolling(window=200).mean().iloc[-1],
+        "bollinger_upper": (sma_20 + std_20 * 2).iloc[-1],
+        "bollinger_lower": (sma_20 - std_20 * 2).iloc[-1],
+        "volume_sma": volume.rolling(window=20).mean().iloc[-1] if len(volume) >= 20 else None,
+    }
+
+
+# Largos distintos para cubrir el relleno con NaN de align_right y ventanas incompletas
+FRAMES = {
+    "LONG": make_frame(300, 1),
+    "MID": make_frame(120, 2),
+    "SHORT": make_frame(30, 3),
+    "TINY": make_frame(14, 4),
+}
+
+
+@pytest.mark.parametrize("ticker", list(FRAMES))
+def test_batch_matches_pandas(ticker):
+    results = compute_indicators_batch(FRAMES)
+    expected = pandas_indicators(FRAMES[ticker])
+    actual = results[ticker].model_dump()
+    for name, value in expected.items():
+        if value is None:
+            assert actual[name] is None, name
+        else:
+            assert actual[name] == pytest.approx(value, rel=1e-9, nan_ok=True), name
+
+
+def test_ewm_matches_pandas_on_padded_rows():
+    series = [FRAMES[t]["Close"].to_numpy() for t in FRAMES]
+    matrix = align_right(series)
+    for span in (12, 20, 26, 50):
+        out = ewm_mean(matrix, span)
+        for i, values in enumerate(series):
+            expected = pd.Series(values).ewm(span=span).mean().to_numpy()
+            np.testing.assert_allclose(out[i, -len(values):], expected, rtol=1e-9)
+
+
+def test_empty_frames_are_skipped():
+    assert compute_indicators_batch({"NONE": None, "EMPTY": pd.DataFrame()}) == {}
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.indicator_engine import compute_indicators_batch
+from services.indicator_pipeline import build_default_pipeline, technical_pipeline
+
+
+def make_frame(length: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    volume = rng.integers(1_000, 100_000, length).astype(float)
+    index = pd.date_range("2023-01-02", periods=length, freq="B")
+    return pd.DataFrame({"Close": close, "Volume": volume}, index=index)
+
+
+@pytest.mark.parametrize("end", [15, 60, 210, 260])
+def test_backtest_series_match_live_indicators(end):
+    # El backtest lee la barra `end` de las series; el camino en vivo ve el histórico hasta ahí
+    frame = make_frame(260, 7)
+    series = technical_pipeline.compute(frame)
+    live = compute_indicators_batch({"T": frame.iloc[:end]})["T"].model_dump()
+    for name in technical_pipeline.indicators:
+        expected = series[name].iloc[end - 1]
+        if name == "volume_sma" and np.isnan(expected):
+            assert live[name] is None
+        else:
+            assert live[name] == pytest.approx(expected, rel=1e-12, nan_ok=True), name
+
+
+def test_registered_indicator_reaches_live_path():
+    pipeline = build_default_pipeline()
+    pipeline.register("bollinger_width", ["bollinger_upper", "bollinger_lower"], lambda u, l: u - l)
+    frame = make_frame(60, 8)
+    
+    indicators = compute_indicators_batch({"T": frame}, pipeline)["T"]
+    assert indicators.bollinger_width == pytest.approx(indicators.bollinger_upper - indicators.bollinger_lower)
+    assert "bollinger_width" in indicators.model_dump()
+    assert pipeline.compute(frame, ["bollinger_width"])["bollinger_width"].iloc[-1] == pytest.approx(indicators.bollinger_width)
+
+
+def test_primitives_are_computed_once():
+    values = technical_pipeline.compute(make_frame(30, 9))
+    # sma_20 y las Bandas de Bollinger comparten la misma media de 20 barras
+    assert "rolling_mean(close,20)" in values
+    assert "rolling_mean(close,20)" not in technical_pipeline.indicators
+    assert values["sma_20"].equals(values["rolling_mean(close,20)"])
+
+
+def test_duplicate_indicator_is_rejected():
+    with pytest.raises(ValueError):
+        build_default_pipeline().register("rsi", ["close"], lambda c: c)
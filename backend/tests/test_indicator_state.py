@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.settings import settings
+from models.schemas import TechnicalIndicators
+from services.indicator_engine import compute_indicators_batch
+from services.indicator_state import IndicatorState, IndicatorStateStore, RollingWindow
+from services.technical_analysis import TechnicalAnalyzer
+
+
+def test_std_keeps_precision_at_high_price_levels():
+    # Precio alto y casi constante: la suma de cuadrados cancela todos los dígitos
+    rng = np.random.default_rng(7)
+    values = 1e7 + rng.normal(0, 0.01, 5_000)
+    window = RollingWindow(20)
+    for i, value in enumerate(values, 1):
+        window.push(float(value))
+        if i >= 20 and i % 97 == 0:
+            expected = values[i - 20:i]
+            assert window.mean() == pytest.approx(expected.mean(), rel=1e-12)
+            assert window.std() == pytest.approx(expected.std(ddof=1), rel=1e-6)
+
+
+def test_incomplete_window_is_nan():
+    window = RollingWindow(3, [1.0, 2.0])
+    assert np.isnan(window.mean()) and np.isnan(window.std())
+    window.push(3.0)
+    assert window.mean() == 2.0 and window.std() == 1.0
+
+
+def make_frame(length: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    volume = rng.integers(1_000, 100_000, length).astype(float)
+    index = pd.date_range("2023-01-02", periods=length, freq="B")
+    return pd.DataFrame({"Close": close, "Volume": volume}, index=index)
+
+
+def assert_same(actual: TechnicalIndicators, expected: TechnicalIndicators, rel: float = 1e-9):
+    expected = expected.model_dump()
+    for name, value in actual.model_dump().items():
+        assert value == pytest.approx(expected[name], rel=rel, nan_ok=True), name
+
+
+
+@pytest.mark.parametrize("length,seed", [(300, 1), (120, 2)])
+def test_streaming_state_matches_engine(length, seed):
+    frame = make_frame(length, seed)
+    state = IndicatorState()
+    dates = TechnicalAnalyzer.bar_dates(frame)
+    for date, close, volume in zip(dates[:-1], frame["Close"], frame["Volume"]):
+        state.update(date, close, volume)
+    streamed = state.peek(dates[-1], frame["Close"].iloc[-1], frame["Volume"].iloc[-1])
+    assert_same(streamed, compute_indicators_batch({"T": frame})["T"], rel=1e-7)
+
+def test_state_survives_a_json_round_trip(tmp_path):
+    frame = make_frame(260, 1)
+    dates = TechnicalAnalyzer.bar_dates(frame)
+    state = IndicatorState()
+    for date, close, volume in zip(dates[:200], frame["Close"], frame["Volume"]):
+        state.update(date, close, volume)
+    
+    store = IndicatorStateStore(str(tmp_path))
+    store.save("TEST", state.to_dict())
+    restored = store.load("TEST")
+    assert (restored.last_date, restored.bars, restored.prev_close) == (state.last_date, state.bars, state.prev_close)
+    assert_same(restored.indicators(), state.indicators(), rel=1e-12)
+    
+    # El estado restaurado sigue igual que el original con las barras siguientes
+    for date, close, volume in zip(dates[200:], frame["Close"].iloc[200:], frame["Volume"].iloc[200:]):
+        state.update(date, close, volume)
+        restored.update(date, close, volume)
+    assert_same(restored.indicators(), state.indicators(), rel=1e-12)
+
+
+def test_corrupt_state_file_is_ignored(tmp_path):
+    (tmp_path / "TEST.json").write_text("{", encoding="utf-8")
+    assert IndicatorStateStore(str(tmp_path)).load("TEST") is None
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDICATOR_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(settings, "SYMBOL_CACHE_PATH", str(tmp_path / "symbols.json"))
+    monkeypatch.setattr(settings, "PRICE_STORE_DIR", str(tmp_path / "prices"))
+    analyzer = TechnicalAnalyzer()
+    yield analyzer
+    analyzer.executor.shutdown()
+
+
+async def test_refresh_only_feeds_new_bars(analyzer, monkeypatch):
+    frame = make_frame(260, 2)
+    await analyzer.get_technical_indicators("TEST", frame.iloc[:250])
+    
+    # Reinicio: cache y estado en memoria vacíos, el estado se lee de disco
+    analyzer.cache.clear()
+    analyzer.indicator_states.clear()
+    fed = []
+    original_update = IndicatorState.update
+    monkeypatch.setattr(IndicatorState, "update", lambda self, *bar: fed.append(bar[0]) or original_update(self, *bar))
+    
+    indicators = await analyzer.get_technical_indicators("TEST", frame)
+    dates = TechnicalAnalyzer.bar_dates(frame)
+    # Solo las diez barras cerradas nuevas, más la provisoria (peek) sobre una copia
+    assert fed == dates[249:]
+    assert_same(indicators, compute_indicators_batch({"TEST": frame})["TEST"], rel=1e-7)
+
+
+async def test_adjusted_history_rebuilds_the_state(analyzer):
+    frame = make_frame(260, 3)
+    await analyzer.get_technical_indicators("TEST", frame.iloc[:250])
+    analyzer.cache.clear()
+    
+    # Split 2:1: yfinance reajusta todo el histórico
+    adjusted = frame.assign(Close=frame["Close"] / 2)
+    indicators = await analyzer.get_technical_indicators("TEST", adjusted)
+    assert_same(indicators, compute_indicators_batch({"TEST": adjusted})["TEST"])
+    assert analyzer.indicator_states["TEST"].prev_close == pytest.approx(adjusted["Close"].iloc[-2])
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from services.cache import CacheService
+from services.price_series import PriceSeries
+
+
+def make_frame(length: int = 250) -> pd.DataFrame:
+    index = pd.date_range("2024-01-02", periods=length, freq="B")
+    close = np.linspace(100, 150, length)
+    return pd.DataFrame({"Close": close, "Volume": np.full(length, 1_000.0)}, index=index)
+
+
+def test_round_trip_keeps_dates_and_values():
+    frame = make_frame()
+    restored = PriceSeries.from_frame(frame).to_frame()
+    assert (restored.index == frame.index).all()
+    np.testing.assert_allclose(restored["Close"], frame["Close"], rtol=1e-6)
+    np.testing.assert_allclose(restored["Volume"], frame["Volume"])
+
+
+def test_cache_budget_counts_series_bytes():
+    series = PriceSeries.from_frame(make_frame())
+    assert series.nbytes == len(series) * (8 + 4 + 4)
+
+    cache = CacheService(max_bytes=3 * series.nbytes)
+    for i in range(5):
+        cache.set("prices", f"T{i}_1y", PriceSeries.from_frame(make_frame()))
+    assert cache.nbytes <= 3 * series.nbytes
+    assert cache.get("prices", "T0_1y") is None  # Las más viejas se descartaron
+    assert cache.get("prices", "T4_1y") is not None
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from services.price_store import PriceStore
+
+
+def make_ohlcv(start: str, length: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, length).cumsum()
+    index = pd.date_range(start, periods=length, freq="B")
+    return pd.DataFrame({
+        "Open": close - 0.5,
+        "High": close + 1,
+        "Low": close - 1,
+        "Close": close,
+        "Volume": rng.integers(1_000, 100_000, length).astype(float),
+    }, index=index)
+
+
+def test_round_trip(tmp_path):
+    store = PriceStore(str(tmp_path))
+    frame = make_ohlcv("2024-01-02", 30)
+    assert store.append("YPF", frame) == 30
+    
+    stored = store.read("YPF")
+    pd.testing.assert_frame_equal(stored, frame, check_freq=False, check_index_type=False)
+    assert (stored.index == frame.index).all()
+
+
+def test_append_only_writes_the_delta(tmp_path):
+    store = PriceStore(str(tmp_path))
+    frame = make_ohlcv("2024-01-02", 30)
+    store.append("YPF", frame.iloc[:20])
+    
+    # La descarga de actualización se superpone con lo guardado: solo se agregan las nuevas
+    assert store.append("YPF", frame.iloc[15:]) == 10
+    assert store.append("YPF", frame.iloc[25:]) == 0
+    assert store.read("YPF")["Close"].tolist() == frame["Close"].tolist()
+
+
+def test_timezone_aware_index_is_stored_as_dates(tmp_path):
+    store = PriceStore(str(tmp_path))
+    frame = make_ohlcv("2024-01-02", 5)
+    frame.index = frame.index.tz_localize("America/New_York") + pd.Timedelta(hours=9, minutes=30)
+    store.append("YPF", frame)
+    assert list(store.read("YPF").index) == list(pd.date_range("2024-01-02", periods=5, freq="B"))
+
+
+def test_torn_trailing_record_is_dropped_and_repaired(tmp_path):
+    store = PriceStore(str(tmp_path))
+    frame = make_ohlcv("2024-01-02", 10)
+    store.append("YPF", frame.iloc[:8])
+    
+    # Escritura interrumpida: la fila 9 llegó a algunas columnas y no a otras,
+    # y una columna quedó con un registro a medias
+    with open(store._column_path("YPF", "Date"), "ab") as f:
+        f.write(np.int64(PriceStore.to_epoch_days(frame.index[8:9])[0]).tobytes())
+    with open(store._column_path("YPF", "Close"), "ab") as f:
+        f.write(np.float64(frame["Close"].iloc[8]).tobytes()[:5])
+    
+    assert len(store.read("YPF")) == 8  # Solo las filas completas
+    assert store.append("YPF", frame) == 2
+    stored = store.read("YPF")
+    assert stored["Close"].tolist() == frame["Close"].tolist()
+    assert (stored.index == frame.index).all()
+    sizes = {path.stat().st_size // 8 for path in (tmp_path / "YPF").iterdir()}
+    assert sizes == {10}
+
+
+def test_read_many_and_clear(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append("YPF", make_ohlcv("2024-01-02", 10, 1))
+    store.append("GGAL", make_ohlcv("2024-01-02", 12, 2))
+    
+    frames = store.read_many(["YPF", "GGAL", "PAMP"])
+    assert {t: len(f) for t, f in frames.items()} == {"YPF": 10, "GGAL": 12}
+    
+    store.clear("YPF")
+    assert store.read("YPF") is None
+    assert store.append("YPF", make_ohlcv("2023-06-01", 3)) == 3  # Tras un split se vuelve a bajar completo
+    assert len(store.read("YPF")) == 3
+    
+    assert store.append("YPF", pd.DataFrame()) == 0
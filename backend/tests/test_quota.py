@@ -0,0 +1,36 @@
+import json
+
+from config.settings import settings
+from services.http_client import UpstreamResponse
+from services.quota import QuotaLedger
+
+
+def test_acquire_is_saved_in_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_SAVE_DELAY_SECONDS", 60)
+    path = tmp_path / "quota.json"
+    ledger = QuotaLedger(str(path), limits={"test": 10})
+    assert ledger.try_acquire("test") and ledger.try_acquire("test")
+    assert not path.exists()  # Todavía no pasó el intervalo de escritura
+
+    ledger.close()
+    assert json.loads(path.read_text())["test"]["used"] == 2
+    assert QuotaLedger(str(path), limits={"test": 10}).remaining("test") == 8
+
+
+def test_plan_rotates_uncovered_consumers(tmp_path):
+    ledger = QuotaLedger(str(tmp_path / "quota.json"), limits={"test": 4})
+    plan = ledger.plan("test", 10)
+    assert (plan["covered"], plan["offset"]) == (4, 0)
+
+    ledger.advance("test", 10, plan["covered"])
+    assert ledger.plan("test", 10)["offset"] == 4
+    ledger.advance("test", 10, 8)
+    assert ledger.plan("test", 10)["offset"] == 2
+    ledger.close()
+
+
+def test_only_long_or_missing_retry_after_exhausts_quota():
+    assert UpstreamResponse(429).quota_exhausted
+    assert UpstreamResponse(429, retry_after=3600).quota_exhausted
+    assert not UpstreamResponse(429, retry_after=1).quota_exhausted
+    assert not UpstreamResponse(503).quota_exhausted
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from services.http_client import HttpClient
+from services.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """Reloj simulado: sleep avanza el tiempo al instante"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def monotonic(self) -> float:
+        return self.now
+    
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def make_bucket(clock: FakeClock, **kwargs) -> TokenBucket:
+    return TokenBucket("test", clock=clock.monotonic, sleep=clock.sleep, **kwargs)
+
+
+async def test_sustained_throughput_respects_the_limit():
+    clock = FakeClock()
+    bucket = make_bucket(clock, limit=10, period=1.0, burst=3)
+    times = []
+    for _ in range(43):
+        await bucket.acquire()
+        times.append(clock.now)
+    
+    # Ráfaga de 3 y después (limit - burst + 1) / period = 8 por segundo
+    assert times[:3] == [0.0, 0.0, 0.0]
+    assert times[-1] == pytest.approx(40 / 8)
+    # Ninguna ventana de `period` segundos supera `limit` requests: cero 429
+    for i, start in enumerate(times):
+        assert sum(1 for t in times[i:] if t < start + 1.0 - 1e-9) <= 10
+
+
+async def test_waiters_are_served_in_arrival_order():
+    clock = FakeClock()
+    bucket = make_bucket(clock, limit=1, period=1.0)
+    order = []
+    
+    async def request(n: int):
+        await bucket.acquire()
+        order.append(n)
+    
+    tasks = []
+    for n in range(8):
+        tasks.append(asyncio.create_task(request(n)))
+        await asyncio.sleep(0)  # Llegan en orden
+    await asyncio.gather(*tasks)
+    assert order == list(range(8))
+    assert clock.now == pytest.approx(7.0)
+    assert bucket.stats()["acquired"] == 8 and bucket.stats()["waiting"] == 0
+
+
+async def test_jitter_stretches_the_window():
+    clock = FakeClock()
+    bucket = make_bucket(clock, limit=1, period=2.0, jitter=0.5)
+    for _ in range(3):
+        await bucket.acquire()
+    assert clock.now == pytest.approx(5.0)
+
+
+def test_buckets_belong_to_the_client():
+    first, second = HttpClient(), HttpClient()
+    assert first.rate_limiter("gnews") is first.rate_limiter("gnews")
+    assert first.rate_limiter("gnews") is not second.rate_limiter("gnews")
+    assert [s["name"] for s in first.rate_limiter_stats()] == ["gnews"]
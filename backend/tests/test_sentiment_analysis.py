@@ -0,0 +1,57 @@
+import pytest
+
+from config.settings import settings
+from services import sentiment_backends
+from services.quota import QuotaLedger
+from services.sentiment_analysis import SentimentAnalyzer
+from services.sentiment_cache import SentimentCache
+
+
+def fake_pipeline(texts, batch_size=None):
+    return [{"label": "POS", "score": 0.9} for _ in texts]
+
+
+def broken_pipeline(texts, batch_size=None):
+    raise RuntimeError("CUDA error: no kernel image is available")
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SENTIMENT_BACKEND", "transformers")
+    analyzer = SentimentAnalyzer(
+        quota=QuotaLedger(path=str(tmp_path / "quota.json")),
+        sentiment_cache=SentimentCache(path=str(tmp_path / "sentiment.sqlite3"))
+    )
+    yield analyzer
+    analyzer.sentiment_cache.close()
+    analyzer.worker.executor.shutdown()
+
+
+async def test_warm_up_loads_model(analyzer, monkeypatch):
+    monkeypatch.setitem(sentiment_backends.BACKENDS, "transformers", lambda: fake_pipeline)
+    assert analyzer.model_state == "not_loaded"
+    
+    await analyzer.start_warm_up()
+    assert analyzer.model_state == "ready"
+    assert analyzer.readiness()["load_seconds"] is not None
+
+
+async def test_warm_up_error_before_load_marks_failed(analyzer, monkeypatch):
+    def crash():
+        raise MemoryError("sin memoria para el modelo")
+    
+    # Un error que no atrapa _load_sentiment_model no deja el estado en not_loaded
+    monkeypatch.setattr(analyzer, "_load_sentiment_model", crash)
+    await analyzer.start_warm_up()
+    assert analyzer.model_state == "failed"
+    assert analyzer.readiness()["state"] == "failed"
+
+
+async def test_warm_up_inference_error_marks_failed(analyzer, monkeypatch):
+    monkeypatch.setitem(sentiment_backends.BACKENDS, "transformers", lambda: broken_pipeline)
+    
+    await analyzer.start_warm_up()
+    assert analyzer.model_state == "failed"
+    # Queda el análisis por palabras clave
+    results = await analyzer._analyze_sentiment(["YPF sube por el récord de producción"])
+    assert results[0]["sentiment"] == "positive"
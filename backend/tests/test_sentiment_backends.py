@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from config.settings import settings
+from services import sentiment_backends
+from services.quota import QuotaLedger
+from services.sentiment_analysis import SentimentAnalyzer
+from services.sentiment_backends import OnnxSentimentBackend, load_backend
+from services.sentiment_cache import SentimentCache
+
+
+def fake_pipeline(texts, batch_size=None):
+    return [{"label": "NEU", "score": 0.5} for _ in texts]
+
+
+def unavailable():
+    raise ImportError("No module named 'onnxruntime'")
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """BACKENDS con cargadores de prueba: transformers responde, onnx no está instalado"""
+    calls = []
+    
+    def loader(name, result):
+        def load():
+            calls.append(name)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return load
+    
+    monkeypatch.setitem(sentiment_backends.BACKENDS, "transformers", loader("transformers", fake_pipeline))
+    monkeypatch.setitem(sentiment_backends.BACKENDS, "onnx", loader("onnx", ImportError("onnxruntime")))
+    return calls
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    analyzer = SentimentAnalyzer(
+        quota=QuotaLedger(path=str(tmp_path / "quota.json")),
+        sentiment_cache=SentimentCache(path=str(tmp_path / "sentiment.sqlite3"))
+    )
+    yield analyzer
+    analyzer.sentiment_cache.close()
+    analyzer.worker.executor.shutdown()
+
+
+def test_load_backend_uses_configured_backend(backends, monkeypatch):
+    monkeypatch.setattr(settings, "SENTIMENT_BACKEND", "transformers")
+    assert load_backend() is fake_pipeline
+    assert backends == ["transformers"]
+
+
+def test_load_backend_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="desconocido"):
+        load_backend("tensorrt")
+
+
+def test_onnx_backend_requires_exported_model(tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("transformers")
+    with pytest.raises(FileNotFoundError):
+        OnnxSentimentBackend(str(tmp_path))
+
+
+def test_onnx_falls_back_to_transformers(backends, analyzer, monkeypatch):
+    monkeypatch.setattr(settings, "SENTIMENT_BACKEND", "onnx")
+    analyzer._load_sentiment_model()
+    
+    assert backends == ["onnx", "transformers"]
+    assert analyzer.sentiment_pipeline is fake_pipeline
+    assert analyzer.model_state == "ready"
+    assert analyzer.readiness()["backend"] == "transformers"
+
+
+def test_transformers_failure_falls_back_to_keywords(backends, analyzer, monkeypatch):
+    monkeypatch.setattr(settings, "SENTIMENT_BACKEND", "transformers")
+    monkeypatch.setitem(sentiment_backends.BACKENDS, "transformers", unavailable)
+    analyzer._load_sentiment_model()
+    
+    assert analyzer.sentiment_pipeline == "fallback"
+    assert analyzer.model_state == "failed"
+    assert backends == []  # No se intenta ONNX
+
+
+def test_onnx_backend_batches_and_maps_labels():
+    class Tokenizer:
+        def __call__(self, texts, **kwargs):
+            return {
+                "input_ids": np.array([[len(text)] for text in texts], dtype=np.int32),
+                "token_type_ids": np.zeros((len(texts), 1), dtype=np.int32),
+            }
+    
+    class Session:
+        def __init__(self):
+            self.batches = []
+        
+        def run(self, outputs, feeds):
+            self.batches.append(len(feeds["input_ids"]))
+            # Logits: el texto más largo es positivo, el resto negativo
+            lengths = feeds["input_ids"][:, 0].astype(float)
+            return [np.stack([lengths - 5, np.zeros_like(lengths), 5 - lengths], axis=1)]
+    
+    # Sin onnxruntime ni modelo exportado: se arma el backend con tokenizer y sesión falsos
+    backend = OnnxSentimentBackend.__new__(OnnxSentimentBackend)
+    backend.tokenizer = Tokenizer()
+    backend.session = Session()
+    backend.input_names = {"input_ids"}
+    backend.id2label = {0: "POS", 1: "NEU", 2: "NEG"}
+    
+    results = backend(["subida fuerte", "baja", "xx"], batch_size=2)
+    assert backend.session.batches == [2, 1]
+    assert [r["label"] for r in results] == ["POS", "NEG", "NEG"]
+    assert all(0.0 < r["score"] <= 1.0 for r in results)
+    assert results[0]["score"] == pytest.approx(1 / (1 + np.exp(-8) + np.exp(-16)))
@@ -0,0 +1,77 @@
+import sqlite3
+import time
+
+import pytest
+
+from services.sentiment_cache import SentimentCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SentimentCache(path=str(tmp_path / "sentiment.sqlite3"), max_age_days=30)
+    yield cache
+    cache.close()
+
+
+def result(sentiment="positive", confidence=0.9, model="finbert@v1"):
+    return {"sentiment": sentiment, "confidence": confidence, "model": model}
+
+
+def test_key_is_stable_under_nfkc_normalization():
+    # Ligadura, espacio de no separación y ancho completo equivalen a su forma NFKC
+    assert SentimentCache.key("Gran ﬁnal del  Merval", "m") == SentimentCache.key("Gran final del Merval", "m")
+    assert SentimentCache.key("ＹＰＦ sube", "m") == SentimentCache.key("YPF sube", "m")
+    assert SentimentCache.key("  YPF sube\n", "m") == SentimentCache.key("YPF sube", "m")
+    # Las mayúsculas no se normalizan
+    assert SentimentCache.key("YPF sube", "m") != SentimentCache.key("ypf sube", "m")
+
+
+def test_key_includes_model():
+    assert SentimentCache.key("YPF sube", "finbert@v1") != SentimentCache.key("YPF sube", "finbert@v2")
+
+
+def test_get_many_put_many_round_trip(cache):
+    keys = [SentimentCache.key(f"noticia {i}", "finbert@v1") for i in range(3)]
+    cache.put_many({keys[0]: result(), keys[1]: result("negative", 0.7)})
+    
+    found = cache.get_many(keys + [keys[0]])
+    assert found == {keys[0]: result(), keys[1]: result("negative", 0.7)}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["writes"] == 2
+
+
+def test_results_persist_across_instances(tmp_path):
+    path = str(tmp_path / "sentiment.sqlite3")
+    key = SentimentCache.key("YPF sube", "finbert@v1")
+    first = SentimentCache(path=path)
+    first.put_many({key: result()})
+    first.close()
+    
+    second = SentimentCache(path=path)
+    assert second.get_many([key]) == {key: result()}
+    second.close()
+
+
+def test_get_many_chunks_large_requests(cache):
+    keys = [SentimentCache.key(f"noticia {i}", "m") for i in range(1200)]
+    cache.put_many({key: result(model="m") for key in keys})
+    assert len(cache.get_many(keys)) == 1200
+
+
+def test_expired_rows_are_purged_on_open(tmp_path):
+    path = tmp_path / "sentiment.sqlite3"
+    old, fresh = SentimentCache.key("vieja", "m"), SentimentCache.key("nueva", "m")
+    cache = SentimentCache(path=str(path), max_age_days=30)
+    cache.put_many({old: result(model="m"), fresh: result(model="m")})
+    cache.close()
+    
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE sentiment SET created_at = ? WHERE key = ?", (time.time() - 31 * 86400, old))
+    
+    reopened = SentimentCache(path=str(path), max_age_days=30)
+    assert reopened.get_many([old, fresh]) == {fresh: result(model="m")}
+    reopened.close()
+    
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0] == 1
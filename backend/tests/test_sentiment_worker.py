@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.sentiment_worker import SentimentQueueFull, SentimentWorker, SentimentWorkerClosed
+
+
+def echo(texts):
+    return [{"text": text, "sentiment": "neutral", "confidence": 0.5} for text in texts]
+
+
+async def test_concurrent_submits_get_their_own_results():
+    worker = SentimentWorker(echo, workers=1, queue_size=16)
+    jobs = [[f"{i}-{j}" for j in range(3)] for i in range(8)]
+    results = await asyncio.gather(*(worker.submit(job) for job in jobs))
+    assert [[r["text"] for r in result] for result in results] == jobs
+    assert worker.stats()["batches"] < len(jobs)  # Se juntaron en menos forwards
+    await worker.close()
+
+
+async def test_full_queue_rejects_with_backpressure():
+    release = threading.Event()
+
+    def blocked(texts):
+        release.wait(5)
+        return echo(texts)
+
+    worker = SentimentWorker(blocked, workers=1, queue_size=1, submit_timeout=0.05)
+    tasks = [asyncio.create_task(worker.submit(["0"]))]
+    await asyncio.sleep(0.1)  # El consumidor queda bloqueado en la inferencia
+    tasks += [asyncio.create_task(worker.submit([str(i)])) for i in range(1, 4)]
+    await asyncio.sleep(0.2)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert any(isinstance(r, SentimentQueueFull) for r in results)
+    assert any(isinstance(r, list) for r in results)
+    await worker.close()
+
+
+async def test_close_fails_outstanding_requests():
+    release = threading.Event()
+
+    def blocked(texts):
+        release.wait(5)
+        return echo(texts)
+
+    worker = SentimentWorker(blocked, workers=1, queue_size=8)
+    tasks = [asyncio.create_task(worker.submit([str(i)])) for i in range(3)]
+    await asyncio.sleep(0.1)  # Uno en inferencia, el resto en la cola
+    await worker.close()
+    release.set()
+    results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=1)
+    assert all(isinstance(r, SentimentWorkerClosed) for r in results)
+    await asyncio.sleep(0.05)  # Dejar terminar el thread de inferencia antes de cerrar el loop
+
+
+async def test_submit_after_close_is_rejected():
+    worker = SentimentWorker(echo, workers=1)
+    assert await worker.submit(["a"])
+    await worker.close()
+    start = time.monotonic()
+    with pytest.raises(SentimentWorkerClosed):
+        await worker.submit(["b"])
+    assert time.monotonic() - start < 0.5
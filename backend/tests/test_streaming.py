@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.settings import settings
+from services.price_store import PriceStore
+from services.streaming import Bar, ReplayFeed, ScoreHub, StreamingScorer, StreamingService
+from services.technical_analysis import TechnicalAnalyzer
+
+
+def make_ohlcv(length: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    index = pd.date_range("2024-01-02", periods=length, freq="B")
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.005, length)),
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": rng.integers(1_000, 100_000, length).astype(float),
+    }, index=index)
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDICATOR_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(settings, "SYMBOL_CACHE_PATH", str(tmp_path / "symbols.json"))
+    monkeypatch.setattr(settings, "PRICE_STORE_DIR", str(tmp_path / "prices"))
+    analyzer = TechnicalAnalyzer()
+    yield analyzer
+    analyzer.executor.shutdown()
+
+
+@pytest.fixture
+def store(tmp_path) -> PriceStore:
+    store = PriceStore(str(tmp_path / "replay"))
+    store.append("AAA", make_ohlcv(80, 1))
+    store.append("BBB", make_ohlcv(80, 2))
+    return store
+
+
+def drain(subscription) -> list:
+    messages = []
+    while not subscription.queue.empty():
+        messages += [json.loads(m) for m in subscription.queue.get_nowait()]
+    return messages
+
+
+def test_bar_for_an_incorporated_date_is_ignored(analyzer):
+    history = make_ohlcv(60, 3)
+    scorer = StreamingScorer(analyzer)
+    scorer.seed("AAA", history.iloc[:-1])
+    last_closed = analyzer.bar_dates(history)[-2]
+    
+    assert scorer.on_bar(Bar("AAA", last_closed, 1.0, 1.0)) is None
+    assert "AAA" not in scorer.breakdowns
+    
+    today = Bar("AAA", analyzer.bar_dates(history)[-1], float(history["Close"].iloc[-1]), 10.0)
+    assert scorer.on_bar(today) is not None
+    assert scorer.on_bar(today) is None  # Misma barra: nada cambió
+    assert scorer.states["AAA"].last_date == last_closed  # La barra en curso no se incorpora
+
+
+def test_new_bar_only_rescores_its_ticker(analyzer):
+    scorer = StreamingScorer(analyzer)
+    for ticker, seed in (("AAA", 4), ("BBB", 5)):
+        history = make_ohlcv(60, seed)
+        scorer.seed(ticker, history.iloc[:-1])
+        scorer.on_bar(Bar(ticker, "2024-03-26", float(history["Close"].iloc[-1]), 1.0))
+    other = scorer.breakdowns["BBB"]
+    other_state = scorer.states["BBB"].to_dict()
+    
+    changes = scorer.on_bar(Bar("AAA", "2024-03-27", 50.0, 1.0))
+    assert changes and changes["total_score"] == scorer.breakdowns["AAA"].total_score
+    assert scorer.breakdowns["BBB"] is other
+    assert scorer.states["BBB"].to_dict() == other_state
+
+
+async def test_replay_publishes_deltas_per_ticker(analyzer, store):
+    feed = ReplayFeed(["AAA", "BBB"], days=5, ticks_per_bar=2, interval=0, price_store=store)
+    service = StreamingService(analyzer, feed=feed)
+    subscription = service.subscribe()
+    await service.wait()
+    await asyncio.sleep(0)  # Último lote del hub
+    
+    messages = drain(subscription)
+    assert messages[0]["type"] == "snapshot" and messages[0]["scores"] == {}
+    deltas = [m for m in messages if m["type"] == "delta"]
+    assert deltas and {m["ticker"] for m in deltas} == {"AAA", "BBB"}
+    assert all("ticker" not in m["changes"] or m["changes"]["ticker"] == m["ticker"] for m in deltas)
+    assert service.stats()["bars_processed"] == 2 * 5 * 2
+    # Cada barra cerrada quedó incorporada al estado del ticker
+    assert service.scorer.states["AAA"].last_date == analyzer.bar_dates(store.read("AAA"))[-2]
+
+
+async def test_full_queue_gets_a_resync_snapshot():
+    snapshots = []
+    
+    def snapshot() -> str:
+        snapshots.append(1)
+        return json.dumps({"type": "snapshot", "n": len(snapshots)})
+    
+    hub = ScoreHub(snapshot, queue_size=2)
+    slow, fast = hub.subscribe(), hub.subscribe()
+    hub.publish({"type": "delta", "n": 1})
+    await asyncio.sleep(0)
+    await fast.get(), await fast.get()  # El rápido consume; el lento no
+    
+    hub.publish({"type": "delta", "n": 2})
+    await asyncio.sleep(0)
+    assert [m["type"] for m in drain(slow)] == ["snapshot"]
+    assert [m["n"] for m in drain(fast)] == [2]
+    assert slow.resyncs == 1 and fast.resyncs == 0 and hub.resyncs == 1
+
+
+class FlakyFeed(ReplayFeed):
+    """Replay que falla la primera vez que se consume"""
+    
+    failed = False
+    
+    async def bars(self):
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError("feed caído")
+        async for bar in super().bars():
+            yield bar
+
+
+async def test_failed_feed_is_restarted(analyzer, store, monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_RESTART_BASE_SECONDS", 0.01)
+    feed = FlakyFeed(["AAA"], days=3, interval=0, price_store=store)
+    service = StreamingService(analyzer, feed=feed)
+    service.start()
+    await service.wait()
+    assert service.restarts == 1
+    assert service.stats()["bars_processed"] == 3
+    assert not service.stats()["running"]
+    
+    # Terminado el feed, start() lo vuelve a arrancar
+    service.start()
+    assert service.stats()["running"]
+    await service.stop()
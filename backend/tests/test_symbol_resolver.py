@@ -0,0 +1,27 @@
+from services.symbol_resolver import SymbolResolver
+from services.universe import Universe
+
+
+def make_resolver(tmp_path) -> SymbolResolver:
+    universe_path = tmp_path / "universe.csv"
+    universe_path.write_text(
+        "# mercado de cada ticker\nticker,name,market\nAGRO,Agrometal,byma\nYPF,YPF S.A.,adr\nX,US Steel,cedear\n",
+        encoding="utf-8"
+    )
+    return SymbolResolver(str(tmp_path / "symbols.json"), Universe(str(universe_path)))
+
+
+def test_variants_follow_the_market(tmp_path):
+    resolver = make_resolver(tmp_path)
+    assert resolver.variants("AGRO") == ["AGRO.BA"]
+    assert resolver.variants("YPF") == ["YPF"]
+    assert resolver.preferred("X") == "X"
+    assert resolver.variants("GGAL") == ["GGAL", "GGAL.BA", "GGAL.MX"]  # Fuera del universo
+
+
+def test_resolution_from_another_market_is_not_trusted(tmp_path):
+    resolver = make_resolver(tmp_path)
+    resolver.record("AGRO", "AGRO")  # Adecoagro en NYSE
+    assert resolver.lookup("AGRO") == (False, None)
+    resolver.record("AGRO", "AGRO.BA")
+    assert resolver.lookup("AGRO") == (True, "AGRO.BA")
@@ -0,0 +1,35 @@
+import os
+from pathlib import Path
+
+from services.universe import Universe
+
+
+def write_universe(path: Path, rows: str, mtime: float) -> None:
+    path.write_text("ticker,name,market\n" + rows, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_market_lookup_uses_the_index(tmp_path, monkeypatch):
+    path = tmp_path / "universe.csv"
+    write_universe(path, "".join(f"T{i},Ticker {i},byma\n" for i in range(1000)) + "YPF,YPF S.A.,adr\n", 1_000)
+    universe = Universe(str(path))
+    assert len(universe) == 1001
+    
+    stats = []
+    original_stat = Path.stat
+    monkeypatch.setattr(Path, "stat", lambda self, **kw: stats.append(self) or original_stat(self, **kw))
+    assert universe.market("YPF") == "adr"
+    assert universe.market("T999") == "byma"
+    assert universe.market("GGAL") is None
+    assert stats == []  # Sin consultar el archivo en cada búsqueda
+
+
+def test_index_is_rebuilt_when_the_file_changes(tmp_path):
+    path = tmp_path / "universe.csv"
+    write_universe(path, "AGRO,Agrometal,byma\n", 1_000)
+    universe = Universe(str(path))
+    assert universe.market("AGRO") == "byma"
+    
+    write_universe(path, "AGRO,Agrometal,byma\nX,US Steel,cedear\n", 2_000)
+    assert universe.tickers() == ["AGRO", "X"]
+    assert universe.market("X") == "cedear"